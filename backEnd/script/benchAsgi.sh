@@ -0,0 +1 @@
+python -m src.Benchmark.BenchAsgi
\ No newline at end of file
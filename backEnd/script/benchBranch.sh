@@ -0,0 +1 @@
+python -m src.Benchmark.BenchBranch
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Benchmark.BenchContention
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Benchmark.BenchGrammar
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Benchmark.BenchImport
\ No newline at end of file
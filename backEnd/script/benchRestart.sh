@@ -0,0 +1 @@
+python -m src.Benchmark.BenchRestart
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Benchmark.BenchRuntime
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Benchmark.BenchScheduler
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Benchmark.BenchSession
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Benchmark.BenchShard
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Benchmark.BenchTimer
\ No newline at end of file
@@ -4,6 +4,40 @@ sh script/testLexical.sh
 
 sh script/testGrammar.sh
 
+sh script/testLinker.sh
+
+sh script/testKeywordMatcher.sh
+
+sh script/testSpeakTemplate.sh
+
+sh script/testScriptCache.sh
+
+sh script/testReloader.sh
+
+sh script/testScriptRegistry.sh
+
+sh script/testStateMachine.sh
+
+sh script/testTimerWheel.sh
+
+sh script/testResultLog.sh
+
+sh script/testSessionStore.sh
+
+sh script/testSessionManager.sh
+
+sh script/testScheduler.sh
+
 sh script/testInterpreter.sh
 
+sh script/testAsyncRuntime.sh
+
 sh script/testApp.sh
+
+sh script/testShardRouter.sh
+
+sh script/testWebSocketServer.sh
+
+sh script/testAsgi.sh
+
+sh script/testVariableStore.sh
\ No newline at end of file
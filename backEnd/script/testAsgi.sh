@@ -0,0 +1 @@
+python -m src.Test.TestAsgi
\ No newline at end of file
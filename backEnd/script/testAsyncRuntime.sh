@@ -0,0 +1 @@
+python -m src.Test.TestAsyncRuntime
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Test.TestKeywordMatcher
\ No newline at end of file
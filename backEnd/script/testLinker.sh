@@ -0,0 +1 @@
+python -m src.Test.TestLinker
\ No newline at end of file
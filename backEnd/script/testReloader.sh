@@ -0,0 +1 @@
+python -m src.Test.TestReloader
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Test.TestResultLog
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Test.TestScheduler
\ No newline at end of file
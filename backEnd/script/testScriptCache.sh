@@ -0,0 +1 @@
+python -m src.Test.TestScriptCache
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Test.TestScriptRegistry
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Test.TestSessionManager
\ No newline at end of file
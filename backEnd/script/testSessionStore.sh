@@ -0,0 +1 @@
+python -m src.Test.TestSessionStore
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Test.TestShardRouter
\ No newline at end of file
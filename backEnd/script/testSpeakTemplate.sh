@@ -0,0 +1 @@
+python -m src.Test.TestSpeakTemplate
\ No newline at end of file
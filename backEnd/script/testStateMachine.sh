@@ -0,0 +1 @@
+python -m src.Test.TestStateMachine
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Test.TestTimerWheel
\ No newline at end of file
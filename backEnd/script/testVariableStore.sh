@@ -0,0 +1 @@
+python -m src.Test.TestVariableStore
\ No newline at end of file
@@ -0,0 +1 @@
+python -m src.Test.TestWebSocketServer
\ No newline at end of file
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+from src.Interpreter.Scheduler import percentile
+
+USERS = 64  # 预先登录的用户数，请求轮流使用
+
+
+async def post(reader, writer, path, fields):
+    """在已建立的连接上发送一个表单请求（HTTP/1.1），返回 (状态码, 连接是否可复用)"""
+    body = urlencode(fields).encode('utf-8')
+    writer.write(f'POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/x-www-form-urlencoded\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    length = 0
+    keepAlive = True
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'connection' and value.strip().lower() == 'close':
+            keepAlive = False
+    await reader.readexactly(length)
+    return int(lines[0].split()[1]), keepAlive
+
+
+async def waitReady(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'端口 {port} 未在 {timeout} 秒内就绪')
+
+
+async def measure(port, path, concurrency, duration):
+    """
+    concurrency 个客户端在 duration 秒内循环发送请求，服务器允许时复用连接（Flask 开发服务器每次响应后关闭连接，
+    需重新建立），返回 (每秒请求数, p50秒, p99秒, 错误数)；延迟包含建立连接的时间
+    """
+    latencies = []
+    errors = [0]
+    stopAt = time.perf_counter() + duration
+
+    async def client(index):
+        reader = writer = None
+        turn = index
+        try:
+            while time.perf_counter() < stopAt:
+                username = f'bench{turn % USERS}'
+                fields = {'username': username, 'message': '账单'} if path == '/telechat' else {'username': username}
+                begin = time.perf_counter()
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                    status, keepAlive = await post(reader, writer, path, fields)
+                except (OSError, asyncio.IncompleteReadError):
+                    status, keepAlive = 0, False
+                latencies.append(time.perf_counter() - begin)
+                if status != 200:
+                    errors[0] += 1
+                if not keepAlive and writer is not None:
+                    writer.close()
+                    writer = None
+                turn += concurrency
+        finally:
+            if writer is not None:
+                writer.close()
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - begin
+    return len(latencies) / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99), errors[0]
+
+
+async def prepare(port):
+    for index in range(USERS):
+        username = f'bench{index}'
+        for path, fields in (('/register', {'username': username, 'password': 'p'}),
+                             ('/login', {'username': username, 'password': 'p'}),
+                             ('/clearchat', {'username': username})):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            await post(reader, writer, path, fields)
+            writer.close()
+
+
+def main(concurrencies=(16, 256), duration=5.0, port=5500):
+    """
+    对比 Flask 开发服务器（app.py，每个连接一个线程）与 Hypercorn 上的 ASGI 应用（asgi.py）的
+    每秒请求数和延迟。两者都使用内联调度、关闭意图识别，客户端为同一进程内的 asyncio 连接。
+    """
+    env = dict(os.environ, LLM_PROVIDER='', DSL_RELOAD_INTERVAL='0', DSL_RUNTIME='inline', DSL_PORT=str(port))
+    servers = (
+        ('Flask', [sys.executable, '-m', 'src.Interpreter.app'], dict(env, DSL_SHARD_TOKEN='bench')),
+        ('Hypercorn', [sys.executable, '-m', 'src.Interpreter.asgi'], env),
+    )
+    print(f"CPU核数：{os.cpu_count()}，每轮 {duration:.0f} 秒")
+    print(f"{'服务器':<12}{'接口':<12}{'并发':>6}{'请求/秒':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'错误':>6}")
+    for name, command, serverEnv in servers:
+        process = subprocess.Popen(command, env=serverEnv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            asyncio.run(waitReady(port))
+            asyncio.run(prepare(port))
+            for path in ('/getinfo', '/telechat'):
+                for concurrency in concurrencies:
+                    rps, p50, p99, errors = asyncio.run(measure(port, path, concurrency, duration))
+                    print(f"{name:<12}{path:<12}{concurrency:>6}{rps:>10.0f}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}{errors:>6}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (16, 256))
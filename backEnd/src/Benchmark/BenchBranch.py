@@ -0,0 +1,65 @@
+import random
+import time
+from src.Interpreter.KeywordMatcher import KeywordMatcher
+
+# 常用汉字区间，用于生成关键词和长文本输入
+CHARSET = [chr(code) for code in range(0x4e00, 0x4e00 + 3000)]
+
+
+def makeKeywords(count, rng):
+    """生成 count 个互不相同的2~4字关键词"""
+    keywords = []
+    seen = set()
+    while len(keywords) < count:
+        keyword = ''.join(rng.choice(CHARSET) for _ in range(rng.randint(2, 4)))
+        if keyword not in seen:
+            seen.add(keyword)
+            keywords.append(keyword)
+    return keywords
+
+
+def loopMatch(branches, text):
+    """原有实现：按声明顺序逐个做子串查找"""
+    for keyword, target in branches:
+        if keyword in text:
+            return target
+    return None
+
+
+def timeIt(func, text, repeat, rounds=5):
+    """多轮取最短的平均耗时"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(text)
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def main(repeat=100):
+    rng = random.Random(42)
+    print("单位：微秒/次；匹配器为 KeywordMatcher 默认策略")
+    print(f"{'关键词数':>8} {'输入长度':>8} {'命中位置':>8} {'逐个查找':>10} {'自动机':>10} {'匹配器':>10}")
+    for count in (5, 50, 500):
+        keywords = makeKeywords(count, rng)
+        branches = [(keyword, index) for index, keyword in enumerate(keywords)]
+        automaton = KeywordMatcher(branches, threshold=0)
+        matcher = KeywordMatcher(branches)
+        for textLength in (20, 2000):  # 普通输入与语音转写的长文本
+            filler = ''.join(rng.choice(CHARSET) for _ in range(textLength))
+            cases = {
+                '未命中': filler,
+                '末尾': filler + keywords[-1],  # 最后声明的关键词出现在文本末尾
+            }
+            for name, text in cases.items():
+                assert loopMatch(branches, text) == automaton.scan(text) == matcher.match(text)
+                loopTime = timeIt(lambda t: loopMatch(branches, t), text, repeat)
+                automatonTime = timeIt(automaton.scan, text, repeat)
+                matcherTime = timeIt(matcher.match, text, repeat)
+                print(f"{count:>8} {textLength:>8} {name:>8} "
+                      f"{loopTime * 1e6:>10.1f} {automatonTime * 1e6:>10.1f} {matcherTime * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
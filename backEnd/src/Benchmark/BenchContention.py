@@ -0,0 +1,83 @@
+import os
+os.environ['LLM_PROVIDER'] = ''  # 只测量请求处理和加锁开销，关闭外部意图识别（须在导入解释器之前设置）
+os.environ['DSL_RUNTIME'] = 'inline'  # /telechat 在请求线程中推进对话
+os.environ['DSL_RELOAD_INTERVAL'] = '0'
+
+import sys
+import threading
+import time
+from contextlib import nullcontext, redirect_stdout
+import src.Interpreter.app as backend
+
+USERS_PER_CLIENT = 4
+
+
+def run(handler, clients, duration, globalLock):
+    """clients 个线程在 duration 秒内循环调用 handler(客户端编号, 轮次)，返回每秒请求数"""
+    counts = [0] * clients
+    barrier = threading.Barrier(clients + 1)
+    stopAt = [0.0]
+
+    def client(index):
+        barrier.wait()
+        turn = 0
+        while time.perf_counter() < stopAt[0]:
+            with globalLock or nullcontext():
+                handler(index, turn)
+            turn += 1
+        counts[index] = turn
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    stopAt[0] = time.perf_counter() + duration
+    begin = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - begin)
+
+
+def main(clientCounts=(1, 8, 64), duration=2.0):
+    """
+    直接调用请求处理函数，对比两种加锁方式下 /setinfo、/telechat 的吞吐量（请求/秒）：
+    全局锁：会话表只有一个分段，且每个请求整体持有一把全局锁（相当于原来的 userStateLock）；
+    分段锁：会话表分为 64 个分段，只有取会话时短暂锁定用户所在的分段，设置变量不加锁。
+    """
+    users = max(clientCounts) * USERS_PER_CLIENT
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for index in range(users):
+            form = {'username': f'bench{index}', 'password': 'p'}
+            backend.registerUser(form)
+    print(f"CPU核数：{os.cpu_count()}，每轮 {duration:.0f} 秒")
+    print(f"{'方式':<8}{'接口':<12}{'并发':>6}{'请求/秒':>12}")
+    for mode, stripes, globalLock in (('全局锁', 1, threading.Lock()), ('分段锁', 64, None)):
+        backend.userState.clear()
+        backend.userState = backend.SessionManager(onRemove=backend.releaseSession, sessionLock=backend.inlineLock,
+                                                   stripes=stripes)
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for index in range(users):
+                form = {'username': f'bench{index}', 'password': 'p'}
+                backend.loginUser(form)
+                backend.clearConversation(form)
+
+            def setInfo(client, turn):
+                username = f'bench{client * USERS_PER_CLIENT + turn % USERS_PER_CLIENT}'
+                backend.setUserInfo({'username': username, 'amount': str(turn), 'plan': '畅享套餐'})
+
+            def teleChat(client, turn):
+                username = f'bench{client * USERS_PER_CLIENT + turn % USERS_PER_CLIENT}'
+                backend.receiveInput({'username': username, 'message': '账单'}, {})
+                backend.userState.get(username).resultLog().discard()
+
+            results = []
+            for path, handler in (('/setinfo', setInfo), ('/telechat', teleChat)):
+                for clients in clientCounts:
+                    results.append((path, clients, run(handler, clients, duration, globalLock)))
+        for path, clients, rps in results:
+            print(f"{mode:<8}{path:<12}{clients:>6}{rps:>12.0f}")
+    backend.userState.clear()
+
+
+if __name__ == '__main__':
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (1, 8, 64))
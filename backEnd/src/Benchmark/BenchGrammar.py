@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+import time
+from src.Interpreter.Lexical import tokenize
+from src.Interpreter.Grammar import Grammar
+
+# 合成脚本中每个步骤的模板，共8行
+STEP_TEMPLATE = '''Step step{index}
+    Speak $name + "您好，这是第{index}个步骤，" + $amount + "元"
+    Listen 10 # Listen for 10 seconds
+    Branch "账单" step{next}
+    Branch "套餐" step{next}
+    Silence step{next}
+    Default step{next}
+
+'''
+LINES_PER_STEP = STEP_TEMPLATE.count('\n')
+
+
+def writeSyntheticScript(fileName, lineCount):
+    """生成约 lineCount 行的合成脚本，返回实际行数"""
+    stepCount = max(1, lineCount // LINES_PER_STEP)
+    with open(fileName, 'w', encoding='utf-8') as f:
+        for i in range(stepCount):
+            f.write(STEP_TEMPLATE.format(index=i, next=(i + 1) % stepCount))
+    return stepCount * LINES_PER_STEP
+
+
+def bestOf(func, repeat):
+    """多次运行取最短耗时"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(lineCount=100000, repeat=3):
+    fd, fileName = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        lines = writeSyntheticScript(fileName, lineCount)
+        tokens = list(tokenize(fileName))
+
+        lexTime = bestOf(lambda: list(tokenize(fileName)), repeat)
+        grammarTime = bestOf(lambda: Grammar(tokens), repeat)
+        totalTime = bestOf(lambda: Grammar(tokenize(fileName)), repeat)
+
+        print(f"合成脚本：{lines} 行，{len(tokens)} 个词法单元")
+        print(f"词法分析      {lexTime * 1000:8.1f} ms  {lines / lexTime:12,.0f} 行/秒")
+        print(f"语法分析      {grammarTime * 1000:8.1f} ms  {lines / grammarTime:12,.0f} 行/秒")
+        print(f"流式词法+语法 {totalTime * 1000:8.1f} ms  {lines / totalTime:12,.0f} 行/秒")
+    finally:
+        os.remove(fileName)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
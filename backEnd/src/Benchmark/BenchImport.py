@@ -0,0 +1,51 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from src.Interpreter.VariableStore import VariableStore, readRecords, importRecords
+
+VARIABLES = ('amount', 'plan', 'planFee', 'complainId')
+
+
+def generate(users):
+    """users 个用户、每人 4 个变量的CSV（在内存中生成，不计入导入耗时）"""
+    buffer = io.StringIO()
+    buffer.write('username,variable,value\n')
+    for index in range(users):
+        buffer.write(f'user{index},amount,{index % 1000}.50\nuser{index},plan,畅享套餐\n'
+                     f'user{index},planFee,{index % 200}\nuser{index},complainId,C{index:08d}\n')
+    buffer.seek(0)
+    return buffer
+
+
+def main(users=250000, batchSizes=(1000, 10000, 100000)):
+    """
+    把 users×4 条记录从CSV流式导入SQLite变量库（WAL），对比不同批大小的吞吐量（条/秒），
+    以及导入后按用户名读取变量（登录时）的耗时。
+    """
+    print(f"记录数：{users * len(VARIABLES)}")
+    print(f"{'批大小':>8}{'耗时(秒)':>10}{'条/秒':>12}{'登录读取(μs)':>14}")
+    for batchSize in batchSizes:
+        data = generate(users)
+        tmpDir = tempfile.mkdtemp()
+        try:
+            store = VariableStore(os.path.join(tmpDir, 'variables.db'))
+            begin = time.perf_counter()
+            result = importRecords(store, readRecords(data), VARIABLES, batchSize)
+            elapsed = time.perf_counter() - begin
+            assert result['imported'] == users * len(VARIABLES), result
+            begin = time.perf_counter()
+            for index in range(0, users, max(1, users // 10000)):
+                store.load(f'user{index}')
+            lookups = len(range(0, users, max(1, users // 10000)))
+            lookup = (time.perf_counter() - begin) / lookups
+            store.close()
+        finally:
+            shutil.rmtree(tmpDir)
+        print(f"{batchSize:>8}{elapsed:>10.2f}{result['imported'] / elapsed:>12.0f}{lookup * 1e6:>14.1f}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,79 @@
+import os
+os.environ['LLM_PROVIDER'] = ''  # 只测量调度开销，关闭外部意图识别（须在导入解释器之前设置）
+
+import sys
+import time
+from contextlib import redirect_stdout
+from src.Interpreter.AsyncRuntime import AsyncRuntime
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Interpreter import Interpreter
+from src.Interpreter.Scheduler import percentile
+
+TOKENS = [
+    ['Step', 'main'],
+    ['Speak', '"请输入继续"'],
+    ['Listen', '600'],
+    ['Branch', '"继续"', 'main'],
+    ['Default', 'main'],
+]
+
+
+class SlowIntent:
+    """模拟耗时的意图识别（外部HTTP请求）"""
+    enabled = True
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def match_intent(self, text):
+        time.sleep(self.delay)
+        return {}
+
+
+def measure(runtime, busy, count, delay):
+    """
+    count 个会话各自重新开始一次对话，返回 startDispatch 的耗时（秒）列表。
+    busy 为True时旧调度正在做意图识别（delay 秒），否则停在Listen等待输入。
+    """
+    tree = Grammar(TOKENS).getGrmTree()
+    sessions = []
+    for _ in range(count):
+        session = Interpreter(tree)
+        session.intentService = SlowIntent(delay)
+        session.startDispatch(runtime)
+        sessions.append(session)
+    time.sleep(0.2)
+    if busy:
+        for session in sessions:
+            session.setUserInput('继续')
+        time.sleep(0.05)
+    latencies = []
+    for session in sessions:
+        begin = time.perf_counter()
+        session.startDispatch(runtime)
+        latencies.append(time.perf_counter() - begin)
+    for session in sessions:
+        session.requestStop()
+    return latencies
+
+
+def main(count=200, delay=0.5):
+    """
+    重新开始对话（/clearchat）的耗时：旧调度随代数过期并自行退出，startDispatch 不等待它结束。
+    分别测量旧调度空闲（停在Listen）和忙碌（正在做 delay 秒的意图识别）时，线程调度与协程调度的耗时。
+    """
+    runtime = AsyncRuntime()
+    print(f"{'调度方式':<8}{'旧调度':<8}{'会话数':>8}{'p50(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    with open(os.devnull, 'w') as devnull:
+        for name, dispatcher in (('thread', None), ('asyncio', runtime)):
+            for busy in (False, True):
+                with redirect_stdout(devnull):
+                    latencies = measure(dispatcher, busy, count, delay)
+                    time.sleep(delay + 0.2)  # 等过期的调度退出
+                print(f"{name:<10}{'忙碌' if busy else '空闲':<8}{count:>8}{percentile(latencies, 0.5) * 1000:>10.3f}"
+                      f"{percentile(latencies, 0.99) * 1000:>10.3f}{max(latencies) * 1000:>10.3f}")
+    runtime.stop()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,161 @@
+import os
+os.environ['LLM_PROVIDER'] = ''  # 只测量调度开销，关闭外部意图识别（须在导入解释器之前设置）
+
+import gc
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+from src.Interpreter.AsyncRuntime import AsyncRuntime
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Interpreter import Interpreter
+from src.Interpreter.StateMachine import START, INPUT
+from src.Interpreter.Scheduler import percentile
+
+# 每轮：说一句话后等待输入，输入“继续”回到开头
+TOKENS = [
+    ['Step', 'main'],
+    ['Speak', '"请输入继续"'],
+    ['Listen', '600'],
+    ['Branch', '"继续"', 'main'],
+    ['Default', 'main'],
+]
+
+
+class TimedInterpreter(Interpreter):
+    """记录从设置输入到下一条输出的延迟，不打印输出"""
+    __slots__ = ('sentAt', 'latency', 'ready')
+
+    def __init__(self, tree):
+        super().__init__(tree)
+        self.sentAt = None
+        self.latency = None
+        self.ready = None  # 收到一条输出时触发
+
+    def emit(self, message):
+        if self.sentAt is not None:
+            self.latency = time.perf_counter() - self.sentAt
+            self.sentAt = None
+        self._pushResult(message)
+        self.ready.set()
+
+
+def readRSS():
+    """当前进程的常驻内存（KB），不支持时返回0"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def waitAll(sessions, timeout):
+    """等待所有会话都产生一条输出"""
+    deadline = time.monotonic() + timeout
+    for session in sessions:
+        if not session.ready.wait(max(0.0, deadline - time.monotonic())):
+            return False
+    return True
+
+
+def waitThreads(baseline, timeout=60):
+    """等待上一轮的调度线程全部退出，避免影响下一轮测量"""
+    deadline = time.monotonic() + timeout
+    while threading.active_count() > baseline and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+
+def measure(tree, count, runtime):
+    """
+    启动 count 个并发对话，全部停在Listen后同时输入一次，
+    返回 (是否成功, 启动耗时, 每会话内存KB, 线程数, p50延迟, p99延迟, 失败原因)。
+    """
+    gc.collect()
+    rssBefore = readRSS()
+    sessions = []
+    started = time.perf_counter()
+    try:
+        for _ in range(count):
+            session = TimedInterpreter(tree)
+            session.ready = threading.Event()
+            session.startDispatch(runtime)
+            sessions.append(session)
+        if not waitAll(sessions, 60):
+            raise RuntimeError('会话未能在60秒内开始')
+        startup = time.perf_counter() - started
+        rss = (readRSS() - rssBefore) / count
+        threads = threading.active_count()
+
+        for session in sessions:
+            session.ready.clear()
+            session.getLatestResult()
+        for session in sessions:
+            session.sentAt = time.perf_counter()
+            session.setUserInput('继续')
+        if not waitAll(sessions, 60):
+            raise RuntimeError('输入未能在60秒内处理完')
+        latencies = [session.latency for session in sessions]
+        return True, startup, rss, threads, percentile(latencies, 0.5), percentile(latencies, 0.99), None
+    except RuntimeError as exc:  # 线程数达到系统上限时 Thread.start 抛出 RuntimeError
+        return False, 0, 0, threading.active_count(), 0, 0, f'{len(sessions)} 个会话时失败：{exc}'
+    finally:
+        for session in sessions:
+            session.requestStop()
+        for session in sessions:
+            worker = session.dispatchThread
+            if isinstance(worker, threading.Thread):
+                worker.join(timeout=1)
+
+
+def measureInline(tree, count):
+    """
+    内联模式：在当前线程中用 feed 推进 count 个对话，延迟为一次 feed 调用的耗时，返回值同 measure。
+    """
+    gc.collect()
+    rssBefore = readRSS()
+    started = time.perf_counter()
+    sessions = []
+    for _ in range(count):
+        session = TimedInterpreter(tree)
+        session.ready = threading.Event()
+        session.feed(START)
+        sessions.append(session)
+    startup = time.perf_counter() - started
+    rss = (readRSS() - rssBefore) / count
+    latencies = []
+    for session in sessions:
+        session.getLatestResult()
+        begin = time.perf_counter()
+        session.feed(INPUT, '继续')
+        latencies.append(time.perf_counter() - begin)
+    return True, startup, rss, threading.active_count(), percentile(latencies, 0.5), percentile(latencies, 0.99), None
+
+
+def main(counts=(1000, 10000, 20000)):
+    tree = Grammar(TOKENS).getGrmTree()
+    runtime = AsyncRuntime(loopCount=1)
+    runtime.start()
+    baseline = threading.active_count()
+    print(f"{'模式':<8}{'会话数':>8}{'启动(s)':>10}{'内存/会话(KB)':>16}{'线程数':>8}{'p50(ms)':>10}{'p99(ms)':>10}")
+    for mode, modeRuntime in (('thread', None), ('asyncio', runtime)):
+        for count in counts:
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                ok, startup, rss, threads, p50, p99, reason = measure(tree, count, modeRuntime)
+            if not ok:
+                print(f"{mode:<8}{count:>8}  {reason}")
+                break
+            print(f"{mode:<8}{count:>8}{startup:>10.2f}{rss:>16.1f}{threads:>8}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}")
+            waitThreads(baseline)
+        waitThreads(baseline)
+    for count in counts:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            ok, startup, rss, threads, p50, p99, reason = measureInline(tree, count)
+        print(f"{'inline':<8}{count:>8}{startup:>10.2f}{rss:>16.1f}{threads:>8}{p50 * 1000:>10.3f}{p99 * 1000:>10.3f}")
+    runtime.stop()
+
+
+if __name__ == '__main__':
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (1000, 10000, 20000))
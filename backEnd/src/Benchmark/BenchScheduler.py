@@ -0,0 +1,66 @@
+import os
+os.environ['LLM_PROVIDER'] = ''  # 只测量调度开销，关闭外部意图识别（须在导入解释器之前设置）
+
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Interpreter import Interpreter
+from src.Interpreter.Scheduler import Scheduler
+from src.Interpreter.StateMachine import START, INPUT
+
+# 每轮：说一句话后等待输入，输入“继续”回到开头
+TOKENS = [
+    ['Step', 'main'],
+    ['Speak', '"请输入继续"'],
+    ['Listen', '600'],
+    ['Branch', '"继续"', 'main'],
+    ['Default', 'main'],
+]
+
+
+def main(count=20000, workers=4, vipRatio=0.1, work=0.0002):
+    """
+    count 个会话同时收到输入（突发），其中 vipRatio 的比例为 vip，其余为 bulk；
+    每个任务推进一步并模拟 work 秒的I/O（如意图识别），测量各优先级的排队时间和总耗时。
+    """
+    tree = Grammar(TOKENS).getGrmTree()
+    sessions = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for index in range(count):
+            session = Interpreter(tree)
+            session.priority = 'vip' if index % int(1 / vipRatio) == 0 else 'bulk'
+            session.feed(START)
+            session.getLatestResult()
+            sessions.append(session)
+
+    def step(session):
+        def task():
+            session.feed(INPUT, '继续')
+            if work:
+                time.sleep(work)
+        return task
+
+    scheduler = Scheduler(workers)
+    baseline = threading.active_count()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        begin = time.perf_counter()
+        for index, session in enumerate(sessions):
+            scheduler.submit(index, step(session), session.priority)
+        scheduler.start()
+        scheduler.join()
+        elapsed = time.perf_counter() - begin
+    threads = threading.active_count() - baseline
+    metrics = scheduler.metrics()
+    scheduler.stop()
+
+    print(f"会话：{count}（vip {int(count * vipRatio)}），工作线程：{threads}，模拟I/O：{work * 1000:.1f}ms/步")
+    print(f"总耗时：{elapsed:.2f}s，吞吐：{count / elapsed:.0f} 步/秒，最大队列深度：{metrics['maxDepth']}")
+    for name in ('vip', 'bulk'):
+        wait = metrics['waitMs'][name]
+        print(f"{name:<6}排队时间：p50 {wait['p50']:.1f}ms，p99 {wait['p99']:.1f}ms，最大 {wait['max']:.1f}ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
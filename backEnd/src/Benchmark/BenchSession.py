@@ -0,0 +1,35 @@
+import gc
+import sys
+import tracemalloc
+from src.Interpreter.ScriptCache import parseSource
+from src.Interpreter.Interpreter import Interpreter
+
+SCRIPT_PATH = 'src/Test/Example/test2.txt'
+
+
+def measure(tree, count):
+    """创建 count 个已登录但空闲的会话，返回平均每个会话新增的字节数"""
+    usernames = [f'user{i:06d}' for i in range(count)]  # 用户名本身不计入会话开销
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = {}
+    for username in usernames:
+        interpreter = Interpreter(tree)
+        interpreter.setName(username)
+        interpreter.setInfo('amount', '100')
+        sessions[username] = interpreter
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def main(counts=(10000, 100000)):
+    tree = parseSource(SCRIPT_PATH)
+    print(f"脚本 {SCRIPT_PATH}：{len(tree.getVarName())} 个变量")
+    for count in counts:
+        print(f"{count:>8} 个空闲会话：{measure(tree, count):8.0f} 字节/会话")
+
+
+if __name__ == '__main__':
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (10000, 100000))
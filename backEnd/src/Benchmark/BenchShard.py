@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import http.client
+from urllib.parse import urlencode
+
+USERS_PER_CLIENT = 10
+
+
+def post(connection, path, fields):
+    """发送表单请求，返回状态码"""
+    connection.request('POST', path, body=urlencode(fields),
+                       headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def waitReady(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/metrics')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'端口 {port} 未在 {timeout} 秒内就绪')
+
+
+def measure(port, clients, duration):
+    """clients 个客户端线程各自登录 USERS_PER_CLIENT 个用户，在 duration 秒内循环发送 /telechat，返回每秒请求数"""
+    counts = [0] * clients
+    ready = threading.Barrier(clients + 1)
+    stopAt = [0.0]
+
+    def client(index):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        users = [f'bench{index}-{number}' for number in range(USERS_PER_CLIENT)]
+        for username in users:
+            post(connection, '/register', {'username': username, 'password': 'p'})
+            post(connection, '/login', {'username': username, 'password': 'p'})
+            post(connection, '/clearchat', {'username': username})
+        ready.wait()
+        turn = 0
+        while time.perf_counter() < stopAt[0]:
+            post(connection, '/telechat', {'username': users[turn % len(users)], 'message': '账单'})
+            turn += 1
+        counts[index] = turn
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    stopAt[0] = float('inf')
+    ready.wait()
+    begin = time.perf_counter()
+    stopAt[0] = begin + duration
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - begin)
+
+
+def main(workerCounts=(1, 2, 4), clients=16, duration=5.0, port=5400):
+    """
+    对比单进程直连与 N 个分片工作进程（经路由转发）下 /telechat 的吞吐量。
+    工作进程使用内联调度，不为对话创建线程；客户端与服务端运行在同一台机器上。
+    """
+    env = dict(os.environ, LLM_PROVIDER='', DSL_RELOAD_INTERVAL='0', DSL_RUNTIME='inline')
+    print(f"CPU核数：{os.cpu_count()}，客户端线程：{clients}，每轮 {duration:.0f} 秒")
+    print(f"{'部署':<16}{'请求/秒':>10}")
+    single = subprocess.Popen([sys.executable, '-m', 'src.Interpreter.app'],
+                              env=dict(env, DSL_PORT=str(port), DSL_SHARD_TOKEN='bench'),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        waitReady(port)
+        print(f"{'单进程直连':<16}{measure(port, clients, duration):>10.0f}")
+    finally:
+        single.terminate()
+        single.wait()
+    for workers in workerCounts:
+        router = subprocess.Popen([sys.executable, '-m', 'src.Interpreter.ShardRouter', '--workers', str(workers),
+                                   '--port', str(port), '--base-port', str(port + 1)],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            waitReady(port)
+            print(f"{f'路由+{workers}个分片':<16}{measure(port, clients, duration):>10.0f}")
+        finally:
+            router.terminate()
+            router.wait()
+
+
+if __name__ == '__main__':
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (1, 2, 4))
@@ -0,0 +1,58 @@
+import random
+import sys
+import time
+from src.Interpreter.TimerWheel import TimerWheel, TimerService
+from src.Interpreter.Scheduler import percentile
+
+
+def main(count=100000, spread=3.0, cancelRatio=0.1):
+    """
+    登记 count 个在 spread 秒内陆续到期的Listen超时，取消其中 cancelRatio 的比例，
+    测量登记、取消的开销，以及实际触发时间相对截止时间的延迟（抖动）。
+    """
+    rng = random.Random(1)
+    wheel = TimerWheel()
+    start = time.time()
+    deadlines = {key: start + 0.5 + rng.random() * spread for key in range(count)}
+
+    begin = time.perf_counter()
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline)
+    scheduleCost = (time.perf_counter() - begin) / count
+
+    cancelled = rng.sample(range(count), int(count * cancelRatio))
+    begin = time.perf_counter()
+    for key in cancelled:
+        wheel.cancel(key)
+    cancelCost = (time.perf_counter() - begin) / max(1, len(cancelled))
+    for key in cancelled:
+        del deadlines[key]
+
+    jitters = []
+    batches = []
+
+    def handler(keys):
+        firedAt = time.time()
+        batches.append(len(keys))
+        jitters.extend(firedAt - deadlines[key] for key in keys)
+
+    service = TimerService(wheel, handler)
+    pollCost = 0.0
+    polls = 0
+    while len(wheel):
+        time.sleep(wheel.tick)
+        begin = time.perf_counter()
+        service.pollOnce()
+        pollCost += time.perf_counter() - begin
+        polls += 1
+
+    print(f"待触发定时器：{count}（取消 {len(cancelled)} 个），刻度 {wheel.tick * 1000:.0f}ms")
+    print(f"登记：{scheduleCost * 1e6:.2f} 微秒/个，取消：{cancelCost * 1e6:.2f} 微秒/个")
+    print(f"推进：{polls} 次，共 {pollCost * 1000:.1f}ms（含处理回调），"
+          f"{len(batches)} 批，平均每批 {sum(batches) / max(1, len(batches)):.0f} 个")
+    print(f"触发延迟：p50 {percentile(jitters, 0.5) * 1000:.1f}ms，p99 {percentile(jitters, 0.99) * 1000:.1f}ms，"
+          f"最大 {max(jitters) * 1000:.1f}ms，最小 {min(jitters) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+
+
+class AsyncInputEvent:
+    """
+    协程会话的输入事件，接口与threading.Event一致（set/clear/is_set），
+    任意线程都可以调用set唤醒在事件循环中等待的协程。
+    超时用 call_later 实现，不像 asyncio.wait_for 那样为每次等待额外创建任务。
+    """
+    __slots__ = ('loop', 'flag', 'waiter')
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.flag = False
+        self.waiter = None  # 正在等待的Future
+
+    def set(self):
+        """唤醒等待输入的协程（线程安全）"""
+        self.loop.call_soon_threadsafe(self._set)
+
+    def _set(self):
+        self.flag = True
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(True)
+
+    def clear(self):
+        """清除事件标志（在事件循环中调用）"""
+        self.flag = False
+
+    def is_set(self):
+        return self.flag
+
+    async def wait(self, timeout):
+        """等待输入，超时返回False"""
+        if self.flag:
+            return True
+        waiter = self.loop.create_future()
+        handle = self.loop.call_later(timeout, _expire, waiter)
+        self.waiter = waiter
+        try:
+            return await waiter
+        finally:
+            handle.cancel()
+            self.waiter = None
+
+
+def _expire(waiter):
+    """等待超时"""
+    if not waiter.done():
+        waiter.set_result(False)
+
+
+class AsyncRuntime:
+    """
+    协程调度：每个对话是一个协程，Listen时等待输入事件而不占用线程，
+    所有对话运行在少量事件循环线程上。同一会话总是由同一个事件循环执行。
+    """
+    def __init__(self, loopCount=1):
+        self.loopCount = max(1, loopCount)
+        self.loops = []
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        """启动事件循环线程，已启动时直接返回"""
+        with self.lock:
+            if self.loops:
+                return
+            for index in range(self.loopCount):
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name=f'dsl-loop-{index}', daemon=True)
+                thread.start()
+                self.loops.append(loop)
+                self.threads.append(thread)
+
+    def stop(self):
+        """停止所有事件循环，未结束的对话随之终止"""
+        with self.lock:
+            loops, threads = self.loops, self.threads
+            self.loops, self.threads = [], []
+        for loop in loops:
+            try:
+                asyncio.run_coroutine_threadsafe(self.cancelAll(), loop).result(timeout=1)
+            except Exception as exc:
+                print(f"[AsyncRuntime] 取消对话协程失败: {type(exc).__name__}: {exc}")
+            loop.call_soon_threadsafe(loop.stop)
+        for loop, thread in zip(loops, threads):
+            thread.join(timeout=1)
+            if not thread.is_alive():
+                loop.close()
+
+    @staticmethod
+    async def cancelAll():
+        """取消当前事件循环上的其他协程并等待其结束"""
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def loopFor(self, interpreter):
+        """会话所属的事件循环"""
+        return self.loops[hash(interpreter) % len(self.loops)]
+
+    def startDispatch(self, interpreter, resume=False):
+        """
+        在事件循环上启动（或重新开始）会话的对话协程，返回协程的Future。
+        旧协程随之过期（见 Interpreter.newRun）：被唤醒后发现自己的停止标志已设置即退出，
+        正在执行步骤的输出被丢弃；新协程使用新的事件、停止标志和执行状态。
+        resume 为True时从恢复的快照所停的Listen继续。
+        """
+        self.start()
+        loop = self.loopFor(interpreter)
+        current = interpreter.newRun(AsyncInputEvent(loop), resume)
+        future = asyncio.run_coroutine_threadsafe(self.converse(interpreter, current, resume), loop)
+        interpreter.dispatchThread = future
+        return future
+
+    async def converse(self, interpreter, current, resume=False):
+        """对话协程：与线程调度的 Interpreter.dispatch 执行相同的步骤逻辑"""
+        generation, state, inputEvent, stopEvent, inputs = current
+        loop = asyncio.get_running_loop()
+        # 步骤锁只在不含 await 的步骤执行期间持有，快照方持有它的时间很短（见 Interpreter.parked）
+        with interpreter.stepLock:
+            timeout = interpreter.remaining() if resume else interpreter.begin(state, generation)
+        while timeout is not None and not stopEvent.is_set():
+            # 与 Interpreter.getInput 相同：输入连同票据在队列中，每个Listen按提交顺序取走一条
+            deadline = loop.time() + timeout
+            while not inputs and not stopEvent.is_set() and loop.time() < deadline:
+                await inputEvent.wait(deadline - loop.time())
+                inputEvent.clear()
+            if stopEvent.is_set():
+                return
+            received = inputs.popleft() if inputs else None
+            intent = None
+            if received is not None and getattr(interpreter.intentService, 'enabled', False):
+                # 意图识别会发起阻塞的HTTP请求，放到线程池中执行以免阻塞事件循环
+                intent = await loop.run_in_executor(None, interpreter.matchIntent, received[0])
+            with interpreter.stepLock:
+                if stopEvent.is_set():
+                    return  # 已在快照点停止
+                timeout = interpreter.afterListen(state, generation, received, intent)
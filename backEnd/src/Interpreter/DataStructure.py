@@ -1,10 +1,25 @@
+import threading
+from types import MappingProxyType
+
+UNSET = object()  # 用户表中尚未设置的变量槽位（与值为None的已设置变量区分）
+_extraLock = threading.Lock()  # 创建 UserTable.extra 字典时使用
+
+
 class Root:
+    __slots__ = ('stepTable', 'mainStep', 'varName', 'branchTable', 'name',
+                 'program', 'stepNames', 'stepIndex', 'mainIndex', 'varIndex')
+
     def __init__(self):
         """初始化根类的各个属性"""
         self.stepTable = dict()  # 步骤表，存储步骤ID和步骤内容
         self.mainStep = None  # 主要步骤
         self.varName = []  # 存储变量名
-        self.branchTable = dict()  # 分支表，存储分支ID和分支内容
+        self.branchTable = dict()  # 分支表，存储步骤ID和该步骤的分支（关键词 -> 目标步骤）
+        self.program = None  # 链接后的步骤数组，跳转目标为整数下标
+        self.stepNames = None  # 步骤下标 -> 步骤ID
+        self.stepIndex = None  # 步骤ID -> 步骤下标
+        self.mainIndex = None  # 主要步骤的下标
+        self.varIndex = None  # 变量名 -> 变量槽位下标（符号表）
 
     def getStep(self):
         """获取步骤表"""
@@ -47,9 +62,43 @@ class Root:
         """向分支表中添加分支"""
         self.branchTable[branchID] = branch
 
+    def setProgram(self, program, stepNames, varIndex):
+        """设置链接后的步骤数组、步骤ID与下标的对应关系以及变量符号表"""
+        self.program = program
+        self.stepNames = stepNames
+        self.stepIndex = {stepID: index for index, stepID in enumerate(stepNames)}
+        self.mainIndex = self.stepIndex.get(self.mainStep)
+        self.varIndex = varIndex
+
+    def isLinked(self):
+        """是否已完成链接"""
+        return self.program is not None
+
+    def getProgram(self):
+        """获取链接后的步骤数组"""
+        return self.program
+
+    def getStepNames(self):
+        """获取步骤下标到步骤ID的映射"""
+        return self.stepNames
+
+    def getStepIndex(self):
+        """获取步骤ID到步骤下标的映射"""
+        return self.stepIndex
+
+    def getMainIndex(self):
+        """获取主要步骤的下标"""
+        return self.mainIndex
+
+    def getVarIndex(self):
+        """获取变量名到变量槽位下标的映射"""
+        return self.varIndex
+
 
 
 class Step:
+    __slots__ = ('stepID', 'step')
+
     def __init__(self):
         """初始化步骤类的属性"""
         self.stepID = None  # 步骤ID
@@ -74,6 +123,8 @@ class Step:
 
 
 class Expression:
+    __slots__ = ('expr',)
+
     def __init__(self):
         """初始化表达式类的属性"""
         self.expr = []  # 存储表达式的列表
@@ -87,20 +138,101 @@ class Expression:
         return self.expr
     
 
+class VarRef:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        """表达式中的变量引用，与字符串字面量区分开"""
+        self.name = name  # 变量名（不含 $）
+
+    def __eq__(self, other):
+        return isinstance(other, VarRef) and other.name == self.name
+
+    def __hash__(self):
+        return hash(('$', self.name))
+
+    def __repr__(self):
+        return f"${self.name}"
+
+
+class Diagnostic:
+    __slots__ = ('severity', 'message', 'line', 'column')
+
+    def __init__(self, severity, message, line=None, column=None):
+        """初始化诊断信息，行号和列号未知时为None"""
+        self.severity = severity  # 严重程度：error 或 warning
+        self.message = message  # 诊断内容
+        self.line = line  # 所在行号
+        self.column = column  # 所在列号
+
+    def __str__(self):
+        """格式化为可读的诊断文本"""
+        position = f" (第{self.line}行第{self.column}列)" if self.line is not None else ''
+        return f"{self.severity.capitalize()}: {self.message}{position}"
+
+    def __repr__(self):
+        return f"Diagnostic({self.severity!r}, {self.message!r}, {self.line!r}, {self.column!r})"
+
+
 class UserTable:
-    def __init__(self, varName):
-        """初始化用户表类的属性"""
-        self.userTable = dict()  # 用户表，存储用户信息
+    __slots__ = ('varName', 'varIndex', 'values', 'extra')
+
+    def __init__(self, varName, varIndex=None):
+        """初始化用户表类的属性，变量名和符号表由同一脚本的所有会话共享"""
         self.varName = varName  # 变量名
+        self.varIndex = varIndex if varIndex is not None else {name: i for i, name in enumerate(varName)}
+        # 按符号表下标存放的变量值，供Speak模板直接取用；未设置的为 UNSET。
+        # 设置变量只写自己的槽位（一次列表元素赋值），/setinfo 与对话并发写不同变量时不会互相覆盖
+        self.values = [UNSET] * len(varName)
+        self.extra = None  # 脚本中未使用的其他信息，用到时才创建字典
+
+    @property
+    def userTable(self):
+        """用户表，同 getTable"""
+        return self.getTable()
 
     def setName(self, name):
         """设置用户名称"""
-        self.userTable['name'] = name
+        self.setUser('name', name)
 
     def setUser(self, infoName, userInfo):
         """设置用户信息"""
-        self.userTable[infoName] = userInfo
+        index = self.varIndex.get(infoName)
+        if index is not None:
+            self.values[index] = userInfo
+        else:
+            if self.extra is None:
+                with _extraLock:
+                    if self.extra is None:
+                        self.extra = {}
+            self.extra[infoName] = userInfo
 
     def getTable(self):
-        """获取用户表"""
-        return self.userTable
+        """
+        获取用户表：已设置的用户信息 {名称: 值}，未设置的变量不在其中。
+        返回只读的快照，修改须通过 setUser；需要可修改的字典时用 dict(getTable())。
+        """
+        table = {name: value for name, value in zip(self.varName, self.values) if value is not UNSET}
+        if self.extra:
+            table.update(self.extra)
+        return MappingProxyType(table)
+
+    def getValues(self):
+        """获取按符号表下标排列的变量值，未设置的为 UNSET"""
+        return self.values
+
+    def rebind(self, varName, varIndex):
+        """切换到新的符号表（例如脚本热加载后），按变量名重新排列变量值"""
+        table = self.getTable()
+        values = [UNSET] * len(varName)
+        extra = None
+        for infoName, userInfo in table.items():
+            index = varIndex.get(infoName)
+            if index is not None:
+                values[index] = userInfo
+            else:
+                if extra is None:
+                    extra = {}
+                extra[infoName] = userInfo
+        # 新的符号表和变量值一起替换，不出现新旧混用的中间状态
+        self.varName, self.varIndex, self.values, self.extra = varName, varIndex, values, extra
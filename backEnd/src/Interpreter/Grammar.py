@@ -1,64 +1,52 @@
-from src.Interpreter.DataStructure import Root, Step, Expression
+from src.Interpreter.DataStructure import Root, Step, Diagnostic, VarRef
 
 
 class Grammar:
+    """
+    表驱动的语法分析器。每个步骤编译为指令元组组成的元组，
+    例如 ('Speak', '您好'), ('Listen', '5'), ('Branch',), ('Default', 'end')。
+    解析过程中的问题收集到诊断列表中，不会中断解析。
+    """
     def __init__(self, tokens):
         """
-        初始化，接收tokens并创建语法树、步骤和表达式
+        初始化，接收tokens并创建语法树和当前步骤
         """
         self.tokens = tokens
         self.grmTree = Root()  # 语法树根节点
         self.step = Step()  # 当前步骤
-        self.expr = Expression()  # 当前表达式
+        self.branches = {}  # 当前步骤的分支表：关键词 -> 目标步骤
         self.isAppend = False  # 标记是否已经追加Branch
+        self.diagnostics = []  # 诊断信息列表
         self.processTokens()  # 开始处理tokens
 
     def processTokens(self):
         """
-        遍历所有tokens，根据类型调用不同的处理函数
+        遍历所有tokens，按类型查表分派到对应的处理函数
         """
+        handlers = self.HANDLERS
         for token in self.tokens:
-            if token[0] == "Step":
-                self.processStep(token)
-            elif token[0] == "Speak":
-                self.processSpeak(token)
-            elif token[0] == "Expression":
-                self.processExpression(token)
-            elif token[0] == "Listen":
-                self.processListen(token)
-            elif token[0] == "Branch":
-                self.processBranch(token)
-            elif token[0] == "Silence":
-                self.processSilence(token)
-            elif token[0] == "Default":
-                self.processDefault(token)
-            elif token[0] == "Exit":
-                self.processExit(token)
-            else:
-                # 如果遇到未知类型的token，输出错误并停止处理
-                print("Unknown token type:", token[0])
-                break
+            handler = handlers.get(token[0])
+            if handler is None:
+                self.processError(token, f"Unknown token type: {token[0]}")
+                continue
+            handler(self, token)
         self.appendToTree()  # 处理完tokens后，追加到语法树
 
     def appendToTree(self):
         """
-        将当前步骤添加到语法树并重置步骤对象
+        将当前步骤以元组形式添加到语法树，登记该步骤自己的分支表，并重置步骤对象
         """
-        self.grmTree.addStep(self.step.getStepID(), self.step.getStep())
+        self.grmTree.addStep(self.step.getStepID(), tuple(self.step.getStep()))
+        if self.branches:
+            self.grmTree.addBranch(self.step.getStepID(), self.branches)
         self.step = Step()  # 重置步骤对象
+        self.branches = {}  # 重置分支表
         self.isAppend = False  # 重置标记
 
-    def appendExpr(self, token, num):
-        """将表达式的内容添加到当前步骤"""
-        for i in range(num):
-            self.expr.addExpr(token[i])
-        self.step.addStep(self.expr.getExpr())  # 将表达式加入步骤
-        self.expr = Expression()  # 重置表达式对象
-
     def processStep(self, token):
         """处理Step类型的token"""
         if len(token) < 2:
-            self.processError(token)  # 如果token不合法，抛出错误
+            self.processError(token)  # 如果token不合法，记录错误
             return
         if self.grmTree.getMainStep() is None:
             self.grmTree.setMainStep(token[1])  # 设置主步骤
@@ -70,68 +58,97 @@ class Grammar:
         """
         处理Speak类型的token，Speak类型的流程包含表达式
         """
-        self.processExpression(token)  # 解析表达式
-        self.step.addStep(self.expr.getExpr())  # 将表达式添加到步骤
-        self.expr = Expression()  # 重置表达式对象
+        self.step.addStep(self.compileExpression(token))
 
     def processExpression(self, token):
         """
         处理Expression类型的token
         """
-        self.expr.addExpr(token[0])  # 添加第一个词法单元到表达式
-        for i in range(1, len(token)):
-            if token[i] == '+': continue  # 跳过 '+' 符号
-            elif token[i][0] == '$':  # 变量名以 $ 开头
-                self.grmTree.addVarName(token[i][1:])  # 添加变量到语法树
-                self.expr.addExpr(token[i][1:])  # 将变量名加入表达式
-            elif token[i][0] == '"' and token[i][-1] == '"':  # 如果字符串用双引号括起来
-                self.expr.addExpr(token[i][1:-1])  # 去掉引号并加入表达式
+        self.step.addStep(self.compileExpression(token))
+
+    def compileExpression(self, token):
+        """
+        编译表达式为指令元组：跳过 '+'，变量登记后以VarRef表示，字符串去掉引号
+        """
+        expr = [token[0]]
+        for word in token[1:]:
+            if word == '+': continue  # 跳过 '+' 符号
+            elif word[0] == '$':  # 变量名以 $ 开头
+                self.grmTree.addVarName(word[1:])  # 添加变量到语法树
+                expr.append(VarRef(word[1:]))  # 将变量引用加入表达式
+            elif len(word) > 1 and word[0] == '"' and word[-1] == '"':  # 如果字符串用双引号括起来
+                expr.append(word[1:-1])  # 去掉引号并加入表达式
             else:
-                self.processError(token[i])  # 其他不合法token抛出错误
+                self.processError(token, f"Invalid token {word}")  # 其他不合法token记录错误
+        return tuple(expr)
 
     def processListen(self, token):
         """
         处理Listen类型的token，表示一个等待步骤
         """
-        if len(token) != 2:
-            self.processError(token)  # 长度不合法，抛出错误
-        self.appendExpr(token, len(token))  # 将token添加为表达式并加入步骤
+        if len(token) != 2 or not token[1].isdigit():
+            self.processError(token)  # 长度或时长不合法，记录错误
+            return
+        self.step.addStep((token[0], token[1]))
 
     def processBranch(self, token):
         """
         处理Branch类型的token，表示一个分支
         """
-        if len(token) != 3:
-            self.processError(token)  # 长度不合法，抛出错误
+        if len(token) != 3 or len(token[1]) < 2 or token[1][0] != '"' or token[1][-1] != '"':
+            self.processError(token)  # 长度或关键词不合法，记录错误
+            return
         if not self.isAppend:
-            self.appendExpr(token, 1)  # 分支前必须有一个表达式
+            self.step.addStep((token[0],))  # 每个步骤只保留一条分支指令
             self.isAppend = True  # 标记分支已添加
-        self.grmTree.addBranch(token[1][1:-1], token[2])  # 添加分支到语法树
+        keyword = token[1][1:-1]
+        if keyword in self.branches:
+            # 同一步骤内关键词重复时以先声明的为准
+            self.processError(token, f"Duplicate branch keyword {keyword}", 'warning')
+            return
+        self.branches[keyword] = token[2]  # 添加分支到当前步骤的分支表
 
-    def processSilence(self, token):
+    def processJump(self, token):
         """
-        处理Silence类型的token，表示静默步骤
+        处理Silence和Default类型的token，表示跳转到指定步骤
         """
         if len(token) != 2:
-            self.processError(token)  # 长度不合法，抛出错误
-        self.appendExpr(token, len(token))  # 将token作为表达式加入步骤
-
-    def processDefault(self, token):
-        """处理Default类型的token，表示默认操作"""
-        if len(token) != 2:
-            self.processError(token)  # 长度不合法，抛出错误
-        self.appendExpr(token, len(token))  # 将token作为表达式加入步骤
+            self.processError(token)  # 长度不合法，记录错误
+            return
+        self.step.addStep((token[0], token[1]))
 
     def processExit(self, token):
         """处理Exit类型的token，表示退出操作"""
         if len(token) > 1:
-            self.processError(token)  # 长度不合法，抛出错误
-        self.appendExpr(token, len(token))  # 将token作为表达式加入步骤
+            self.processError(token)  # 长度不合法，记录错误
+            return
+        self.step.addStep((token[0],))
+
+    def processError(self, token, message=None, severity='error'):
+        """记录诊断信息，token带有位置信息时一并记录"""
+        if message is None:
+            message = f"Invalid token {list(token)}"
+        self.diagnostics.append(Diagnostic(
+            severity, message, getattr(token, 'line', None), getattr(token, 'column', None)))
+
+    HANDLERS = {
+        'Step': processStep,
+        'Speak': processSpeak,
+        'Expression': processExpression,
+        'Listen': processListen,
+        'Branch': processBranch,
+        'Silence': processJump,
+        'Default': processJump,
+        'Exit': processExit,
+    }
+
+    def getDiagnostics(self):
+        """获取诊断信息列表"""
+        return self.diagnostics
 
-    @staticmethod
-    def processError(token):
-        """输出错误信息"""
-        print(f"Error: Invalid token {token}")
+    def hasErrors(self):
+        """是否存在错误级别的诊断"""
+        return any(diagnostic.severity == 'error' for diagnostic in self.diagnostics)
 
     def getGrmTree(self):
         """获取语法树对象"""
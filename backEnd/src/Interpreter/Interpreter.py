@@ -1,25 +1,62 @@
+import itertools
 import threading
+import time
 from collections import deque
-from src.Interpreter.DataStructure import UserTable
-from src.Interpreter.intent_service import IntentService
+from src.Interpreter.intent_service import shared_intent_service
+from src.Interpreter.Linker import link
+from src.Interpreter.ResultLog import ResultLog
+from src.Interpreter.StateMachine import SessionState, run, resume, applyIntent, feed as feedState, START, TIMEOUT
+
+generations = itertools.count(1)  # 调度的代数，全局递增（next 在多线程下也不会重复）
 
 class Interpreter:
-    def __init__(self, tree):
+    __slots__ = ('state', 'inputEvent', 'resultQueue', 'stopEvent', 'dispatchThread', 'intentService', 'priority',
+                 'generation', 'stepLock', 'inputs')
+
+    def __init__(self, tree, source=None):
         """
         初始化解释器，接收语法树并设置必要的变量。
+        source 为可选的脚本句柄（提供 getTree），用于在步骤边界切换到热加载后的新版本。
+        语法树、符号表和意图服务由所有会话共享；线程事件和结果队列在开始调度时才创建，
+        因此空闲会话只占用少量内存。执行位置保存在 SessionState 中，可由线程或协程驱动。
         """
-        self.tree = tree  # 语法树
-        self.userTable = UserTable(tree.getVarName())  # 用户数据表，存储变量
-        self.mainStep = tree.getMainStep()  # 主步骤
-        self.curStep = None  # 当前步骤
-        self.userInput = None  # 用户输入
-        self.inputEvent = threading.Event()  # 线程事件，用于等待输入
-        self.resultLock = threading.Lock()  # 线程锁，确保结果队列的线程安全访问
-        self.resultQueue = deque()  # 最新结果缓存队列
-        self.stopEvent = threading.Event()  # 停止标志
-        self.dispatchThread = None  # 当前调度线程
-        self.intentService = IntentService()
-        self.intentMeta = None
+        if not tree.isLinked():
+            link(tree)  # 未链接的语法树在此链接，存在悬空引用时抛出LinkError
+        self.state = SessionState(tree, source)  # 执行状态
+        self.inputEvent = None  # 输入事件，用于等待输入
+        self.resultQueue = None  # 输出日志（ResultLog），带序号，可逐条取走或按序号推送
+        self.stopEvent = None  # 停止标志
+        self.dispatchThread = None  # 当前调度线程（协程模式下为协程的Future）
+        self.intentService = shared_intent_service()
+        self.priority = 'normal'  # 线程池调度的优先级类别
+        self.generation = 0  # 当前调度的代数，与之不同的调度已过期
+        self.stepLock = threading.Lock()  # 线程、协程调度执行步骤时持有，等待输入时释放（见 parked）
+        self.inputs = None  # 线程、协程调度下尚未取走的输入队列 [(输入, 票据)]，提交输入时才创建
+
+    @property
+    def tree(self):
+        """当前使用的语法树（热加载后在步骤边界切换）"""
+        return self.state.tree
+
+    @property
+    def source(self):
+        """脚本句柄"""
+        return self.state.source
+
+    @property
+    def userTable(self):
+        """用户数据表"""
+        return self.state.userTable
+
+    @property
+    def userInput(self):
+        """最近一次用户输入"""
+        return self.state.userInput
+
+    @property
+    def intentMeta(self):
+        """最近一次意图识别的结果"""
+        return self.state.intentMeta
 
     def setName(self, name):
         """设置用户名称"""
@@ -38,148 +75,244 @@ class Interpreter:
         table = self.userTable.getTable()
         return {key: table.get(key) for key in self.tree.getVarName()}
 
-    def setUserInput(self, userInput):
-        """设置用户输入并触发事件"""
-        self.userInput = userInput
-        self.intentMeta = None
-        self.inputEvent.set()  # 设置事件，表示用户输入已准备好
+    def setUserInput(self, userInput, ticket=None):
+        """
+        提交用户输入并触发事件；ticket 为同步请求的票据，该输入执行到下一个 Listen 或 Exit 时应答。
+        输入连同票据排入队列，调度在每个Listen按提交顺序取走一条，执行步骤期间到达的输入不会改写正在使用的输入。
+        """
+        inputs = self.inputs
+        if inputs is None:
+            inputs = self.inputs = deque()
+        inputs.append((userInput, ticket))
+        if self.inputEvent is not None:
+            self.inputEvent.set()  # 设置事件，表示用户输入已准备好
 
     def requestStop(self):
-        """请求停止当前调度"""
+        """请求停止当前调度：调度随即过期，之后的输出被丢弃"""
+        if self.stopEvent is None:
+            return  # 尚未开始调度
+        with self.resultLog().cond:  # 与过期检查、追加输出互斥（见 emitter）
+            self.generation = next(generations)
         self.stopEvent.set()
         self.inputEvent.set()  # 确保阻塞的监听被唤醒
 
-    def isDispatching(self):
-        return self.dispatchThread is not None and self.dispatchThread.is_alive()
+    def newRun(self, inputEvent, resume=False):
+        """
+        开始新一轮调度，返回本轮的 (代数, 执行状态, 输入事件, 停止标志, 输入队列)。
+        之前的调度随即过期：停止标志被设置、等待输入的被唤醒，仍在执行步骤的在结束当前步骤后自行退出，
+        其输出被丢弃，不必等它退出。重新开始对话时换用新的执行状态对象（共用用户数据表），
+        过期调度仍持有旧对象，两者不会同时修改同一个执行状态。resume 为True时沿用当前执行状态，
+        否则在旧调度过期之后丢弃上一段对话未取走的输出（序号继续递增），过期调度不会再写入新对话的日志。
+        重新开始时上一段对话未取走的输入同样丢弃（应答其票据，同步等待的请求立即返回）；resume 时保留。
+        """
+        self.requestStop()
+        generation = next(generations)
+        if not resume:
+            self.state = self.state.fork()
+        dropped = () if resume else self.inputs or ()
+        inputs = self.inputs = self.inputs if resume and self.inputs is not None else deque()
+        self.inputEvent = inputEvent
+        self.stopEvent = threading.Event()
+        results = self.resultLog()
+        with results.cond:
+            if not resume:
+                results.discard()
+            self.generation = generation
+        for _, ticket in dropped:
+            results.answer(ticket)
+        return generation, self.state, inputEvent, self.stopEvent, inputs
 
-    def startDispatch(self):
-        """启动新的调度线程，若已有线程运行则先停止"""
-        if self.isDispatching():
-            self.requestStop()
-            self.dispatchThread.join(timeout=1)
+    def resultLog(self):
+        """输出日志，首次使用时创建"""
+        if self.resultQueue is None:
+            self.resultQueue = ResultLog()
+        return self.resultQueue
 
-        self.stopEvent.clear()
+    def isDispatching(self):
+        worker = self.dispatchThread
+        if worker is None:
+            return False
+        return worker.is_alive() if isinstance(worker, threading.Thread) else not worker.done()
+
+    def startDispatch(self, runtime=None, resume=False):
+        """
+        启动新的调度线程并立即返回，已有的调度随之过期、自行退出（见 newRun），不等待其结束。
+        runtime 为 AsyncRuntime 时改为在其事件循环上以协程执行对话；resume 含义同 dispatch。
+        """
+        if runtime is not None:
+            return runtime.startDispatch(self, resume)
+        current = self.newRun(threading.Event(), resume)
 
         def _runner():
             try:
-                self.dispatch()
+                self.dispatch(resume, current)
             finally:
-                self.stopEvent.clear()
-                self.dispatchThread = None
+                if self.dispatchThread is thread:
+                    self.dispatchThread = None
+
+        thread = threading.Thread(target=_runner, daemon=True)
+        self.dispatchThread = thread
+        thread.start()
+        return thread
+
+    def parked(self):
+        """
+        持有步骤锁的上下文：期间线程、协程调度停在Listen（或尚未开始、已经结束），不会执行到步骤中途，
+        执行状态可以安全地做快照；在其中 requestStop 后调度不再开始新的步骤。
+        """
+        return self.stepLock
+
+    def snapshot(self):
+        """
+        会话快照（可JSON序列化）：执行状态、用户变量、未取走的结果、脚本ID和优先级。
+        """
+        data = self.state.snapshot()
+        data['script'] = getattr(self.state.source, 'scriptID', None)
+        data['results'] = list(self.resultQueue or ())
+        if self.resultQueue is not None:
+            data['resultSeq'] = self.resultQueue.firstSeq()  # 首条结果的序号，恢复后事件ID保持连续
+            data['resultEpoch'] = self.resultQueue.epoch
+        data['priority'] = self.priority
+        if self.inputs:
+            data['inputs'] = [userInput for userInput, _ in self.inputs]  # 尚未取走的输入，票据不随快照保存
+        return data
 
-        self.dispatchThread = threading.Thread(target=_runner, daemon=True)
-        self.dispatchThread.start()
+    @classmethod
+    def restore(cls, data, tree, source=None):
+        """由快照恢复解释器；停在Listen的对话需要调用 startDispatch(resume=True) 或 feed 继续"""
+        interpreter = cls(tree, source)
+        interpreter.state = SessionState.restore(data, interpreter.tree, source)
+        if data.get('results') or data.get('resultEpoch'):
+            interpreter.resultQueue = ResultLog(data.get('results', ()), data.get('resultSeq', 1), data.get('resultEpoch'))
+        interpreter.priority = data.get('priority', interpreter.priority)
+        if data.get('inputs'):
+            interpreter.inputs = deque((userInput, None) for userInput in data['inputs'])
+        return interpreter
 
     def getLatestResult(self):
         """获取并清除最新结果"""
-        with self.resultLock:
-            if self.resultQueue:
-                return self.resultQueue.popleft()
+        if self.resultQueue is None:
+            return None  # 尚未开始调度
+        try:
+            return self.resultQueue.popleft()
+        except IndexError:  # 没有新结果
             return None
 
-    def _pushResult(self, message):
-        """线程安全地追加结果"""
-        with self.resultLock:
-            self.resultQueue.append(message)
+    def _pushResult(self, message, valid=None):
+        """线程安全地追加结果，并唤醒等待推送的连接；valid 含义同 ResultLog.append，返回是否追加"""
+        return self.resultLog().append(message, valid) is not None
+
+    def emit(self, message):
+        """输出一条结果"""
+        print(message)
+        self._pushResult(message)  # 保存最新结果
 
-    def dispatch(self):
+    def emitter(self, generation):
         """
-        根据语法树执行步骤调度，处理不同的状态。
+        第 generation 代调度的输出函数，调度过期后输出被丢弃。
+        代数检查与追加在日志的锁内一起完成，与 requestStop、newRun 改变代数互斥。
         """
-        stepName = self.mainStep  # 从主步骤开始
-        isInTime = False  # 是否在合适的时间点进行分支
-        while stepName and not self.stopEvent.is_set():
-            stepTable = self.tree.getStep()
-            if stepName not in stepTable:
-                print(f"错误：步骤 '{stepName}' 不存在")
-                self._pushResult(f"系统错误：未知步骤 {stepName}")
-                return
-            self.curStep = stepTable[stepName]  # 获取当前步骤
-            flag = False  # 标记，用于跳过无效步骤
-
-            for state in self.curStep:
-                if self.stopEvent.is_set():
-                    return
-                if state[0] == 'Speak':
-                    self.doSpeak(state)  # 执行说话操作
-                elif state[0] == 'Listen':
-                    isInTime = self.doListen(state)  # 执行监听操作
-                    if self.stopEvent.is_set():
-                        return
-                elif state[0] == 'Branch':
-                    if isInTime:
-                        # 处理分支，根据用户输入决定跳转到哪个步骤
-                        keyList = list(self.tree.getBranch().keys())
-                        isBreak = False
-                        for i in range(len(self.tree.getBranch())):
-                            if keyList[i] in self.userInput:
-                                stepName = self.tree.getBranch()[keyList[i]]
-                                isBreak = True
-                                break
-                        if isBreak:
-                            break
-                        else:
-                            flag = True
-                    else:
-                        continue
-                elif state[0] == 'Silence':
-                    # 如果没有分支需要跳转，继续执行下一个步骤
-                    if flag:
-                        flag = False
-                        continue
-                    stepName = state[1]  # 跳转到下一个步骤
-                    break
-                elif state[0] == 'Default':
-                    stepName = state[1]  # 执行默认步骤
-                    break
-                elif state[0] == 'Exit':
-                    return  # 执行退出操作，结束执行
-
-    def doSpeak(self, state):
-        """
-        执行输出语句，拼接表达式并输出。
-        """
-        expression = ''
-        for i in range(1, len(state)):
-            # 替换表达式中的变量
-            if state[i] in self.tree.getVarName():
-                value = self.userTable.getTable().get(state[i])
-                expression += str(value) if value is not None else f'[{state[i]}]'
-            else:
-                expression += state[i]  # 如果不是变量，直接拼接
-        print(expression)  # 输出表达式
-        self._pushResult(expression)  # 保存最新结果
-        return
-
-    def doListen(self, state):
-        """
-        执行监听操作，等待用户输入。
-        """
-        self.userInput = None
-        self.inputEvent.clear()  # 清除输入事件标志，等待用户输入
-        isInTime = self.getInput(int(state[1]))  # 等待输入，超时后返回
-        if isInTime and self.userInput:
-            intent_result = self.intentService.match_intent(self.userInput)
-            self.intentMeta = intent_result
-            intent_keyword = intent_result.get('intent')
-            if intent_keyword and intent_keyword not in self.userInput:
-                self.userInput = f"{self.userInput} {intent_keyword}"
-        if not isInTime:
-            hasSilenceHandler = any(step[0] == 'Silence' for step in self.curStep)
-            if not hasSilenceHandler:
-                self._pushResult("系统检测到您长时间未输入，如需继续请重新输入。")
-        return isInTime
-
-    def getInput(self, timeout):
-        """
-        等待用户输入，超时则返回False。
-        """
-        isSet = self.inputEvent.wait(timeout)  # 等待用户输入事件触发
-        if self.stopEvent.is_set():
-            return False
-        if isSet:
-            print(f"用户输入：{self.userInput}")
-            return True  # 用户输入有效
+        def current():
+            return generation == self.generation
+
+        def emit(message):
+            if self._pushResult(message, current):
+                print(message)
+        return emit
+
+    def begin(self, state, generation):
+        """从主步骤开始执行到第一个Listen，返回等待的秒数，对话结束时返回None"""
+        state.restart()
+        return self.waitFor(state, generation, run(state, self.emitter(generation)))
+
+    def afterListen(self, state, generation, received, intent=None):
+        """
+        Listen结束后继续执行到下一个Listen，返回值同 begin。received 为取走的 (输入, 票据)，超时为None；
+        intent 为在步骤锁外预先识别的输入意图（见 matchIntent），省略时在此识别。
+        """
+        ticket = None
+        if received is not None:
+            state.userInput, ticket = received
+            state.intentMeta = None
+            print(f"用户输入：{state.userInput}")
+            applyIntent(state, self.intentService, intent)
         else:
             print("超时")
-            return False  # 超时未输入
+        return self.waitFor(state, generation, resume(state, received is not None, self.emitter(generation)), ticket)
+
+    def waitFor(self, state, generation, timeout, ticket=None):
+        """
+        记录当前Listen的超时时间点，便于快照和恢复；ticket 为本轮所处理输入的票据，在此应答（唤醒同步等待的请求）。
+        原样返回等待秒数。
+        """
+        state.deadline = None if timeout is None else time.time() + timeout
+        if generation == self.generation:
+            self.resultLog().answer(ticket)
+        return timeout
+
+    def remaining(self):
+        """从快照恢复后，当前Listen还需等待的秒数；未停在Listen时返回None"""
+        deadline = self.state.deadline
+        return None if deadline is None else max(0.0, deadline - time.time())
+
+    def matchIntent(self, text):
+        """识别输入的意图，不访问会话状态，可在会话锁外调用；结果交给 feed 的 intent 参数"""
+        return self.intentService.match_intent(text) if text else None
+
+    def feed(self, event, text=None, now=None, ticket=None, intent=None):
+        """
+        内联推进对话，不创建线程：输出追加到结果队列，返回下一次超时的时间点（对话结束时为None）。
+        event 为 StateMachine 中的 START、INPUT 或 TIMEOUT；ticket 为 INPUT 所属同步请求的票据，处理完后应答。
+        intent 为预先识别的意图（见 matchIntent），省略时在此识别。
+        """
+        results = self.resultLog()
+        if event == START:
+            results.discard()  # 重新开始对话，丢弃上一段对话未取走的输出（序号继续递增）
+        outputs, deadline = feedState(self.state, event, text, now, self.intentService, intent)
+        for message in outputs:
+            print(message)
+        results.extend(outputs)
+        results.answer(ticket)  # 输入被忽略（例如对话已结束）时同样应答，同步等待的请求立即返回
+        return deadline
+
+    def expire(self, now=None):
+        """内联模式下检查Listen是否已超时，超时则按超时推进，返回下一次超时的时间点"""
+        deadline = self.state.deadline
+        if deadline is None or (now if now is not None else time.time()) < deadline:
+            return deadline
+        return self.feed(TIMEOUT, now=now)
+
+    def dispatch(self, resume=False, current=None):
+        """
+        在当前线程中执行调度：每次Listen阻塞等待输入或超时。
+        resume 为True时从恢复的快照所停的Listen继续，否则从主步骤开始。
+        current 为 newRun 的结果，省略时在此开始新一轮调度。
+        """
+        generation, state, inputEvent, stopEvent, inputs = current or self.newRun(threading.Event(), resume)
+        with self.stepLock:
+            timeout = self.remaining() if resume else self.begin(state, generation)
+        while timeout is not None and not stopEvent.is_set():
+            received = self.getInput(timeout, inputEvent, stopEvent, inputs)
+            if stopEvent.is_set():
+                return
+            intent = self.matchIntent(received[0]) if received is not None else None  # 可能较慢，不持有步骤锁
+            with self.stepLock:
+                if stopEvent.is_set():
+                    return  # 已在快照点停止（见 parked）
+                timeout = self.afterListen(state, generation, received, intent)
+
+    def getInput(self, timeout, inputEvent, stopEvent, inputs):
+        """
+        等待用户输入，返回取走的 (输入, 票据)，超时或停止时返回None。
+        执行步骤期间到达的输入已在队列中，在此立即取走；每次只取一条，其余留给之后的Listen。
+        """
+        deadline = time.monotonic() + timeout
+        while not inputs and not stopEvent.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            inputEvent.wait(remaining)  # 等待用户输入事件触发
+            inputEvent.clear()  # 先清除再检查队列，清除之后提交的输入会再次触发事件
+        if stopEvent.is_set():
+            return None
+        return inputs.popleft()
@@ -0,0 +1,97 @@
+from collections import deque
+
+# 关键词数量达到该值时才构建Aho-Corasick自动机，较少时逐个做子串查找（C实现）总是更快
+AUTOMATON_THRESHOLD = 32
+# 代价模型（单位约为1ns，见 src/Benchmark/BenchBranch.py 的测量）：
+# 逐个查找 ≈ 关键词数 × (LOOP_BASE_COST + 输入长度)，自动机 ≈ AUTOMATON_CHAR_COST × 输入长度 + AUTOMATON_BASE_COST
+LOOP_BASE_COST = 50
+AUTOMATON_CHAR_COST = 175
+AUTOMATON_BASE_COST = 400
+NO_MATCH = 1 << 30
+
+
+class KeywordMatcher:
+    """
+    分支关键词匹配器。多个关键词同时出现在输入中时，以先声明的关键词为准。
+    关键词较多时编译为Aho-Corasick自动机，只需扫描一次输入；
+    每次匹配按代价模型在自动机和逐个子串查找之间选择更快的一种，两者结果一致。
+    """
+    __slots__ = ('branches', 'goto', 'fail', 'output')
+
+    def __init__(self, branches, threshold=AUTOMATON_THRESHOLD):
+        """branches 为按声明顺序排列的 (关键词, 目标) 序列"""
+        self.branches = tuple(branches)
+        self.goto = None  # 状态转移表，每个状态一个 {字符: 下一状态}
+        self.fail = None  # 失配指针
+        self.output = None  # 每个状态（含失配链）能识别的关键词中最小的声明序号
+        if len(self.branches) >= threshold:
+            self.build()
+
+    def build(self):
+        """构建Aho-Corasick自动机"""
+        goto = [{}]
+        output = [NO_MATCH]
+        for index, (keyword, _) in enumerate(self.branches):
+            state = 0
+            for char in keyword:
+                nextState = goto[state].get(char)
+                if nextState is None:
+                    nextState = len(goto)
+                    goto[state][char] = nextState
+                    goto.append({})
+                    output.append(NO_MATCH)
+                state = nextState
+            output[state] = min(output[state], index)
+
+        # 广度优先计算失配指针，并沿失配链合并输出
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nextState in goto[state].items():
+                failState = fail[state]
+                while failState and char not in goto[failState]:
+                    failState = fail[failState]
+                fail[nextState] = goto[failState].get(char, 0)
+                output[nextState] = min(output[nextState], output[fail[nextState]])
+                queue.append(nextState)
+
+        self.goto = goto
+        self.fail = fail
+        self.output = output
+
+    def isAutomaton(self):
+        """是否使用自动机匹配"""
+        return self.goto is not None
+
+    def getBranches(self):
+        """获取按声明顺序排列的 (关键词, 目标)"""
+        return self.branches
+
+    def match(self, text):
+        """返回命中的、最先声明的关键词对应的目标，未命中返回None"""
+        length = len(text)
+        if self.goto is None or len(self.branches) * (LOOP_BASE_COST + length) <= AUTOMATON_CHAR_COST * length + AUTOMATON_BASE_COST:
+            for keyword, target in self.branches:
+                if keyword in text:
+                    return target
+            return None
+        return self.scan(text)
+
+    def scan(self, text):
+        """用自动机扫描一次输入，返回最先声明的命中关键词对应的目标"""
+        goto, fail, output = self.goto, self.fail, self.output
+        best = output[0]  # 空关键词总能命中
+        state = 0
+        for char in text:
+            if best == 0:
+                break
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] < best:
+                best = output[state]
+        return self.branches[best][1] if best != NO_MATCH else None
+
+    def __repr__(self):
+        return f"KeywordMatcher({self.branches!r})"
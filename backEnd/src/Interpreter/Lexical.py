@@ -1,4 +1,69 @@
+import os
 import re
+from contextlib import nullcontext
+
+# 匹配双引号中的字符串或其他非空白单词，模块加载时只编译一次
+TOKEN_PATTERN = re.compile(r'\"[^\"]*\"|\S+')
+CHUNK_SIZE = 64 * 1024  # 每次从文件读取的字符数
+
+
+class Token(list):
+    """
+    词法单元：一行中的单词列表，附带该行在源文件中的行号和起始列号（均从1开始）。
+    继承list，因此可以像原来的词法单元一样按下标访问。
+    """
+    __slots__ = ('line', 'column')
+
+    def __init__(self, words, line=0, column=0):
+        super().__init__(words)
+        self.line = line
+        self.column = column
+
+
+def iterLines(fileName, chunkSize=CHUNK_SIZE):
+    """
+    按块读取文件并逐行产出 (行号, 行内容)，不会一次性把整个文件读入内存。
+    fileName 也可以是已打开的文本流（例如由已读入的源文件内容构造的 io.StringIO），读完后不关闭。
+    """
+    lineNo = 0
+    rest = ''
+    with (open(fileName, 'r', encoding='utf-8') if isinstance(fileName, (str, os.PathLike))
+          else nullcontext(fileName)) as f:
+        while True:
+            chunk = f.read(chunkSize)
+            if not chunk:
+                break
+            lines = (rest + chunk).split('\n')
+            rest = lines.pop()  # 最后一段可能是不完整的行，留到下一块
+            for line in lines:
+                lineNo += 1
+                yield lineNo, line
+    if rest:
+        yield lineNo + 1, rest
+
+
+def scanLine(line):
+    """
+    使用预编译的正则切分一行，遇到注释即停止，返回单词列表。
+    """
+    words = TOKEN_PATTERN.findall(line)
+    if '#' in line:
+        for i, word in enumerate(words):
+            if word.startswith('#'):  # 如果是注释，丢弃其后的内容
+                return words[:i]
+    return words
+
+
+def tokenize(fileName, chunkSize=CHUNK_SIZE):
+    """
+    单遍流式词法分析，逐个产出带位置信息的词法单元，跳过空行和注释行。
+    可直接作为Grammar的输入，无需先保存完整的词法表。fileName 为文件路径或文本流（见 iterLines）。
+    """
+    for lineNo, line in iterLines(fileName, chunkSize):
+        words = scanLine(line)
+        if words:
+            yield Token(words, lineNo, len(line) - len(line.lstrip()) + 1)
+
 
 class Lexical:
     """
@@ -15,29 +80,17 @@ class Lexical:
 
     def parserFile(self):
         """
-        逐行读取文件，跳过空行和注释行，解析有效内容。
+        流式读取文件，跳过空行和注释行，收集全部词法单元。
         """
-        with open(self.fileName, 'r', encoding='utf-8') as f:
-            for line in f.readlines():
-                line = line.strip()  # 去掉行首和行尾空白
-                if line != '' and line[0] != '#':  # 跳过空行和注释行
-                    self.parserLine(line)  # 解析每一行
+        self.tokens.extend(tokenize(self.fileName))
 
     def parserLine(self, line):
         """
         使用正则表达式解析每一行，提取出词法单元。
         """
-        wordList = []
-        # 匹配双引号中的字符串或其他非空白单词
-        pattern = r'\"[^\"]*\"|\S+'
-        matches = re.findall(pattern, line)
-        
-        for word in matches:
-            if word.startswith('#'):  # 如果是注释，停止解析
-                break
-            wordList.append(word)  # 添加有效单词
-        
-        self.tokens.append(wordList)  # 将词汇列表添加到tokens中
+        wordList = scanLine(line.strip())
+        if wordList:
+            self.tokens.append(Token(wordList))  # 将词汇列表添加到tokens中
 
     def getTokens(self):
         """
@@ -51,4 +104,3 @@ class Lexical:
         """
         for token in self.tokens:
             print(token)
-
@@ -0,0 +1,58 @@
+from src.Interpreter.DataStructure import Root
+from src.Interpreter.KeywordMatcher import KeywordMatcher
+from src.Interpreter.SpeakTemplate import SpeakTemplate
+
+
+class LinkError(ValueError):
+    """
+    链接错误：脚本中存在未定义的跳转目标。errors 为全部错误描述。
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors))
+
+
+def link(tree: Root):
+    """
+    链接语法树：把 Branch、Silence、Default 的跳转目标解析为步骤数组下标，
+    每个步骤的分支编译为关键词匹配器，Speak 编译为按变量槽位取值的模板，Listen 时长转换为整数。
+    存在悬空引用时抛出LinkError，语法树保持未链接状态。
+    """
+    stepNames = tuple(tree.getStep().keys())
+    stepIndex = {stepID: index for index, stepID in enumerate(stepNames)}
+    varIndex = {varName: index for index, varName in enumerate(tree.getVarName())}
+    errors = []
+
+    def resolve(owner, target):
+        index = stepIndex.get(target)
+        if index is None:
+            errors.append(f"{owner} 引用了未定义的步骤 '{target}'")
+        return index
+
+    if tree.getMainStep() is not None and tree.getMainStep() not in stepIndex:
+        errors.append(f"未定义主要步骤 '{tree.getMainStep()}'")
+
+    program = []
+    for stepID, step in tree.getStep().items():
+        # 每个步骤的分支表只编译一次，匹配开销只取决于该步骤自己的分支数
+        branches = tuple(
+            (keyword, resolve(f"步骤 '{stepID}' 的分支 '{keyword}'", target))
+            for keyword, target in tree.getBranch().get(stepID, {}).items()
+        )
+        instructions = []
+        for state in step:
+            if state[0] in ('Silence', 'Default'):
+                state = (state[0], resolve(f"步骤 '{stepID}'", state[1]))
+            elif state[0] == 'Branch':
+                state = (state[0], KeywordMatcher(branches))
+            elif state[0] == 'Speak':
+                state = (state[0], SpeakTemplate(state[1:], varIndex))
+            elif state[0] == 'Listen':
+                state = (state[0], int(state[1]))
+            instructions.append(state)
+        program.append(tuple(instructions))
+
+    if errors:
+        raise LinkError(errors)
+    tree.setProgram(tuple(program), stepNames, varIndex)
+    return tree
@@ -0,0 +1,204 @@
+import os
+import threading
+from src.Interpreter.DataStructure import Root
+from src.Interpreter.Lexical import tokenize
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Linker import link, LinkError
+from src.Interpreter.ScriptCache import sourceHash, cachePathFor, sourceStream, readArtifact, writeArtifact
+
+
+def splitBlocks(tokens):
+    """
+    按Step将词法单元切分为块，第一个Step之前的内容并入第一个块（与整体解析的行为一致）。
+    """
+    blocks = []
+    block = []
+    hasStep = False
+    for token in tokens:
+        if token[0] == 'Step':
+            if hasStep:
+                blocks.append(block)
+                block = []
+            hasStep = True
+        block.append(token)
+    if block:
+        blocks.append(block)
+    return blocks
+
+
+def blockKey(block):
+    """块的内容键，不含位置信息，仅内容变化时才需要重新解析"""
+    return tuple(tuple(token) for token in block)
+
+
+def mergeFragments(fragments):
+    """按原顺序合并各块的语法树，结果与对整个文件解析一致"""
+    tree = Root()
+    for fragment in fragments:
+        if tree.getMainStep() is None:
+            tree.setMainStep(fragment.getMainStep())
+        for stepID, step in fragment.getStep().items():
+            tree.addStep(stepID, step)
+        for varName in fragment.getVarName():
+            tree.addVarName(varName)
+        for keyword, target in fragment.getBranch().items():
+            tree.addBranch(keyword, target)
+    return tree
+
+
+class ScriptHandle:
+    """
+    持有一个脚本当前发布的语法树版本。重新加载时只解析内容发生变化的Step块，
+    新版本通过一次引用赋值原子发布；已在运行的会话在下一个Step边界才切换到新版本。
+    """
+    def __init__(self, fileName, cacheDir=None, scriptID=None):
+        """初始化并加载脚本，scriptID 为脚本在注册表中的ID（用于会话快照）"""
+        self.fileName = fileName
+        self.scriptID = scriptID
+        self.cacheDir = cacheDir
+        self.reloadLock = threading.Lock()  # 串行化重新加载
+        self.fileStamp = self.readStamp()
+        with open(fileName, 'rb') as f:
+            source = f.read()
+        self.digest = sourceHash(source)  # 当前发布版本对应的源文件哈希
+        self.version = 1
+        # 片段缓存：块内容键 -> 语法树片段，首次重新加载时同样只需解析变化的块
+        cachePath = cachePathFor(fileName, cacheDir)
+        artifact = readArtifact(cachePath, self.digest)
+        if artifact is not None:
+            # 源文件未变化：直接使用编译产物中已链接的语法树和片段，不做词法和语法分析；
+            # 产物未保存片段时（compileScript 生成）片段缓存为空，首次重新加载时整体解析
+            self.tree, fragments = artifact
+            self.fragments = fragments or {}
+            self.lastReparsed = 0  # 最近一次加载中实际解析的块数
+            return
+        self.fragments, ordered, reparsed, _ = self.parseBlocks({}, source)
+        self.lastReparsed = reparsed
+        self.tree = link(mergeFragments(ordered))
+        try:
+            writeArtifact(cachePath, self.digest, self.tree, self.fragments)
+        except OSError as exc:
+            print(f"[Reloader] 写入编译产物失败: {exc}")
+
+    def getTree(self):
+        """获取当前发布的语法树"""
+        return self.tree
+
+    def getVersion(self):
+        """获取当前发布的版本号"""
+        return self.version
+
+    def readStamp(self):
+        """文件的修改时间和大小，用于廉价地判断是否变化"""
+        try:
+            stat = os.stat(self.fileName)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def parseBlocks(self, known, source):
+        """
+        按块解析脚本内容 source（字节），known 中已有的块直接复用。
+        返回 (块内容键 -> 片段, 按顺序排列的片段, 实际解析的块数, 是否存在语法错误)。
+        """
+        fragments = {}
+        ordered = []
+        reparsed = 0
+        hasErrors = False
+        for block in splitBlocks(tokenize(sourceStream(source))):
+            key = blockKey(block)
+            fragment = fragments.get(key) or known.get(key)
+            if fragment is None:
+                grammar = Grammar(block)
+                for diagnostic in grammar.getDiagnostics():
+                    print(f"[Reloader] {self.fileName}: {diagnostic}")
+                hasErrors = hasErrors or grammar.hasErrors()
+                fragment = grammar.getGrmTree()
+                reparsed += 1
+            fragments[key] = fragment
+            ordered.append(fragment)
+        return fragments, ordered, reparsed, hasErrors
+
+    def checkReload(self):
+        """文件有变化时重新加载，返回是否发布了新版本"""
+        stamp = self.readStamp()
+        if stamp is None or stamp == self.fileStamp:
+            return False
+        self.fileStamp = stamp
+        return self.reload()
+
+    def reload(self):
+        """
+        增量重新解析并发布新版本。出现语法错误时保留旧版本，返回是否发布了新版本。
+        """
+        with self.reloadLock:
+            try:
+                with open(self.fileName, 'rb') as f:
+                    source = f.read()
+                digest = sourceHash(source)
+                if digest == self.digest:
+                    return False
+                fragments, ordered, reparsed, hasErrors = self.parseBlocks(self.fragments, source)
+            except OSError as exc:
+                print(f"[Reloader] 读取脚本失败，保留版本 {self.version}: {self.fileName} ({exc})")
+                return False
+
+            self.lastReparsed = reparsed
+            if hasErrors:
+                print(f"[Reloader] 脚本存在错误，保留版本 {self.version}: {self.fileName}")
+                return False
+
+            try:
+                tree = link(mergeFragments(ordered))
+            except LinkError as exc:
+                print(f"[Reloader] 脚本链接失败，保留版本 {self.version}: {self.fileName} ({exc})")
+                return False
+            # 片段缓存只在发布成功后更新：有错误的块不会进入缓存，之后的无关修改仍会重新解析并拒绝它
+            self.fragments = fragments
+            self.digest = digest
+            self.tree = tree  # 原子发布新版本
+            self.version += 1
+            print(f"[Reloader] 已发布 {self.fileName} 版本 {self.version}，重新解析 {reparsed}/{len(ordered)} 个步骤块")
+            try:
+                writeArtifact(cachePathFor(self.fileName, self.cacheDir), digest, tree, self.fragments)
+            except OSError as exc:
+                print(f"[Reloader] 写入编译产物失败: {exc}")
+            return True
+
+
+class ScriptWatcher:
+    """
+    后台轮询一组脚本文件，发现变化时触发重新加载。
+    """
+    def __init__(self, handles, interval=2.0):
+        """handles 为脚本句柄的可迭代对象，或返回句柄列表的函数"""
+        self.handles = handles
+        self.interval = interval
+        self.stopEvent = threading.Event()
+        self.thread = None
+
+    def pollOnce(self):
+        """检查所有脚本一次"""
+        handles = self.handles() if callable(self.handles) else self.handles
+        for handle in list(handles):
+            try:
+                handle.checkReload()
+            except Exception as exc:
+                print(f"[Reloader] 重新加载失败: {handle.fileName} ({type(exc).__name__}: {exc})")
+
+    def start(self):
+        """启动后台轮询线程"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopEvent.clear()
+
+        def _runner():
+            while not self.stopEvent.wait(self.interval):
+                self.pollOnce()
+
+        self.thread = threading.Thread(target=_runner, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止后台轮询"""
+        self.stopEvent.set()
@@ -0,0 +1,200 @@
+import threading
+import time
+import uuid
+from collections import deque
+
+RETENTION = 1000  # 每个会话保留的最近输出条数，供断线重连的客户端补发
+# 日志已满时的处理方式：dropOldest 丢弃最早的一条（客户端可由游标发现缺口），dropNewest 丢弃新输出
+OVERFLOW_POLICIES = ('dropOldest', 'dropNewest')
+OVERFLOW = 'dropOldest'
+
+
+def configure(retention=None, overflow=None):
+    """设置之后创建的日志默认保留条数和溢出策略"""
+    global RETENTION, OVERFLOW
+    if overflow is not None and overflow not in OVERFLOW_POLICIES:
+        raise ValueError(f'未知的溢出策略: {overflow}')
+    if retention is not None:
+        RETENTION = max(1, int(retention))
+    if overflow is not None:
+        OVERFLOW = overflow
+
+
+class ResultLog:
+    """
+    会话的输出日志：每条输出带递增序号，可按序号读取并阻塞等待新输出（用于SSE推送），
+    也可按先后顺序逐条取走或按游标成批确认（/repeatchat）。日志实例有随机的纪元标识，
+    事件ID为“纪元:序号”，会话重建后客户端带着旧ID重连时可据此判断需从头补发。
+    保留条数有上限，写满后按溢出策略丢弃，丢弃条数计入 dropped。
+    同步请求提交输入前领取票据，该输入执行到下一个 Listen 或 Exit 时票据被应答，据此等待本次输入产生的全部输出；
+    期间由超时或上一步推进的轮次不会应答别人的票据。
+    """
+    __slots__ = ('epoch', 'entries', 'nextSeq', 'cond', 'listeners', 'overflow', 'dropped',
+                 'lastTicket', 'tickets')
+
+    def __init__(self, messages=(), firstSeq=1, epoch=None, retention=None, overflow=None):
+        """retention、overflow 为None时使用 configure 设置的默认值"""
+        self.epoch = epoch or uuid.uuid4().hex[:8]
+        self.entries = deque(maxlen=retention or RETENTION)  # (序号, 输出)
+        self.nextSeq = firstSeq
+        self.cond = threading.Condition()
+        self.listeners = None  # 有新输出或被唤醒时调用的回调（事件循环中的连接用它代替阻塞等待）
+        self.overflow = overflow or OVERFLOW
+        self.dropped = 0  # 因日志已满丢弃的输出条数
+        self.lastTicket = 0  # 最近领取的票据号
+        self.tickets = None  # 等待中的票据号 -> 是否已应答，领取票据时才创建
+        self.extend(messages)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        """按先后顺序遍历尚未取走的输出"""
+        with self.cond:
+            return iter([message for _, message in self.entries])
+
+    def append(self, message, valid=None):
+        """
+        追加一条输出并唤醒等待者，返回其序号；按 dropNewest 策略被丢弃时返回None。
+        valid 为可选的检查函数，在持有锁时调用，返回False时不追加（过期调度的输出），同样返回None。
+        """
+        with self.cond:
+            if valid is not None and not valid():
+                return None
+            seq = self._push(message)
+            self.cond.notify_all()
+        self._notifyListeners()
+        return seq
+
+    def extend(self, messages):
+        with self.cond:
+            for message in messages:
+                self._push(message)
+            self.cond.notify_all()
+        self._notifyListeners()
+
+    def _push(self, message):
+        """在持有锁时追加一条输出，日志已满时按溢出策略处理"""
+        if len(self.entries) == self.entries.maxlen:
+            self.dropped += 1
+            if self.overflow == 'dropNewest':
+                return None
+        seq = self.nextSeq
+        self.entries.append((seq, message))  # dropOldest：deque 自动挤掉最早的一条
+        self.nextSeq += 1
+        return seq
+
+    def popleft(self):
+        """取走最早的一条输出，没有时抛出IndexError"""
+        with self.cond:
+            return self.entries.popleft()[1]
+
+    def firstSeq(self):
+        """最早一条保留输出的序号，没有时为下一条输出的序号"""
+        with self.cond:
+            return self.entries[0][0] if self.entries else self.nextSeq
+
+    def after(self, seq):
+        """序号大于 seq 的 (序号, 输出) 列表"""
+        with self.cond:
+            if not self.entries or self.entries[-1][0] <= seq:
+                return []
+            start = max(0, seq + 1 - self.entries[0][0])
+            return [self.entries[index] for index in range(start, len(self.entries))]
+
+    def acknowledge(self, seq):
+        """
+        确认收到序号不大于 seq 的输出并丢弃，返回 (其后的 (序号, 输出) 列表, 新游标, 缺失条数)。
+        新游标为目前最后一条输出的序号；同一游标重复确认得到相同结果。
+        缺失条数为游标之后、因溢出或被其他方式取走而无法补发的输出数。
+        """
+        with self.cond:
+            first = self.entries[0][0] if self.entries else self.nextSeq
+            missed = max(0, first - seq - 1)
+            self.discard(seq)
+            return self.after(seq), self.nextSeq - 1, missed
+
+    def ticket(self):
+        """同步模式提交输入前调用：领取票据，返回 (最后一条输出的序号, 票据号)，之后据此等待并读取本次输入的输出"""
+        with self.cond:
+            self.lastTicket += 1
+            if self.tickets is None:
+                self.tickets = {}
+            self.tickets[self.lastTicket] = False
+            return self.nextSeq - 1, self.lastTicket
+
+    def answer(self, ticket):
+        """票据对应的输入已执行到下一个 Listen 或 Exit：应答并唤醒等待者；票据已放弃或为None时忽略"""
+        if ticket is None:
+            return
+        with self.cond:
+            if not self.tickets or ticket not in self.tickets:
+                return
+            self.tickets[ticket] = True
+            self.cond.notify_all()
+        self._notifyListeners()
+
+    def answered(self, ticket):
+        """票据是否已应答"""
+        with self.cond:
+            return bool(self.tickets and self.tickets.get(ticket))
+
+    def waitAnswer(self, ticket, timeout):
+        """等待票据被应答，返回是否在超时前等到"""
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while not self.tickets.get(ticket):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+            return True
+
+    def forget(self, ticket):
+        """不再等待票据（已返回响应或提交失败），之后的应答被忽略"""
+        with self.cond:
+            if self.tickets:
+                self.tickets.pop(ticket, None)
+
+    def wait(self, seq, timeout=None):
+        """等待序号大于 seq 的输出；超时或被 notifyAll 唤醒时可能返回空列表"""
+        with self.cond:
+            if self.nextSeq - 1 <= seq:
+                self.cond.wait(timeout)
+            return self.after(seq)
+
+    def discard(self, seq=None):
+        """丢弃序号不大于 seq 的输出（客户端已确认收到），seq 为None时全部丢弃；序号继续递增"""
+        with self.cond:
+            while self.entries and (seq is None or self.entries[0][0] <= seq):
+                self.entries.popleft()
+
+    def notifyAll(self):
+        """唤醒所有等待者（会话被替换或移出时，让推送连接重新取得会话）"""
+        with self.cond:
+            self.cond.notify_all()
+        self._notifyListeners()
+
+    def addListener(self, listener):
+        """登记回调，在追加输出或 notifyAll 时（于调用方线程中）调用，回调不应阻塞"""
+        with self.cond:
+            self.listeners = (self.listeners or ()) + (listener,)
+
+    def removeListener(self, listener):
+        with self.cond:
+            listeners = tuple(item for item in self.listeners or () if item is not listener)
+            self.listeners = listeners or None
+
+    def _notifyListeners(self):
+        for listener in self.listeners or ():
+            listener()
+
+    def eventID(self, seq):
+        return f'{self.epoch}:{seq}'
+
+    def parseEventID(self, eventID):
+        """由客户端的 Last-Event-ID 得到已收到的最大序号；纪元不同或无法解析时返回0（从头补发）"""
+        epoch, _, seq = (eventID or '').partition(':')
+        if epoch != self.epoch or not seq.isdigit():
+            return 0
+        return int(seq)
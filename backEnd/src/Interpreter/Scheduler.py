@@ -0,0 +1,160 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+# 优先级类别，数值越小越先执行
+PRIORITIES = {'vip': 0, 'normal': 1, 'bulk': 2}
+DEFAULT_PRIORITY = 'normal'
+WAIT_WINDOW = 1024  # 每个优先级保留最近多少次排队时间用于统计
+
+
+def percentile(values, fraction):
+    """数据的分位数（不要求已排序），没有数据时返回0；调度指标和各基准测试共用"""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Scheduler:
+    """
+    固定大小的工作线程池：可运行的会话（收到输入或超时到期）进入运行队列，
+    由工作线程执行到下一个Listen。运行队列按优先级类别排序，同一类别内先到先执行；
+    同一会话的任务严格按提交顺序逐个执行，不会被两个工作线程同时执行。
+    """
+    def __init__(self, workers=4, maxPending=None):
+        """maxPending 为排队任务总数上限，超过时拒绝提交；None表示不限"""
+        self.workerCount = max(1, workers)
+        self.maxPending = maxPending
+        self.runQueue = []  # (优先级, 序号, 会话键)，每个会话最多出现一次
+        self.pending = {}  # 会话键 -> deque[(任务, 优先级, 提交时间)]；会话在队列中或正在执行时存在
+        self.pendingCount = 0  # 尚未开始执行的任务总数
+        self.sequence = itertools.count()
+        self.cond = threading.Condition()
+        self.threads = []
+        self.running = 0  # 正在执行的任务数
+        self.submittedCount = 0
+        self.completedCount = 0
+        self.failedCount = 0
+        self.rejectedCount = 0
+        self.maxDepth = 0  # 观测到的最大排队任务数
+        self.waits = {name: deque(maxlen=WAIT_WINDOW) for name in PRIORITIES}  # 最近的排队时间（秒）
+        self.stopped = False
+
+    def start(self):
+        """启动工作线程，已启动时直接返回"""
+        with self.cond:
+            if self.threads:
+                return
+            self.stopped = False
+            for index in range(self.workerCount):
+                thread = threading.Thread(target=self._worker, name=f'dsl-worker-{index}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self, timeout=1.0):
+        """停止工作线程，已排队的任务不再执行"""
+        with self.cond:
+            self.stopped = True
+            threads, self.threads = self.threads, []
+            self.cond.notify_all()
+        for thread in threads:
+            thread.join(timeout)
+
+    def submit(self, key, task, priority=DEFAULT_PRIORITY):
+        """
+        提交会话 key 的任务，返回是否接受。同一会话已在队列中或正在执行时，任务排在其后依次执行。
+        未知的优先级按默认优先级处理。
+        """
+        if priority not in PRIORITIES:
+            priority = DEFAULT_PRIORITY
+        with self.cond:
+            if self.maxPending is not None and self.pendingCount >= self.maxPending:
+                self.rejectedCount += 1
+                return False
+            queue = self.pending.get(key)
+            if queue is None:
+                self.pending[key] = deque([(task, priority, time.monotonic())])
+                heapq.heappush(self.runQueue, (PRIORITIES[priority], next(self.sequence), key))
+                self.cond.notify()
+            else:
+                queue.append((task, priority, time.monotonic()))
+            self.pendingCount += 1
+            self.submittedCount += 1
+            self.maxDepth = max(self.maxDepth, self.pendingCount)
+            return True
+
+    def _worker(self):
+        """工作线程：取出优先级最高的会话，执行它最早提交的一个任务"""
+        while True:
+            with self.cond:
+                while not self.runQueue and not self.stopped:
+                    self.cond.wait()
+                if self.stopped:
+                    return
+                _, _, key = heapq.heappop(self.runQueue)
+                task, priority, submittedAt = self.pending[key].popleft()
+                self.pendingCount -= 1
+                self.running += 1
+                self.waits[priority].append(time.monotonic() - submittedAt)
+            try:
+                task()
+                failed = False
+            except Exception as exc:
+                failed = True
+                print(f"[Scheduler] 会话 {key} 的任务执行失败: {type(exc).__name__}: {exc}")
+            with self.cond:
+                self.running -= 1
+                if failed:
+                    self.failedCount += 1
+                else:
+                    self.completedCount += 1
+                queue = self.pending[key]
+                if queue:
+                    # 会话还有后续任务，按下一个任务的优先级重新排队
+                    heapq.heappush(self.runQueue, (PRIORITIES[queue[0][1]], next(self.sequence), key))
+                    self.cond.notify()
+                else:
+                    del self.pending[key]
+                    self.cond.notify_all()  # 唤醒 join
+
+    def join(self, timeout=None):
+        """等待所有已提交的任务执行完，返回是否在超时前完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while self.pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+            return True
+
+    def metrics(self):
+        """队列深度、排队时间（毫秒）和累计计数"""
+        with self.cond:
+            depth = {name: 0 for name in PRIORITIES}
+            for queue in self.pending.values():
+                for _, priority, _ in queue:
+                    depth[priority] += 1
+            waits = {}
+            for name, samples in self.waits.items():
+                waits[name] = {
+                    'p50': round(percentile(samples, 0.5) * 1000, 3),
+                    'p99': round(percentile(samples, 0.99) * 1000, 3),
+                    'max': round(max(samples, default=0.0) * 1000, 3),
+                }
+            return {
+                'workers': self.workerCount,
+                'running': self.running,
+                'depth': self.pendingCount,
+                'depthByPriority': depth,
+                'runnableSessions': len(self.runQueue),
+                'maxDepth': self.maxDepth,
+                'waitMs': waits,
+                'submitted': self.submittedCount,
+                'completed': self.completedCount,
+                'failed': self.failedCount,
+                'rejected': self.rejectedCount,
+            }
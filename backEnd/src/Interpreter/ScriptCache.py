@@ -0,0 +1,121 @@
+import hashlib
+import io
+import os
+import pickle
+import struct
+import sys
+from src.Interpreter.Lexical import tokenize
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Linker import link
+
+# 编译产物格式：文件头(魔数 + 格式版本 + 源文件SHA-256) + pickle序列化的 (语法树, 步骤块片段)
+MAGIC = b'DSLC'
+FORMAT_VERSION = 7  # 语法树结构变化时需递增，旧产物会自动失效
+HEADER = struct.Struct('<4sH32s')
+CACHE_DIR_NAME = '__dslcache__'
+CACHE_SUFFIX = '.dslc'
+
+
+def sourceHash(source):
+    """计算源文件内容的哈希值"""
+    return hashlib.sha256(source).digest()
+
+
+def cachePathFor(fileName, cacheDir=None):
+    """
+    返回脚本对应的编译产物路径，默认位于脚本同级的 __dslcache__ 目录。
+    """
+    if cacheDir is None:
+        cacheDir = os.path.join(os.path.dirname(os.path.abspath(fileName)), CACHE_DIR_NAME)
+    return os.path.join(cacheDir, os.path.basename(fileName) + CACHE_SUFFIX)
+
+
+def sourceStream(source):
+    """由已读入的源文件内容（字节）构造文本流，词法分析与计算哈希使用同一份内容"""
+    return io.StringIO(source.decode('utf-8'), newline='')
+
+
+def parseSource(fileName, source=None):
+    """
+    流式词法分析的结果直接交给语法分析，再链接跳转目标，得到可执行的语法树。
+    source 为已读入的源文件内容（字节），省略时读取文件。存在未定义的跳转目标时抛出LinkError。
+    """
+    grammar = Grammar(tokenize(fileName if source is None else sourceStream(source)))
+    for diagnostic in grammar.getDiagnostics():
+        print(f"[ScriptCache] {fileName}: {diagnostic}")
+    return link(grammar.getGrmTree())
+
+
+def readArtifact(cachePath, digest):
+    """
+    读取编译产物，返回 (语法树, 步骤块片段)；魔数、版本或哈希任一不匹配时返回None。
+    片段为热加载使用的 块内容键 -> 语法树片段，未保存时为None。
+    """
+    try:
+        with open(cachePath, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) != HEADER.size:
+                return None
+            magic, version, artifactHash = HEADER.unpack(header)
+            if magic != MAGIC or version != FORMAT_VERSION or artifactHash != digest:
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        print(f"[ScriptCache] 编译产物损坏，将重新解析: {cachePath} ({type(exc).__name__}: {exc})")
+        return None
+
+
+def writeArtifact(cachePath, digest, tree, fragments=None):
+    """
+    先写临时文件再原子替换，避免并发进程读到半个文件。
+    fragments 与语法树一起序列化，共享的步骤对象只保存一份。
+    """
+    os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+    tmpPath = f"{cachePath}.{os.getpid()}.tmp"
+    try:
+        with open(tmpPath, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, digest))
+            pickle.dump((tree, fragments), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpPath, cachePath)
+    finally:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+
+
+def compileScript(fileName, cacheDir=None):
+    """
+    解析脚本并写入编译产物，返回语法树。写入失败时仅提示，不影响解析结果。
+    """
+    with open(fileName, 'rb') as f:
+        source = f.read()
+    digest = sourceHash(source)
+    tree = parseSource(fileName, source)  # 解析与哈希对应同一份内容，期间文件被修改也不会错配
+    cachePath = cachePathFor(fileName, cacheDir)
+    try:
+        writeArtifact(cachePath, digest, tree)
+    except OSError as exc:
+        print(f"[ScriptCache] 写入编译产物失败: {cachePath} ({exc})")
+    return tree
+
+
+def loadScript(fileName, cacheDir=None):
+    """
+    加载脚本：编译产物与源文件哈希一致时直接反序列化，否则回退到解析并刷新产物。
+    """
+    with open(fileName, 'rb') as f:
+        digest = sourceHash(f.read())
+    artifact = readArtifact(cachePathFor(fileName, cacheDir), digest)
+    if artifact is not None:
+        return artifact[0]
+    return compileScript(fileName, cacheDir)
+
+
+if __name__ == "__main__":
+    # 预编译：python -m src.Interpreter.ScriptCache 脚本1 [脚本2 ...]
+    # 通过 ScriptHandle 生成产物，一并保存热加载使用的步骤块片段
+    from src.Interpreter.Reloader import ScriptHandle
+    for path in sys.argv[1:]:
+        ScriptHandle(path)
+        print(f"已编译 {path} -> {cachePathFor(path)}")
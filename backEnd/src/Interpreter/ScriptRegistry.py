@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from src.Interpreter.Reloader import ScriptHandle
+
+
+def estimateTreeSize(tree, fragments=None):
+    """
+    估算语法树占用的内存字节数（递归统计容器、字符串和带 __slots__ 的节点对象，如 SpeakTemplate、KeywordMatcher，
+    重复引用只计一次）。fragments 为热加载使用的片段缓存，与语法树共享的步骤对象不重复计算。
+    """
+    seen = set()
+    total = 0
+    stack = [tree, fragments]
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            for cls in type(obj).__mro__:
+                slots = getattr(cls, '__slots__', ())
+                for name in (slots,) if isinstance(slots, str) else slots:
+                    stack.append(getattr(obj, name, None))
+    return total
+
+
+def estimateHandleSize(handle):
+    """估算脚本句柄占用的内存：当前发布的语法树及其片段缓存"""
+    return estimateTreeSize(handle.getTree(), handle.fragments)
+
+
+class ScriptRegistry:
+    """
+    脚本注册表：将脚本ID映射到编译后的语法树。
+    脚本在首次使用时才加载，占用内存超过预算时按最近最少使用（LRU）淘汰。
+    被淘汰但仍被会话引用的句柄保留为弱引用：继续参与热加载，再次使用时直接恢复，
+    保证同一脚本ID始终只有一个句柄。
+    """
+    def __init__(self, scripts=None, scriptDir=None, memoryBudget=64 * 1024 * 1024, cacheDir=None):
+        """
+        scripts 为显式登记的 {脚本ID: 文件路径}；未登记的ID在 scriptDir 下查找 <脚本ID>.txt。
+        """
+        self.scripts = dict(scripts or {})
+        self.scriptDir = scriptDir
+        self.memoryBudget = memoryBudget
+        self.cacheDir = cacheDir
+        self.handles = OrderedDict()  # 已加载的脚本ID -> (脚本句柄, 估算大小, 估算时的版本)
+        self.retired = weakref.WeakValueDictionary()  # 已淘汰的脚本ID -> 仍被会话引用的句柄
+        self.lock = threading.Lock()
+        self.loadCount = 0  # 累计加载次数
+        self.evictCount = 0  # 累计淘汰次数
+
+    def register(self, scriptID, fileName):
+        """登记脚本ID对应的文件"""
+        with self.lock:
+            self.scripts[scriptID] = fileName
+
+    def resolve(self, scriptID):
+        """解析脚本ID对应的文件路径，不存在时返回None"""
+        if scriptID in self.scripts:
+            return self.scripts[scriptID]
+        if not self.scriptDir or not scriptID or os.path.basename(scriptID) != scriptID or scriptID.startswith('.'):
+            return None  # 拒绝路径穿越
+        fileName = os.path.join(self.scriptDir, scriptID + '.txt')
+        return fileName if os.path.isfile(fileName) else None
+
+    def getHandle(self, scriptID):
+        """
+        获取脚本句柄，未加载时加载。脚本不存在时抛出KeyError，存在未定义的跳转目标时抛出LinkError。
+        """
+        with self.lock:
+            entry = self.handles.get(scriptID)
+            if entry is not None:
+                handle, size, version = entry
+                if version != handle.getVersion():  # 热加载后重新估算大小
+                    self.handles[scriptID] = (handle, estimateHandleSize(handle), handle.getVersion())
+                self.handles.move_to_end(scriptID)
+                self.evict()
+                return handle
+            handle = self.retired.pop(scriptID, None)
+            if handle is not None:  # 淘汰后仍有会话在用，恢复原句柄而不是重新加载
+                self.handles[scriptID] = (handle, estimateHandleSize(handle), handle.getVersion())
+                self.evict()
+                return handle
+
+        fileName = self.resolve(scriptID)
+        if fileName is None:
+            raise KeyError(scriptID)
+        handle = ScriptHandle(fileName, self.cacheDir, scriptID)  # 在锁外解析，避免阻塞其他脚本的访问
+        size = estimateHandleSize(handle)
+
+        with self.lock:
+            entry = self.handles.get(scriptID)
+            if entry is not None:  # 其他线程已抢先加载
+                self.handles.move_to_end(scriptID)
+                return entry[0]
+            self.handles[scriptID] = (handle, size, handle.getVersion())
+            self.loadCount += 1
+            self.evict()
+            return handle
+
+    def getTree(self, scriptID):
+        """获取脚本当前发布的语法树"""
+        return self.getHandle(scriptID).getTree()
+
+    def evict(self):
+        """淘汰最近最少使用的脚本直到满足内存预算，至少保留最近使用的一个（需持有锁）"""
+        while len(self.handles) > 1 and self.memoryUsage() > self.memoryBudget:
+            scriptID, (handle, _, _) = self.handles.popitem(last=False)
+            self.retired[scriptID] = handle
+            self.evictCount += 1
+
+    def memoryUsage(self):
+        """已加载脚本的估算内存总量"""
+        return sum(size for _, size, _ in self.handles.values())
+
+    def loadedIDs(self):
+        """已加载的脚本ID，按最近使用顺序排列"""
+        with self.lock:
+            return list(self.handles.keys())
+
+    def loadedHandles(self):
+        """已加载以及已淘汰但仍被会话引用的脚本句柄，供热加载轮询使用"""
+        with self.lock:
+            return [handle for handle, _, _ in self.handles.values()] + list(self.retired.values())
@@ -0,0 +1,249 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+MAX_SESSIONS = 10000  # 内存中会话数量上限
+IDLE_TTL = 600.0  # 会话空闲多久（秒）后被回收
+STOP_GRACE = 1.0  # 停止调度后等待线程退出的宽限时间（秒），超过仍未退出计为泄漏
+
+
+class SessionStripe:
+    """会话表的一个分段：自己的锁、按最近活跃时间排列的会话和计数"""
+    __slots__ = ('sessions', 'lock', 'createdCount', 'reusedCount', 'restoredCount', 'evictedCount', 'reapedCount')
+
+    def __init__(self):
+        self.sessions = OrderedDict()  # 用户名 -> [解释器, 最近活跃时间]，最久未活跃的在前
+        self.lock = threading.RLock()
+        self.createdCount = 0  # 累计登记的会话数
+        self.reusedCount = 0  # 重新登录时复用的会话数
+        self.restoredCount = 0  # 从存储恢复的会话数
+        self.evictedCount = 0  # 写入存储后移出内存的会话数
+        self.reapedCount = 0  # 未保存直接丢弃的会话数
+
+
+class SessionManager:
+    """
+    会话表：用户名 -> 解释器，按最近活跃时间排列。
+    会话数量超过上限时回收最久未活跃的会话，后台定期回收空闲超时的会话；
+    配置了快照存储时回收即换出到磁盘（下一次请求时恢复），否则直接丢弃。
+    回收或替换会话时停止其调度，并统计在线、换出、丢弃和泄漏（停止后调度仍未退出）的会话数。
+    会话按用户名哈希分到 stripes 个分段，每个分段有自己的锁、活跃顺序和数量上限（总上限平均分配），
+    不同分段的用户互不阻塞；get、in、[] 不加锁。
+    支持 in、[]、get、items、clear 等字典操作。
+    """
+    def __init__(self, maxSessions=MAX_SESSIONS, idleTTL=IDLE_TTL, store=None, restore=None,
+                 onRemove=None, sessionLock=None, stripes=1):
+        """
+        store 为 SessionStore；restore(username, data) 由快照重建解释器；
+        onRemove(username, interpreter) 在会话移出内存时调用；sessionLock(username) 返回快照时需持有的锁。
+        """
+        self.maxSessions = maxSessions
+        self.idleTTL = idleTTL
+        self.store = store
+        self.restore = restore
+        self.onRemove = onRemove
+        self.sessionLock = sessionLock
+        self.stripes = [SessionStripe() for _ in range(max(1, stripes))]
+        self.stoppingLock = threading.Lock()
+        self.stopping = []  # (解释器, 停止时间)：已移出但调度尚未退出
+        self.stopEvent = threading.Event()
+        self.thread = None
+
+    def stripeFor(self, username):
+        return self.stripes[hash(username) % len(self.stripes)]
+
+    def lockFor(self, username):
+        """用户所在分段的锁（可重入），需要把几步操作合成一步时持有"""
+        return self.stripeFor(username).lock
+
+    def capacity(self):
+        """每个分段的会话数量上限"""
+        return -(-self.maxSessions // len(self.stripes))
+
+    def __contains__(self, username):
+        return username in self.stripeFor(username).sessions
+
+    def __getitem__(self, username):
+        return self.stripeFor(username).sessions[username][0]
+
+    def __setitem__(self, username, interpreter):
+        self.put(username, interpreter)
+
+    def __delitem__(self, username):
+        stripe = self.stripeFor(username)
+        with stripe.lock:
+            interpreter, _ = stripe.sessions.pop(username)
+            self._release(username, interpreter)
+
+    def __len__(self):
+        return sum(len(stripe.sessions) for stripe in self.stripes)
+
+    def get(self, username, default=None):
+        """取得内存中的会话，不刷新活跃时间"""
+        entry = self.stripeFor(username).sessions.get(username)
+        return default if entry is None else entry[0]
+
+    def items(self):
+        """内存中的 (用户名, 解释器)，最久未活跃的在前"""
+        entries = []
+        for stripe in self.stripes:
+            with stripe.lock:
+                entries.extend((entry[1], username, entry[0]) for username, entry in stripe.sessions.items())
+        if len(self.stripes) > 1:
+            entries.sort(key=lambda item: item[0])  # 分段内已有序，排序是稳定的
+        return [(username, interpreter) for _, username, interpreter in entries]
+
+    def clear(self):
+        """停止并丢弃所有会话（不写入存储）"""
+        for stripe in self.stripes:
+            with stripe.lock:
+                sessions = stripe.sessions
+                stripe.sessions = OrderedDict()
+                for username, (interpreter, _) in sessions.items():
+                    self._release(username, interpreter)
+
+    def put(self, username, interpreter):
+        """登记会话。替换旧会话时停止旧会话的调度；超过数量上限时回收所在分段最久未活跃的会话"""
+        stripe = self.stripeFor(username)
+        with stripe.lock:
+            entry = stripe.sessions.pop(username, None)
+            if entry is not None and entry[0] is not interpreter:
+                self._release(username, entry[0])
+            stripe.sessions[username] = [interpreter, time.time()]
+            stripe.createdCount += 1
+            capacity = self.capacity()
+            if len(stripe.sessions) > capacity:
+                overflow = len(stripe.sessions) - capacity
+                self._removeMany(stripe, [name for name, _ in zip(stripe.sessions, range(overflow))])
+
+    def reuse(self, username, source):
+        """重新登录时取得使用同一脚本句柄的已有会话（内存中或存储中）；没有可复用的会话时返回None"""
+        stripe = self.stripeFor(username)
+        with stripe.lock:
+            interpreter = self.touch(username)
+            if interpreter is None or interpreter.source is not source:
+                return None
+            stripe.reusedCount += 1
+            return interpreter
+
+    def touch(self, username):
+        """取得会话并刷新活跃时间；已换出到存储的会话在此恢复，不存在时返回None"""
+        stripe = self.stripeFor(username)
+        with stripe.lock:
+            entry = stripe.sessions.get(username)
+            if entry is not None:
+                entry[1] = time.time()
+                stripe.sessions.move_to_end(username)
+                return entry[0]
+            if self.store is None or self.restore is None or not username:
+                return None
+            data = self.store.take(username)
+            if data is None:
+                return None
+            interpreter = self.restore(username, data)
+            if interpreter is not None:
+                stripe.sessions[username] = [interpreter, time.time()]
+                stripe.restoredCount += 1
+            return interpreter
+
+    def reap(self, idleTTL=None, now=None):
+        """回收空闲超过 idleTTL 秒的会话，返回回收的数量"""
+        idleTTL = self.idleTTL if idleTTL is None else idleTTL
+        now = time.time() if now is None else now
+        count = 0
+        for stripe in self.stripes:
+            with stripe.lock:
+                expired = []
+                for username, (_, lastActive) in stripe.sessions.items():
+                    if now - lastActive < idleTTL:
+                        break  # 按活跃时间排列，其后的会话都未超时
+                    expired.append(username)
+                self._removeMany(stripe, expired)
+            count += len(expired)
+        self._pruneStopping()
+        return count
+
+    def drain(self):
+        """回收所有会话（进程退出前调用），返回数量"""
+        return self.reap(0, float('inf'))
+
+    def _removeMany(self, stripe, usernames):
+        """
+        移出分段中的一批会话：有存储时在一个事务中写入快照（需持有分段的锁）。
+        线程、协程调度的会话在Listen处停住后再做快照并停止调度，快照不会停在步骤中途。
+        """
+        if not usernames:
+            return
+        if self.store is not None:
+            snapshots = []
+            for username in usernames:
+                interpreter = stripe.sessions[username][0]
+                with self.sessionLock(username) if self.sessionLock else nullcontext(), interpreter.parked():
+                    snapshots.append((username, interpreter.snapshot()))
+                    interpreter.requestStop()  # 停在快照点，之后的输入和超时不再推进这个会话
+            self.store.saveMany(snapshots)
+            stripe.evictedCount += len(usernames)
+        else:
+            stripe.reapedCount += len(usernames)
+        for username in usernames:
+            interpreter, _ = stripe.sessions.pop(username)
+            self._release(username, interpreter)
+
+    def _release(self, username, interpreter):
+        """停止会话的调度并通知调用方（需持有分段的锁）"""
+        interpreter.requestStop()
+        if interpreter.isDispatching():
+            with self.stoppingLock:
+                self.stopping.append((interpreter, time.time()))
+        if self.onRemove is not None:
+            self.onRemove(username, interpreter)
+
+    def _pruneStopping(self):
+        """去掉调度已经退出的会话"""
+        with self.stoppingLock:
+            self.stopping = [(interpreter, stoppedAt) for interpreter, stoppedAt in self.stopping
+                             if interpreter.isDispatching()]
+
+    def metrics(self):
+        """会话计数"""
+        now = time.time()
+        self._pruneStopping()
+        counts = {'live': 0, 'dispatching': 0, 'created': 0, 'reused': 0, 'restored': 0, 'evicted': 0, 'reaped': 0}
+        for stripe in self.stripes:
+            with stripe.lock:
+                counts['live'] += len(stripe.sessions)
+                counts['dispatching'] += sum(1 for interpreter, _ in stripe.sessions.values()
+                                             if interpreter.isDispatching())
+                counts['created'] += stripe.createdCount
+                counts['reused'] += stripe.reusedCount
+                counts['restored'] += stripe.restoredCount
+                counts['evicted'] += stripe.evictedCount
+                counts['reaped'] += stripe.reapedCount
+        with self.stoppingLock:
+            counts['stopping'] = len(self.stopping)
+            counts['leaked'] = sum(1 for _, stoppedAt in self.stopping if now - stoppedAt > STOP_GRACE)
+        counts['stripes'] = len(self.stripes)
+        return counts
+
+    def start(self, interval=None):
+        """启动后台回收线程，默认间隔为空闲期限的四分之一（1到60秒之间）"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        if interval is None:
+            interval = min(60.0, max(1.0, self.idleTTL / 4))
+        self.stopEvent.clear()
+
+        def _runner():
+            while not self.stopEvent.wait(interval):
+                try:
+                    self.reap()
+                except Exception as exc:
+                    print(f"[SessionManager] 回收会话失败: {type(exc).__name__}: {exc}")
+
+        self.thread = threading.Thread(target=_runner, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止后台回收线程"""
+        self.stopEvent.set()
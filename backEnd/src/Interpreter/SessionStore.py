@@ -0,0 +1,74 @@
+import json
+import sqlite3
+import threading
+import time
+
+SNAPSHOT_FORMAT = 1  # 快照结构变化时需递增，旧快照读取时被忽略
+
+
+class SessionStore:
+    """
+    会话快照的本地存储（SQLite，WAL模式）：空闲会话换出到磁盘，下一次请求时恢复；
+    进程正常退出前把所有会话写入，重启后按需恢复。
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()  # 连接在多个线程间共享，由锁串行化
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')  # WAL模式下只在检查点时同步，掉电最多丢失最近的事务
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'username TEXT PRIMARY KEY, format INTEGER NOT NULL, data TEXT NOT NULL, updated REAL NOT NULL)')
+        self.conn.commit()
+
+    def save(self, username, snapshot):
+        """写入一个会话的快照"""
+        self.saveMany([(username, snapshot)])
+
+    def saveMany(self, items):
+        """在一个事务中写入多个 (用户名, 快照)"""
+        now = time.time()
+        rows = [(username, SNAPSHOT_FORMAT, json.dumps(snapshot, ensure_ascii=False), now)
+                for username, snapshot in items]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO sessions (username, format, data, updated) VALUES (?, ?, ?, ?)', rows)
+
+    def load(self, username):
+        """读取会话快照，不存在或格式不符时返回None"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT format, data FROM sessions WHERE username = ?', (username,)).fetchone()
+        if row is None or row[0] != SNAPSHOT_FORMAT:
+            return None
+        try:
+            return json.loads(row[1])
+        except ValueError as exc:
+            print(f"[SessionStore] 会话快照损坏，已忽略: {username} ({exc})")
+            return None
+
+    def take(self, username):
+        """读取并删除会话快照，恢复到内存后磁盘上不再保留旧版本"""
+        snapshot = self.load(username)
+        self.delete(username)
+        return snapshot
+
+    def delete(self, username):
+        """删除会话快照"""
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM sessions WHERE username = ?', (username,))
+
+    def usernames(self):
+        """已保存快照的用户名"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute('SELECT username FROM sessions')]
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,422 @@
+import argparse
+import bisect
+import hashlib
+import http.client
+import json
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import threading
+import time
+from werkzeug.serving import run_simple
+from werkzeug.wrappers import Request, Response
+
+REPLICAS = 160  # 每个工作进程在哈希环上的虚拟节点数
+SHARD_HEADER = 'X-DSL-Shard-Token'
+HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailers',
+               'transfer-encoding', 'upgrade', 'host', 'content-length'}  # 不转发的逐跳首部
+READY_TIMEOUT = 30.0  # 等待工作进程就绪的最长时间（秒）
+
+
+def hashKey(key):
+    """与进程无关的64位哈希（内置 hash 对字符串按进程随机化，不能跨进程使用）"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    一致性哈希环：每个节点映射为 replicas 个虚拟节点，键归属于顺时针方向的第一个虚拟节点。
+    增删一个节点时只有约 1/N 的键改变归属。
+    """
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        self.replicas = replicas
+        self.points = []  # 已排序的虚拟节点哈希值
+        self.owners = {}  # 虚拟节点哈希值 -> 节点
+        self.nodes = []
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def add(self, node):
+        """加入节点，已存在时忽略"""
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.replicas):
+            point = hashKey(f'{node}#{replica}')
+            if point in self.owners:
+                continue  # 64位哈希几乎不会冲突，冲突时保留先加入的节点
+            self.owners[point] = node
+            bisect.insort(self.points, point)
+
+    def remove(self, node):
+        """移除节点，不存在时忽略"""
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        self.points = [point for point in self.points if self.owners[point] != node]
+        self.owners = {point: self.owners[point] for point in self.points}
+
+    def copy(self):
+        ring = HashRing(replicas=self.replicas)
+        ring.points = list(self.points)
+        ring.owners = dict(self.owners)
+        ring.nodes = list(self.nodes)
+        return ring
+
+    def nodeFor(self, key):
+        """键所属的节点，环为空时返回None"""
+        if not self.points:
+            return None
+        index = bisect.bisect(self.points, hashKey(key)) % len(self.points)
+        return self.owners[self.points[index]]
+
+
+class ShardRouter:
+    """
+    本机路由（WSGI应用）：按请求中的 username 把请求原样转发给一致性哈希选出的工作进程，
+    与工作进程之间保持长连接。增删工作进程时暂停转发，把改变归属的会话从原进程迁出、迁入新进程。
+    """
+    def __init__(self, nodes=(), token='', timeout=60.0, scale=None):
+        """
+        nodes 为工作进程地址（host:port）；token 为迁移接口的令牌；scale(n) 由 POST /shard/scale 调用。
+        timeout 为等待工作进程响应的秒数，须大于同步模式 /telechat 的最长等待时间。
+        """
+        self.ring = HashRing(nodes)
+        self.token = token
+        self.timeout = timeout
+        self.scale = scale
+        self.local = threading.local()  # 每个线程到各工作进程的连接
+        self.cond = threading.Condition()
+        self.active = 0  # 正在转发的请求数
+        self.rebalancing = False
+        self.forwardedCount = 0
+        self.migratedCount = 0
+
+    def __call__(self, environ, startResponse):
+        request = Request(environ)
+        if request.path.startswith('/shard/'):
+            response = self.admin(request)
+        elif request.path == '/metrics' and request.method == 'GET':
+            response = self.metrics()
+        else:
+            response = self.route(request)
+        return response(environ, startResponse)
+
+    @staticmethod
+    def usernameOf(request):
+        """从查询参数、表单或JSON中取出用户名，没有时返回空字符串"""
+        request.get_data(cache=True)  # 先缓存请求体，解析表单后仍可原样转发
+        username = request.args.get('username') or request.form.get('username')
+        if not username:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                username = data.get('username')
+        return username if isinstance(username, str) else ''
+
+    def route(self, request):
+        """转发给用户所属的工作进程"""
+        username = self.usernameOf(request)
+        with self.cond:
+            while self.rebalancing:
+                self.cond.wait()
+            node = self.ring.nodeFor(username)
+            self.active += 1
+        try:
+            if node is None:
+                return self.jsonResponse({'error': '没有可用的工作进程'}, 503)
+            headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_HEADERS}
+            headers['X-Forwarded-For'] = request.remote_addr or ''
+            path = request.full_path if request.query_string else request.path
+            try:
+                status, reason, responseHeaders, body = self.send(
+                    node, request.method, path, request.get_data(), headers, stream=True)
+            except OSError as exc:
+                return self.jsonResponse({'error': f'工作进程不可用：{exc}'}, 502)
+            responseHeaders = [(name, value) for name, value in responseHeaders
+                               if name.lower() not in HOP_HEADERS and name.lower() not in ('server', 'date')]
+            return Response(body, status=f'{status} {reason}', headers=responseHeaders)
+        finally:
+            with self.cond:
+                self.active -= 1
+                self.forwardedCount += 1
+                self.cond.notify_all()
+
+    def send(self, node, method, path, body=None, headers=None, stream=False):
+        """
+        通过长连接发送请求，连接已被对端关闭时重连一次；返回 (状态码, 原因, 首部, 响应体)。
+        stream 为True且响应为SSE时，响应体为逐块读取的迭代器，该连接不再复用。
+        """
+        connections = getattr(self.local, 'connections', None)
+        if connections is None:
+            connections = self.local.connections = {}
+        for attempt in range(2):
+            connection = connections.get(node)
+            if connection is None:
+                host, port = node.rsplit(':', 1)
+                connection = connections[node] = http.client.HTTPConnection(host, int(port), timeout=self.timeout)
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                if stream and (response.getheader('Content-Type') or '').startswith('text/event-stream'):
+                    del connections[node]
+                    return response.status, response.reason, response.getheaders(), self.relay(connection, response)
+                payload = response.read()
+                if response.will_close:
+                    connection.close()
+                    del connections[node]
+                return response.status, response.reason, response.getheaders(), payload
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                del connections[node]
+                if attempt:
+                    raise
+        raise OSError(f'无法连接 {node}')
+
+    @staticmethod
+    def relay(connection, response):
+        """逐块转发SSE响应，客户端断开或工作进程结束推送时关闭连接"""
+        try:
+            while True:
+                chunk = response.read1(65536)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            connection.close()
+
+    def call(self, node, method, path, payload=None):
+        """调用工作进程的迁移接口，返回解析后的JSON"""
+        headers = {SHARD_HEADER: self.token, 'Content-Type': 'application/json'}
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        status, _, _, data = self.send(node, method, path, body, headers)
+        if status != 200:
+            raise OSError(f'{node}{path} 返回 {status}: {data[:200]!r}')
+        return json.loads(data)
+
+    def addNode(self, node):
+        """加入工作进程并迁入归属改变的会话，返回迁移的会话数"""
+        ring = self.ring.copy()
+        ring.add(node)
+        return self.rebalance(ring)
+
+    def removeNode(self, node):
+        """移除工作进程并把它的会话迁到其余进程，返回迁移的会话数"""
+        ring = self.ring.copy()
+        ring.remove(node)
+        return self.rebalance(ring)
+
+    def rebalance(self, ring):
+        """
+        切换到新的哈希环：等待正在转发的请求完成后暂停转发，
+        逐个询问原有工作进程拥有的用户，把归属改变的会话成批复制到新的归属进程，
+        全部复制成功后才切换哈希环并通知原进程删除。读取或复制失败时删除已复制的副本、
+        保持原哈希环并抛出OSError，原进程的会话不受影响。
+        """
+        with self.cond:
+            while self.rebalancing:
+                self.cond.wait()
+            self.rebalancing = True
+            while self.active:
+                self.cond.wait()
+        copied = []  # (原进程, 目标进程, 用户名列表)
+        try:
+            try:
+                for node in self.ring.nodes:
+                    usernames = self.call(node, 'GET', '/shard/sessions')['usernames']
+                    targets = {}
+                    for username in usernames:
+                        target = ring.nodeFor(username)
+                        if target != node and target is not None:
+                            targets.setdefault(target, []).append(username)
+                    for target, names in targets.items():
+                        sessions = self.call(node, 'POST', '/shard/export', {'usernames': names})['sessions']
+                        self.call(target, 'POST', '/shard/import', {'sessions': sessions})
+                        copied.append((node, target, names))
+            except OSError as exc:
+                print(f"[ShardRouter] 迁移失败，保持原有分片: {exc}")
+                for _, target, names in copied:
+                    self.release(target, names)
+                raise
+            self.ring = ring
+            moved = 0
+            for node, _, names in copied:
+                self.release(node, names)
+                moved += len(names)
+            self.migratedCount += moved
+        finally:
+            with self.cond:
+                self.rebalancing = False
+                self.cond.notify_all()
+        return moved
+
+    def release(self, node, usernames):
+        """通知工作进程删除已不归它所有的会话，失败时只提示（该进程可能已退出）"""
+        try:
+            self.call(node, 'POST', '/shard/release', {'usernames': usernames})
+        except OSError as exc:
+            print(f"[ShardRouter] 无法删除 {node} 上的 {len(usernames)} 个会话: {exc}")
+
+    def admin(self, request):
+        """
+        POST /shard/scale（表单字段 workers）调整工作进程数，只接受本机请求；
+        工作进程的迁移接口不对外转发。
+        """
+        if request.path != '/shard/scale' or request.method != 'POST' or self.scale is None:
+            return self.jsonResponse({'error': '接口不存在'}, 404)
+        if request.remote_addr not in ('127.0.0.1', '::1'):
+            return self.jsonResponse({'error': '只允许本机调用'}, 403)
+        try:
+            workers = int(request.form.get('workers', ''))
+        except ValueError:
+            return self.jsonResponse({'error': '工作进程数无效'}, 400)
+        if workers < 1:
+            return self.jsonResponse({'error': '工作进程数无效'}, 400)
+        try:
+            moved = self.scale(workers)
+        except OSError as exc:
+            return self.jsonResponse({'error': f'迁移失败：{exc}', 'workers': len(self.ring)}, 502)
+        return self.jsonResponse({'workers': len(self.ring), 'migrated': moved}, 200)
+
+    def metrics(self):
+        """汇总各工作进程的会话计数"""
+        shards = {}
+        total = {}
+        for node in list(self.ring.nodes):
+            try:
+                status, _, _, data = self.send(node, 'GET', '/metrics')
+                shards[node] = json.loads(data) if status == 200 else {'error': status}
+            except (OSError, ValueError) as exc:
+                shards[node] = {'error': str(exc)}
+                continue
+            for name, value in shards[node].get('sessions', {}).items():
+                total[name] = total.get(name, 0) + value
+        payload = {
+            'sessions': total,
+            'shards': shards,
+            'router': {'workers': len(self.ring), 'forwarded': self.forwardedCount, 'migrated': self.migratedCount},
+        }
+        return self.jsonResponse(payload, 200)
+
+    @staticmethod
+    def jsonResponse(payload, status):
+        return Response(json.dumps(payload, ensure_ascii=False), status=status, mimetype='application/json')
+
+
+class ShardCluster:
+    """
+    在本机启动工作进程（每个进程运行一个 app）和路由；scaleTo 增减工作进程并迁移会话。
+    """
+    def __init__(self, workers=2, basePort=5001, host='127.0.0.1', env=None, verbose=True):
+        """env 为工作进程的环境变量，默认继承当前进程；verbose 为False时丢弃工作进程的输出"""
+        self.host = host
+        self.verbose = verbose
+        self.basePort = basePort
+        self.env = dict(os.environ if env is None else env)
+        self.token = secrets.token_hex(16)
+        self.processes = {}  # 地址 -> 子进程
+        self.router = ShardRouter(token=self.token, scale=self.scaleTo)
+        self.initial = workers
+        self.lock = threading.Lock()
+
+    def start(self):
+        """启动初始的工作进程，全部就绪后加入路由"""
+        nodes = [self.spawn() for _ in range(self.initial)]
+        for node in nodes:
+            self.waitReady(node)
+            self.router.ring.add(node)
+        return self
+
+    def spawn(self):
+        """在下一个空闲端口启动工作进程，返回其地址"""
+        port = self.basePort
+        while f'{self.host}:{port}' in self.processes:
+            port += 1
+        node = f'{self.host}:{port}'
+        env = self.workerEnv(port)
+        output = None if self.verbose else subprocess.DEVNULL  # 工作进程的访问日志写在 stderr
+        self.processes[node] = subprocess.Popen([sys.executable, '-m', 'src.Interpreter.app'], env=env,
+                                                stdout=output, stderr=output)
+        return node
+
+    def workerEnv(self, port):
+        """
+        工作进程的环境变量。设置了 DSL_SESSION_DB 时每个进程使用自己的会话存储（文件名加端口，如 sessions.5001.db），
+        进程只列出、迁移和删除自己拥有的会话，不会误动其他分片的会话。
+        """
+        env = dict(self.env, DSL_PORT=str(port), DSL_SHARD_TOKEN=self.token)
+        if env.get('DSL_SESSION_DB'):
+            root, ext = os.path.splitext(env['DSL_SESSION_DB'])
+            env['DSL_SESSION_DB'] = f'{root}.{port}{ext}'
+        return env
+
+    def waitReady(self, node, timeout=READY_TIMEOUT):
+        """等待工作进程开始接受请求"""
+        deadline = time.time() + timeout
+        while True:
+            if self.processes[node].poll() is not None:
+                raise RuntimeError(f'工作进程 {node} 启动失败，退出码 {self.processes[node].returncode}')
+            try:
+                self.router.call(node, 'GET', '/shard/sessions')
+                return
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f'工作进程 {node} 未在 {timeout} 秒内就绪')
+                time.sleep(0.1)
+
+    def scaleTo(self, workers):
+        """调整工作进程数，返回迁移的会话数。迁移失败时抛出OSError，未能加入的进程被停止，未迁空的进程保留"""
+        moved = 0
+        with self.lock:
+            while len(self.router.ring) < workers:
+                node = self.spawn()
+                try:
+                    self.waitReady(node)
+                    moved += self.router.addNode(node)
+                except BaseException:
+                    self.terminate(node)
+                    raise
+            while len(self.router.ring) > workers:
+                node = self.router.ring.nodes[-1]
+                moved += self.router.removeNode(node)
+                self.terminate(node)
+        return moved
+
+    def terminate(self, node):
+        process = self.processes.pop(node)
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def stop(self):
+        """停止所有工作进程"""
+        for node in list(self.processes):
+            self.terminate(node)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多进程分片部署：按用户名一致性哈希把会话分配给工作进程')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='工作进程数，默认CPU核数')
+    parser.add_argument('--host', default='127.0.0.1', help='路由监听地址')
+    parser.add_argument('--port', type=int, default=5000, help='路由监听端口')
+    parser.add_argument('--base-port', type=int, default=5001, help='工作进程的起始端口')
+    args = parser.parse_args()
+    cluster = ShardCluster(args.workers, args.base_port).start()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # 收到 SIGTERM 时同样停止工作进程
+    try:
+        run_simple(args.host, args.port, cluster.router, threaded=True)
+    finally:
+        cluster.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+from src.Interpreter.DataStructure import VarRef, UNSET
+
+
+class SpeakTemplate:
+    """
+    编译后的Speak模板：字面量与变量槽位分离，变量按符号表下标取值。
+    不含变量的模板在编译时折叠为一个常量字符串。
+    """
+    __slots__ = ('parts', 'slots', 'text')
+
+    def __init__(self, fragments, varIndex):
+        """fragments 为字符串字面量和VarRef组成的序列，varIndex 为变量名到槽位下标的映射"""
+        parts = []
+        slots = []
+        for fragment in fragments:
+            if isinstance(fragment, VarRef):
+                # (部件位置, 变量槽位, 变量缺失时的占位文本)
+                slots.append((len(parts), varIndex[fragment.name], f'[{fragment.name}]'))
+                parts.append('')
+            elif parts and not (slots and slots[-1][0] == len(parts) - 1):
+                parts[-1] += fragment  # 相邻的字面量合并
+            else:
+                parts.append(fragment)
+        self.parts = tuple(parts)
+        self.slots = tuple(slots)
+        self.text = ''.join(parts) if not slots else None  # 常量折叠
+
+    def render(self, values):
+        """按变量槽位填充并一次性拼接输出，未设置（UNSET）或值为None的变量显示占位文本"""
+        if self.text is not None:
+            return self.text
+        parts = list(self.parts)
+        for position, index, missing in self.slots:
+            value = values[index]
+            parts[position] = missing if value is None or value is UNSET else str(value)
+        return ''.join(parts)
+
+    def __repr__(self):
+        return f"SpeakTemplate({self.parts!r}, {self.slots!r})"
@@ -0,0 +1,221 @@
+import time
+from src.Interpreter.DataStructure import UserTable
+
+# feed 接受的事件
+START = 'start'  # 从主步骤开始
+INPUT = 'input'  # 用户输入
+TIMEOUT = 'timeout'  # Listen超时
+TIMEOUT_MESSAGE = "系统检测到您长时间未输入，如需继续请重新输入。"
+LOOP_MESSAGE = "系统检测到脚本步骤循环跳转，对话已结束。"
+MAX_JUMPS = 1000  # 两次Listen之间允许的最大跳转次数，超过视为脚本死循环
+
+
+class SessionState:
+    """
+    会话的执行状态：当前步骤下标、步骤内的指令位置以及分支判断所需的标志。
+    不持有线程、事件或锁，执行在Listen处暂停、收到输入或超时后继续，
+    线程调度、协程调度和内联的 feed 共用同一套执行逻辑。
+    """
+    __slots__ = ('tree', 'source', 'userTable', 'stepIndex', 'pc', 'isInTime', 'flag',
+                 'userInput', 'intentMeta', 'deadline')
+
+    def __init__(self, tree, source=None, userTable=None):
+        """tree 须已链接；source 为可选的脚本句柄，用于在步骤边界切换到热加载后的新版本"""
+        self.tree = tree  # 语法树
+        self.source = source  # 脚本句柄
+        self.userTable = userTable or UserTable(tree.getVarName(), tree.getVarIndex())  # 用户数据表
+        self.stepIndex = None  # 当前步骤下标，None表示未开始或已结束
+        self.pc = 0  # 下一条要执行的指令在步骤内的位置
+        self.isInTime = False  # 最近一次Listen是否在超时前收到输入
+        self.flag = False  # 分支未命中时跳过本步骤的Silence
+        self.userInput = None  # 用户输入
+        self.intentMeta = None  # 最近一次意图识别的结果
+        self.deadline = None  # 停在Listen时的超时时间点（time.time()），否则为None
+
+    def restart(self):
+        """从主步骤重新开始"""
+        self.stepIndex = self.tree.getMainIndex()
+        self.pc = 0
+        self.isInTime = False
+        self.flag = False
+        self.userInput = None
+        self.intentMeta = None
+        self.deadline = None
+
+    def fork(self):
+        """共用语法树和用户数据表的新执行状态（未开始），重新开始对话时使用，旧状态留给已过期的调度"""
+        return SessionState(self.tree, self.source, self.userTable)
+
+    def isFinished(self):
+        """对话是否已结束（或尚未开始）"""
+        return self.stepIndex is None
+
+    def snapshot(self):
+        """
+        可JSON序列化的执行状态。步骤按名称记录，脚本热加载或进程重启后仍能对应到同名步骤。
+        """
+        return {
+            'step': None if self.stepIndex is None else self.tree.getStepNames()[self.stepIndex],
+            'pc': self.pc,
+            'isInTime': self.isInTime,
+            'flag': self.flag,
+            'userInput': self.userInput,
+            'deadline': self.deadline,
+            'values': dict(self.userTable.getTable()),
+        }
+
+    @classmethod
+    def restore(cls, data, tree, source=None):
+        """
+        由 snapshot 的结果恢复执行状态。原步骤已不存在或指令位置对不上时，恢复为已结束的对话。
+        """
+        state = cls(tree, source)
+        for infoName, userInfo in data.get('values', {}).items():
+            state.userTable.setUser(infoName, userInfo)
+        stepIndex = tree.getStepIndex().get(data.get('step'))
+        if stepIndex is None:
+            return state
+        step = tree.getProgram()[stepIndex]
+        pc = data.get('pc', 0)
+        deadline = data.get('deadline')
+        if pc > len(step) or (deadline is not None and (pc == 0 or step[pc - 1][0] != 'Listen')):
+            return state  # 步骤内容已变化，无法定位到原来的Listen
+        state.stepIndex = stepIndex
+        state.pc = pc
+        state.isInTime = data.get('isInTime', False)
+        state.flag = data.get('flag', False)
+        state.userInput = data.get('userInput')
+        state.deadline = deadline
+        return state
+
+
+def jump(state, stepIndex):
+    """跳转到指定步骤的开头"""
+    state.stepIndex = stepIndex
+    state.pc = 0
+    state.flag = False
+
+
+def refreshTree(state):
+    """
+    在步骤边界检查脚本是否发布了新版本；新版本中仍存在当前步骤时才切换。
+    """
+    if state.source is None:
+        return
+    tree = state.source.getTree()
+    if tree is not state.tree:
+        newIndex = tree.getStepIndex().get(state.tree.getStepNames()[state.stepIndex])
+        if newIndex is not None:
+            state.tree = tree
+            state.stepIndex = newIndex
+            state.userTable.rebind(tree.getVarName(), tree.getVarIndex())  # 新版本的符号表可能不同
+
+
+def run(state, emit):
+    """
+    从当前位置执行到下一个Listen或对话结束。emit 接收每条输出。
+    在Listen处暂停时返回等待的秒数，对话结束时返回None。
+    """
+    jumps = 0
+    while state.stepIndex is not None:
+        if state.pc == 0:
+            refreshTree(state)
+        step = state.tree.getProgram()[state.stepIndex]
+        jumped = False
+        while state.pc < len(step):
+            instruction = step[state.pc]
+            state.pc += 1
+            kind = instruction[0]
+            if kind == 'Speak':
+                emit(instruction[1].render(state.userTable.getValues()))
+            elif kind == 'Listen':
+                state.userInput = None
+                return instruction[1]
+            elif kind == 'Branch':
+                if state.isInTime:
+                    # 处理分支，根据用户输入决定跳转到哪个步骤，多个关键词命中时以先声明的为准
+                    target = instruction[1].match(state.userInput or '')
+                    if target is not None:
+                        jump(state, target)
+                        jumped = True
+                        break
+                    state.flag = True
+            elif kind == 'Silence':
+                # 分支未命中时跳过Silence，继续执行下一条指令
+                if state.flag:
+                    state.flag = False
+                    continue
+                jump(state, instruction[1])
+                jumped = True
+                break
+            elif kind == 'Default':
+                jump(state, instruction[1])
+                jumped = True
+                break
+            elif kind == 'Exit':
+                state.stepIndex = None
+                return None
+        if not jumped:
+            jump(state, state.stepIndex)  # 步骤执行完未跳转时重新执行该步骤
+        jumps += 1
+        if jumps > MAX_JUMPS:
+            emit(LOOP_MESSAGE)
+            state.stepIndex = None
+    return None
+
+
+def applyIntent(state, intentService, intentResult=None):
+    """用意图识别的结果补充用户输入，便于分支匹配；intentResult 为预先识别的结果，省略时在此识别"""
+    if not state.userInput:
+        return
+    if intentResult is None:
+        intentResult = intentService.match_intent(state.userInput)
+    state.intentMeta = intentResult
+    intentKeyword = intentResult.get('intent')
+    if intentKeyword and intentKeyword not in state.userInput:
+        state.userInput = f"{state.userInput} {intentKeyword}"
+
+
+def resume(state, isInTime, emit):
+    """
+    Listen结束后继续执行。isInTime 为False表示超时；当前步骤没有Silence时提示超时。
+    返回值同 run。
+    """
+    state.isInTime = isInTime
+    if not isInTime:
+        step = state.tree.getProgram()[state.stepIndex]
+        if not any(instruction[0] == 'Silence' for instruction in step):
+            emit(TIMEOUT_MESSAGE)
+    return run(state, emit)
+
+
+def feed(state, event, text=None, now=None, intentService=None, intentResult=None):
+    """
+    以事件推进会话，执行到下一个Listen或Exit为止，不阻塞、不依赖线程。
+    event 为 START、INPUT（text 为输入内容）或 TIMEOUT；now 默认为 time.time()。
+    intentResult 为预先识别的输入意图，提供时不再调用 intentService。
+    返回 (本次产生的输出列表, 下一次超时的时间点)，对话结束时时间点为None。
+    未停在Listen时的输入、尚未到期的超时视为过期事件，直接忽略。
+    """
+    if now is None:
+        now = time.time()
+    outputs = []
+    if event == START:
+        state.restart()
+        timeout = run(state, outputs.append)
+    elif state.deadline is None:
+        return outputs, None  # 对话未开始或已结束
+    elif event == INPUT:
+        state.userInput = text
+        state.intentMeta = None
+        if intentResult is not None or intentService is not None:
+            applyIntent(state, intentService, intentResult)
+        timeout = resume(state, True, outputs.append)
+    elif event == TIMEOUT:
+        if now < state.deadline:
+            return outputs, state.deadline
+        timeout = resume(state, False, outputs.append)
+    else:
+        raise ValueError(f"Unknown event: {event}")
+    state.deadline = None if timeout is None else now + timeout
+    return outputs, state.deadline
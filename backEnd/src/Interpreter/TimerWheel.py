@@ -0,0 +1,137 @@
+import math
+import threading
+import time
+
+TICK = 0.05  # 时间轮的最小刻度（秒）
+SLOTS = 256  # 每层的槽数
+LEVELS = 4  # 层数，默认可覆盖 0.05 × 256^4 秒
+
+
+class TimerWheel:
+    """
+    分层时间轮：集中管理所有会话的Listen超时。
+    第 L 层的每个槽覆盖 SLOTS^L 个刻度，低层转完一圈时把高层对应槽中的定时器下放到低层；
+    登记和取消都是 O(1)，到期的定时器在推进时成批取出。定时器不会早于截止时间触发。
+    """
+    def __init__(self, tick=TICK, slots=SLOTS, levels=LEVELS, now=None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.buckets = [[{} for _ in range(slots)] for _ in range(levels)]  # 每个槽为 {键: 到期刻度}
+        self.timers = {}  # 键 -> (到期刻度, 层, 槽)
+        self.current = int((time.time() if now is None else now) / tick)  # 已处理到的刻度
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.timers)
+
+    def schedule(self, key, deadline):
+        """登记（或替换）键的定时器，deadline 为 time.time() 时间点"""
+        with self.lock:
+            self._remove(key)
+            self._insert(key, max(math.ceil(deadline / self.tick), self.current + 1))
+
+    def cancel(self, key):
+        """取消键的定时器，返回是否存在"""
+        with self.lock:
+            return self._remove(key)
+
+    def advance(self, now=None):
+        """推进到 now，返回到期的键列表（按到期刻度排列）"""
+        target = int((time.time() if now is None else now) / self.tick)
+        expired = []
+        with self.lock:
+            if not self.timers:
+                self.current = max(self.current, target)
+                return expired
+            while self.current < target:
+                self.current += 1
+                self._cascade()
+                bucket = self.buckets[0][self.current % self.slots]
+                if not bucket:
+                    continue
+                self.buckets[0][self.current % self.slots] = {}
+                for key, tick in bucket.items():
+                    if tick <= self.current:
+                        del self.timers[key]
+                        expired.append(key)
+                    else:  # 超出最高层范围的定时器，重新放入
+                        self._insert(key, tick)
+        return expired
+
+    def _insert(self, key, tick):
+        """按剩余刻度数选择层和槽（需持有锁）"""
+        delta = tick - self.current
+        span = self.slots
+        level = 0
+        while delta >= span and level < self.levels - 1:
+            span *= self.slots
+            level += 1
+        unit = span // self.slots  # 该层每个槽覆盖的刻度数
+        position = min(tick, self.current + span - 1)  # 超出最高层范围时先放在最远的槽
+        slot = (position // unit) % self.slots
+        self.buckets[level][slot][key] = tick
+        self.timers[key] = (tick, level, slot)
+
+    def _remove(self, key):
+        """删除键的定时器（需持有锁）"""
+        entry = self.timers.pop(key, None)
+        if entry is None:
+            return False
+        _, level, slot = entry
+        del self.buckets[level][slot][key]
+        return True
+
+    def _cascade(self):
+        """当前刻度使低层转完一圈时，把高层对应槽的定时器下放（需持有锁）"""
+        wrapped = []
+        unit = 1
+        for level in range(1, self.levels):
+            unit *= self.slots
+            if self.current % unit:
+                break
+            wrapped.append((level, (self.current // unit) % self.slots))
+        for level, slot in reversed(wrapped):  # 先处理高层，下放的定时器可能落入随后处理的低层槽
+            bucket = self.buckets[level][slot]
+            if bucket:
+                self.buckets[level][slot] = {}
+                for key, tick in bucket.items():
+                    self._insert(key, tick)
+
+
+class TimerService:
+    """
+    后台线程每个刻度推进一次时间轮，把到期的键成批交给 handler 处理。
+    """
+    def __init__(self, wheel, handler):
+        self.wheel = wheel
+        self.handler = handler
+        self.stopEvent = threading.Event()
+        self.thread = None
+
+    def pollOnce(self, now=None):
+        """推进一次并处理到期的键，返回处理的数量"""
+        expired = self.wheel.advance(now)
+        if expired:
+            try:
+                self.handler(expired)
+            except Exception as exc:
+                print(f"[TimerWheel] 处理超时失败: {type(exc).__name__}: {exc}")
+        return len(expired)
+
+    def start(self):
+        """启动后台线程"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopEvent.clear()
+
+        def _runner():
+            while not self.stopEvent.wait(self.wheel.tick):
+                self.pollOnce()
+
+        self.thread = threading.Thread(target=_runner, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止后台线程"""
+        self.stopEvent.set()
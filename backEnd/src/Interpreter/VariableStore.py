@@ -0,0 +1,184 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+FORMATS = ('csv', 'jsonl')
+FIELDS = ('username', 'variable', 'value')  # CSV 表头、JSONL 记录的字段
+BATCH_SIZE = 10000  # 每个事务写入的记录数
+MAX_ERRORS = 20  # 导入结果中最多列出的出错记录数
+DEFAULT_SCRIPT_PATH = 'src/Test/Example/test2.txt'
+
+
+class VariableStore:
+    """
+    用户变量的共享存储（SQLite，WAL模式）：批量导入的 (用户名, 变量, 值)，每次登录时载入会话。
+    多个进程（例如分片工作进程）可以指向同一个数据库文件；path 为 ':memory:' 时只在本进程内有效。
+    """
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.lock = threading.Lock()  # 连接在多个线程间共享，由锁串行化
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS variables ('
+            'username TEXT NOT NULL, name TEXT NOT NULL, value TEXT NOT NULL, updated REAL NOT NULL, '
+            'PRIMARY KEY (username, name)) WITHOUT ROWID')
+        self.conn.commit()
+
+    def putMany(self, rows):
+        """在一个事务中写入多个 (用户名, 变量, 值)，已有的值被覆盖"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO variables (username, name, value, updated) VALUES (?, ?, ?, ?)',
+                [(username, name, value, now) for username, name, value in rows])
+
+    def load(self, username):
+        """用户的全部变量 {变量: 值}，没有时为空字典"""
+        with self.lock:
+            rows = self.conn.execute('SELECT name, value FROM variables WHERE username = ?', (username,)).fetchall()
+        return dict(rows)
+
+    def clear(self):
+        """删除所有变量"""
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM variables')
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM variables').fetchone()[0]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self.lock:
+            self.conn.close()
+
+
+def formatFor(name):
+    """由文件名或 Content-Type 判断格式，无法判断时按 CSV 处理"""
+    name = (name or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in name or 'jsonl' in name:
+        return 'jsonl'
+    return 'csv'
+
+
+def readRecords(lines, format='csv'):
+    """
+    逐行解析记录，不把整个输入读入内存。lines 为文本行的迭代器（文件、请求流）。
+    产生 (行号, (用户名, 变量, 值), None)，无法解析的记录产生 (行号, None, 错误信息)。
+    CSV 首行为表头，须含 username、variable、value 三列（顺序不限）；JSONL 每行一个对象。
+    """
+    if format == 'jsonl':
+        for lineNo, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield lineNo, None, 'JSON格式错误'
+                continue
+            if not isinstance(item, dict):
+                yield lineNo, None, '记录须为JSON对象'
+                continue
+            yield (lineNo, *checkRecord(item))
+        return
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return  # 空输入
+    missing = [field for field in FIELDS if field not in reader.fieldnames]
+    if missing:
+        yield 1, None, f"表头缺少列: {', '.join(missing)}"
+        return
+    for item in reader:
+        yield (reader.line_num, *checkRecord(item))
+
+
+def checkRecord(item):
+    """检查记录的字段类型，返回 ((用户名, 变量, 值), None) 或 (None, 错误信息)；数字的值转为字符串"""
+    username, name, value = (item.get(field) for field in FIELDS)
+    if not isinstance(username, str) or not username:
+        return None, '缺少用户名'
+    if not isinstance(name, str) or not name:
+        return None, '缺少变量名'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        return None, '变量值须为字符串或数字'
+    return (username, name, value), None
+
+
+def importRecords(store, records, varNames, batchSize=BATCH_SIZE):
+    """
+    校验 readRecords 产生的记录并分批写入 store，每 batchSize 条一个事务。
+    变量须为脚本中使用的变量（Root.getVarName()），否则拒绝该条记录。
+    返回 {'imported': 写入条数, 'rejected': 拒绝条数, 'errors': 前几条出错记录的行号和原因}；
+    输入无法解码时停止读取，已写入的批次保留，结果中另有 'error'。
+    """
+    varNames = set(varNames)
+    result = {'imported': 0, 'rejected': 0, 'errors': []}
+    batch = []
+    try:
+        for lineNo, record, error in records:
+            if error is None and record[1] not in varNames:
+                error = f'脚本中没有变量: {record[1]}'
+            if error is not None:
+                result['rejected'] += 1
+                if len(result['errors']) < MAX_ERRORS:
+                    result['errors'].append({'line': lineNo, 'error': error})
+                continue
+            batch.append(record)
+            if len(batch) >= batchSize:
+                store.putMany(batch)
+                result['imported'] += len(batch)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as exc:
+        result['error'] = f'输入无法解析: {exc}'
+    if batch:
+        store.putMany(batch)
+        result['imported'] += len(batch)
+    return result
+
+
+def main(argv=None):
+    """
+    命令行批量导入：python -m src.Interpreter.VariableStore --db vars.db [--script 脚本] 文件 ...
+    文件为 CSV 或 JSONL（按扩展名判断，或用 --format 指定），省略文件或为 - 时读取标准输入。
+    """
+    from src.Interpreter.ScriptCache import loadScript
+    parser = argparse.ArgumentParser(description='批量导入用户变量')
+    parser.add_argument('files', nargs='*', default=['-'], help='CSV 或 JSONL 文件，- 表示标准输入')
+    parser.add_argument('--db', default=os.getenv('DSL_VARIABLE_DB', ''), help='变量数据库，默认取 DSL_VARIABLE_DB')
+    parser.add_argument('--script', default=DEFAULT_SCRIPT_PATH, help='校验变量名所用的脚本文件')
+    parser.add_argument('--format', choices=FORMATS, help='输入格式，默认按扩展名判断（标准输入为 csv）')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='每个事务写入的记录数')
+    args = parser.parse_args(argv)
+    if not args.db:
+        parser.error('需要 --db 或环境变量 DSL_VARIABLE_DB')
+    varNames = loadScript(args.script).getVarName()
+    store = VariableStore(args.db)
+    failed = False
+    try:
+        for fileName in args.files:
+            format = args.format or formatFor(fileName if fileName != '-' else '')
+            begin = time.perf_counter()
+            if fileName == '-':
+                result = importRecords(store, readRecords(sys.stdin, format), varNames, args.batch_size)
+            else:
+                with open(fileName, encoding='utf-8', newline='') as f:
+                    result = importRecords(store, readRecords(f, format), varNames, args.batch_size)
+            result['seconds'] = round(time.perf_counter() - begin, 3)
+            print(f"{fileName}: {json.dumps(result, ensure_ascii=False)}")
+            failed = failed or 'error' in result
+    finally:
+        store.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
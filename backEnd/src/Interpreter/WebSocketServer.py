@@ -0,0 +1,221 @@
+import json
+import threading
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+import trio
+from trio_websocket import ConnectionClosed, serve_websocket
+
+HEARTBEAT = 20.0  # 空闲连接每隔多少秒发送一次 ping
+PONG_TIMEOUT = 10.0  # 发出 ping 后等待 pong 的最长时间，超时视为连接已断开
+MAX_MESSAGE_SIZE = 64 * 1024  # 单条消息的最大字节数
+
+
+class Connection:
+    """一个 WebSocket 连接对应的会话及已发送到的输出序号"""
+    __slots__ = ('username', 'interpreter', 'results', 'seq', 'wake', 'listener')
+
+    def __init__(self, username, interpreter, seq=0):
+        self.username = username
+        self.interpreter = interpreter
+        self.results = interpreter.resultLog()
+        self.seq = seq  # 已发送的最大序号
+        self.wake = trio.Event()  # 输出日志有新输出或会话被替换时触发
+        self.listener = None  # 登记在输出日志上的回调
+
+
+class WebSocketServer:
+    """
+    WebSocket 对话接口（trio-websocket，运行在独立线程的 trio 事件循环中）：
+    ws://host:port/chat?username=...&lastEventId=... 建立连接后，客户端发送
+    {"type": "input", "text": ...} 或 {"type": "clear"}，服务端推送
+    {"type": "output", "id": 事件ID, "text": ...}，事件ID与SSE推送相同，重连时带上最后收到的ID即可补发。
+    入站消息逐条处理，处理完才读取下一条（接收队列只有一条，TCP窗口随之收紧）；出站按序号从输出日志读取，
+    客户端读得慢时发送方等待，输出留在日志中不会堆积在内存队列里。断开连接不影响会话，对话可由 /stream 或
+    /repeatchat 继续。
+    """
+    def __init__(self, getSession, submitInput, restart, host='127.0.0.1', port=5002,
+                 heartbeat=HEARTBEAT, pongTimeout=PONG_TIMEOUT):
+        """
+        getSession(username) 返回会话的解释器（不存在时为None）；submitInput(username, interpreter, text)
+        与 restart(username, interpreter) 分别提交输入、重新开始对话，返回是否接受。三者在工作线程中调用。
+        """
+        self.getSession = getSession
+        self.submitInput = submitInput
+        self.restart = restart
+        self.host = host
+        self.port = port
+        self.heartbeat = heartbeat
+        self.pongTimeout = pongTimeout
+        self.thread = None
+        self.token = None  # trio 事件循环的令牌，用于从其他线程唤醒连接
+        self.cancelScope = None
+        self.ready = threading.Event()
+        self.error = None  # 服务线程退出时的异常
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.acceptedCount = 0
+        self.rejectedCount = 0
+        self.receivedCount = 0
+        self.sentCount = 0
+        self.timeoutCount = 0  # 因心跳超时关闭的连接数
+
+    def start(self):
+        """在后台线程中启动服务，监听成功后返回；port 为0时由系统分配端口"""
+        if self.thread is not None and self.thread.is_alive():
+            return self
+        self.ready.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='dsl-websocket', daemon=True)
+        self.thread.start()
+        if not self.ready.wait(10) or self.error is not None:
+            raise RuntimeError(f'WebSocket 服务未能在 {self.host}:{self.port} 启动: {self.error}')
+        return self
+
+    def _run(self):
+        try:
+            trio.run(self.serve)
+        except BaseException as exc:  # 端口被占用等启动错误交给 start 报告
+            self.error = exc
+            self.ready.set()
+
+    def stop(self):
+        """关闭所有连接并停止服务"""
+        if self.token is not None and self.cancelScope is not None:
+            try:
+                self.token.run_sync_soon(self.cancelScope.cancel)
+            except trio.RunFinishedError:
+                pass
+        if self.thread is not None:
+            self.thread.join(5)
+            self.thread = None
+
+    async def serve(self):
+        self.token = trio.lowlevel.current_trio_token()
+        async with trio.open_nursery() as nursery:
+            self.cancelScope = nursery.cancel_scope
+            server = await nursery.start(partial(serve_websocket, self.handle, self.host, self.port, None,
+                                                 max_message_size=MAX_MESSAGE_SIZE))
+            self.port = server.port
+            self.ready.set()
+
+    async def handle(self, request):
+        """处理一个连接：握手时校验会话，之后并发运行推送、接收和心跳"""
+        query = parse_qs(urlsplit(request.path).query)
+        username = (query.get('username') or [''])[0]
+        interpreter = await trio.to_thread.run_sync(self.getSession, username) if username else None
+        if interpreter is None:
+            self.rejectedCount += 1
+            await request.reject(403, body='用户未登录'.encode('utf-8'))
+            return
+        ws = await request.accept()
+        results = interpreter.resultLog()
+        connection = Connection(username, interpreter, results.parseEventID((query.get('lastEventId') or [''])[0]))
+        results.discard(connection.seq)  # 客户端已收到的输出不再保留
+        connection.listener = self.listenerFor(connection)
+        results.addListener(connection.listener)
+        with self.lock:
+            self.connections += 1
+            self.acceptedCount += 1
+        try:
+            async with trio.open_nursery() as nursery:
+                # 三个任务各自处理连接关闭，任一结束即取消其余任务
+                nursery.start_soon(self.pushOutputs, ws, connection, nursery.cancel_scope)
+                nursery.start_soon(self.keepAlive, ws, nursery.cancel_scope)
+                await self.receiveInputs(ws, connection)
+                nursery.cancel_scope.cancel()
+        finally:
+            connection.results.removeListener(connection.listener)
+            with self.lock:
+                self.connections -= 1
+
+    def listenerFor(self, connection):
+        """输出日志的回调：在解释器所在线程中调用，转到事件循环里触发连接的唤醒事件"""
+        def listener():
+            try:
+                self.token.run_sync_soon(lambda: connection.wake.set())
+            except trio.RunFinishedError:
+                pass
+        return listener
+
+    async def pushOutputs(self, ws, connection, cancelScope):
+        """按序号推送输出；会话被替换时改为推送新会话的输出，会话被删除时关闭连接"""
+        try:
+            while True:
+                entries = connection.results.after(connection.seq)
+                if not entries:
+                    latest = await trio.to_thread.run_sync(self.getSession, connection.username)
+                    if latest is None:
+                        await ws.aclose(1000, '会话已结束')
+                        return
+                    if latest is not connection.interpreter:
+                        connection.results.removeListener(connection.listener)
+                        connection.interpreter, connection.results, connection.seq = latest, latest.resultLog(), 0
+                        connection.results.addListener(connection.listener)
+                        continue
+                    await connection.wake.wait()
+                    connection.wake = trio.Event()
+                    continue
+                for seq, message in entries:
+                    payload = {'type': 'output', 'id': connection.results.eventID(seq), 'text': message}
+                    await ws.send_message(json.dumps(payload, ensure_ascii=False))  # 客户端读得慢时在此等待
+                    connection.seq = seq
+                    self.sentCount += 1
+        except ConnectionClosed:
+            cancelScope.cancel()
+
+    async def receiveInputs(self, ws, connection):
+        """逐条处理客户端消息，处理完一条才读取下一条，连接关闭时返回"""
+        try:
+            await self._receiveInputs(ws, connection)
+        except ConnectionClosed:
+            pass
+
+    async def _receiveInputs(self, ws, connection):
+        while True:
+            message = await ws.get_message()
+            self.receivedCount += 1
+            try:
+                data = json.loads(message)
+            except ValueError:
+                data = None
+            kind = data.get('type') if isinstance(data, dict) else None
+            if kind == 'input' and isinstance(data.get('text'), str) and data['text']:
+                accepted = await trio.to_thread.run_sync(
+                    self.submitInput, connection.username, connection.interpreter, data['text'])
+            elif kind == 'clear':
+                accepted = await trio.to_thread.run_sync(self.restart, connection.username, connection.interpreter)
+            elif kind == 'ping':
+                await ws.send_message(json.dumps({'type': 'pong'}))
+                continue
+            else:
+                await ws.send_message(json.dumps({'type': 'error', 'error': '消息格式无效'}, ensure_ascii=False))
+                continue
+            if not accepted:
+                await ws.send_message(json.dumps({'type': 'error', 'error': '系统繁忙，请稍后重试'}, ensure_ascii=False))
+
+    async def keepAlive(self, ws, cancelScope):
+        """定期 ping，对端在 pongTimeout 内未回应时关闭连接"""
+        while True:
+            await trio.sleep(self.heartbeat)
+            with trio.move_on_after(self.pongTimeout) as timeout:
+                try:
+                    await ws.ping()
+                except ConnectionClosed:
+                    cancelScope.cancel()
+                    return
+            if timeout.cancelled_caught:
+                self.timeoutCount += 1
+                cancelScope.cancel()
+                return
+
+    def metrics(self):
+        """连接和消息计数"""
+        with self.lock:
+            return {
+                'connections': self.connections,
+                'accepted': self.acceptedCount,
+                'rejected': self.rejectedCount,
+                'received': self.receivedCount,
+                'sent': self.sentCount,
+                'heartbeatTimeouts': self.timeoutCount,
+            }
@@ -1,164 +1,684 @@
+import atexit
+import hmac
+import io
+import os
+import signal
+import sys
 import threading
+import time
 from threading import Lock
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from src.Interpreter.Lexical import Lexical
-from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Reloader import ScriptWatcher
+from src.Interpreter.ScriptRegistry import ScriptRegistry
 from src.Interpreter.Interpreter import Interpreter
+from src.Interpreter.AsyncRuntime import AsyncRuntime
+from src.Interpreter.Linker import LinkError
+from src.Interpreter.StateMachine import START, INPUT, TIMEOUT
+from src.Interpreter.TimerWheel import TimerWheel, TimerService
+from src.Interpreter.SessionStore import SessionStore
+from src.Interpreter.SessionManager import SessionManager, MAX_SESSIONS, IDLE_TTL
+from src.Interpreter.Scheduler import Scheduler, PRIORITIES, DEFAULT_PRIORITY
+from src.Interpreter.WebSocketServer import WebSocketServer
+from src.Interpreter import ResultLog
+from src.Interpreter.VariableStore import VariableStore, FORMATS, formatFor, readRecords, importRecords
 
 app = Flask(__name__)
 CORS(app)  # 启用跨域请求
 
-# 初始化解释器基础实例
-lex = Lexical('src/Test/Example/test2.txt')  # 词法分析器实例，读取文件并解析
-lex.printTokens()  # 打印解析出的词法单元
-grmTree = Grammar(lex.getTokens())  # 使用解析出的tokens创建语法树
-print(grmTree.getGrmTree().getStep())  # 打印语法树步骤
-print(grmTree.getGrmTree().getVarName())  # 打印语法树变量名
-print(grmTree.getGrmTree().getBranch())  # 打印语法树分支
+# 脚本注册表：脚本ID首次使用时才加载（源文件未变化时直接加载编译产物），超出内存预算按LRU淘汰
+# DSL_SCRIPTS 可显式登记脚本，例如 "vip=scripts/vip.txt,bulk=scripts/bulk.txt"
+SCRIPT_PATH = 'src/Test/Example/test2.txt'
+DEFAULT_SCRIPT = 'default'
+SCRIPT_DIR = os.getenv('DSL_SCRIPT_DIR', 'src/Test/Example')
+SCRIPT_MEMORY_BUDGET = int(float(os.getenv('DSL_SCRIPT_MEMORY_MB', '64')) * 1024 * 1024)
+scripts = {DEFAULT_SCRIPT: SCRIPT_PATH}
+for item in os.getenv('DSL_SCRIPTS', '').split(','):
+    if '=' in item:
+        scriptID, fileName = item.split('=', 1)
+        scripts[scriptID.strip()] = fileName.strip()
+scriptRegistry = ScriptRegistry(scripts, SCRIPT_DIR, SCRIPT_MEMORY_BUDGET)
+
+# 脚本热加载：定期检查已加载的脚本文件，变化时增量解析并发布新版本，设为0关闭
+RELOAD_INTERVAL = float(os.getenv('DSL_RELOAD_INTERVAL', '2'))
+scriptWatcher = ScriptWatcher(scriptRegistry.loadedHandles, RELOAD_INTERVAL)
+if RELOAD_INTERVAL > 0:
+    scriptWatcher.start()
+
+# 对话调度方式：thread 为每个对话一个线程；asyncio 为每个对话一个协程，运行在 DSL_EVENT_LOOPS 个事件循环线程上；
+# inline 不为对话创建线程或协程，由请求处理函数直接推进状态机，Listen超时由时间轮统一触发；
+# pool 与 inline 相同，但推进对话的任务交给 DSL_WORKERS 个工作线程按优先级执行（vip 先于 normal、bulk）
+RUNTIME = os.getenv('DSL_RUNTIME', 'thread')
+FEED_RUNTIMES = ('inline', 'pool')  # 以 feed 推进状态机的调度方式
+asyncRuntime = AsyncRuntime(int(os.getenv('DSL_EVENT_LOOPS', '1'))) if RUNTIME == 'asyncio' else None
+maxPending = os.getenv('DSL_MAX_PENDING')
+scheduler = Scheduler(int(os.getenv('DSL_WORKERS', '4')), int(maxPending) if maxPending else None)
+if RUNTIME in FEED_RUNTIMES:
+    scheduler.start()  # inline 模式下仅用于执行时间轮到期的超时
+inlineLocks = [Lock() for _ in range(64)]  # 内联模式下串行化同一会话的请求，按用户名分组共用
+
+
+def inlineLock(username):
+    """内联模式下用户名对应的锁"""
+    return inlineLocks[hash(username) % len(inlineLocks)]
+
+
+def feedInline(username, interpreter, event, text=None, ticket=None):
+    """
+    内联模式下推进会话，并按新的超时时间点更新时间轮中该用户的定时器；ticket 为输入所属同步请求的票据。
+    意图识别（可能是耗时的LLM请求）在锁外完成，锁内只应用其结果，不阻塞同组的其他会话、时间轮和会话淘汰。
+    """
+    intent = interpreter.matchIntent(text) if event == INPUT else None
+    with inlineLock(username):
+        if event == TIMEOUT:
+            deadline = interpreter.expire()
+        else:
+            if event == INPUT:
+                interpreter.expire()  # 输入晚于超时时间点时先按超时处理（不应答票据）
+            deadline = interpreter.feed(event, text, ticket=ticket, intent=intent)
+        if deadline is None:
+            timerWheel.cancel(username)
+        else:
+            timerWheel.schedule(username, deadline)
+
+
+def advance(username, interpreter, event, text=None, ticket=None, background=False):
+    """
+    以事件推进会话：pool 模式（或 background 为True时）提交给工作线程池（同一会话按提交顺序执行），否则在当前线程执行。
+    返回是否接受，线程池排队已满时返回False。
+    """
+    if RUNTIME == 'pool' or background:
+        return scheduler.submit(username, lambda: feedInline(username, interpreter, event, text, ticket),
+                                interpreter.priority)
+    feedInline(username, interpreter, event, text, ticket)
+    return True
+
+
+def restartConversation(username, interpreter):
+    """
+    重新开始对话（/clearchat 与 WebSocket 共用），丢弃上一段对话未取走的输出；返回是否接受。
+    线程、协程调度下旧调度随代数过期自行退出，不在请求中等待，其输出在代数改变之后才丢弃（见 Interpreter.newRun）；
+    内联、线程池调度下在执行 START 时丢弃，排在它之前的任务的输出同样被丢弃。
+    """
+    if RUNTIME in FEED_RUNTIMES:
+        return advance(username, interpreter, START)
+    interpreter.startDispatch(asyncRuntime)
+    return True
+
+
+def submitInput(username, interpreter, text, ticket=None):
+    """提交用户输入（/telechat 与 WebSocket 共用），返回是否接受；ticket 为同步模式的票据"""
+    if RUNTIME in FEED_RUNTIMES:
+        return advance(username, interpreter, INPUT, text, ticket)
+    interpreter.setUserInput(text, ticket)
+    return True
+
+
+def expireSessions(usernames):
+    """
+    时间轮到期回调：成批推进超时的会话。超时交给工作线程执行，时间轮线程不等待会话锁，
+    某个会话推进较慢时不影响其他会话按时超时。线程池排队已满时超时不能丢（时间轮已删除该定时器），
+    改为下一个刻度重试；届时若已被输入推进，expire 按新的超时时间点处理。
+    """
+    for username in usernames:
+        interpreter = userState.get(username)
+        if interpreter is not None and not advance(username, interpreter, TIMEOUT, background=True):
+            timerWheel.schedule(username, time.time() + timerWheel.tick)
+
+
+timerWheel = TimerWheel()
+timerService = TimerService(timerWheel, expireSessions)
+if RUNTIME in FEED_RUNTIMES:
+    timerService.start()
+
+# SSE推送：空闲时每 DSL_STREAM_HEARTBEAT 秒（默认 15）发送一次保活注释，断线后浏览器按 STREAM_RETRY_MS 重连
+STREAM_HEARTBEAT = float(os.getenv('DSL_STREAM_HEARTBEAT', '15'))
+STREAM_RETRY_MS = 3000
+
+# 同步对话：/telechat 带 wait 字段（秒）时等到对话执行到下一个 Listen 或 Exit 再返回，最长 DSL_SYNC_WAIT_MAX 秒（默认 30）
+SYNC_WAIT_MAX = float(os.getenv('DSL_SYNC_WAIT_MAX', '30'))
+
+# 输出日志：每个会话最多保留 DSL_RESULT_RETENTION 条（默认 1000）未确认的输出，
+# 写满后按 DSL_RESULT_OVERFLOW 处理：dropOldest（默认，丢弃最早的）或 dropNewest（丢弃新输出）
+ResultLog.configure(os.getenv('DSL_RESULT_RETENTION') or None, os.getenv('DSL_RESULT_OVERFLOW') or None)
 
 # 用户信息存储（临时内存）
 userInfo = {}
 userInfoLock = Lock()  # 用于锁定用户信息字典
 
-userState = {}
-userStateLock = Lock()  # 用于锁定用户状态字典
+# 会话换出：设置 DSL_SESSION_DB 后，回收的会话写入SQLite（WAL模式）而不是丢弃，下一次请求时透明恢复；
+# 进程正常退出前写入所有会话，重启后同样按需恢复
+SESSION_DB = os.getenv('DSL_SESSION_DB', '')
+sessionStore = SessionStore(SESSION_DB) if SESSION_DB else None
 
-@app.route('/register', methods=['POST'])
-def register():
+
+def restoreSession(username, data):
+    """由快照重建解释器，停在Listen的对话继续等待剩余的时间；脚本已不存在或无法加载时返回None"""
+    scriptID = data.get('script') or DEFAULT_SCRIPT
+    try:
+        scriptHandle = scriptRegistry.getHandle(scriptID)
+    except (KeyError, LinkError) as exc:
+        print(f"[SessionStore] 无法恢复会话 {username}：脚本 {scriptID} 不可用 ({exc})")
+        return None
+    interpreter = Interpreter.restore(data, scriptHandle.getTree(), scriptHandle)
+    if interpreter.state.deadline is not None:
+        if RUNTIME in FEED_RUNTIMES:
+            timerWheel.schedule(username, interpreter.state.deadline)
+        else:
+            interpreter.startDispatch(asyncRuntime, resume=True)
+    return interpreter
+
+
+def releaseSession(username, interpreter):
+    """会话移出内存时取消其超时定时器，并唤醒该会话的推送连接"""
+    timerWheel.cancel(username)
+    if interpreter.resultQueue is not None:
+        interpreter.resultQueue.notifyAll()
+
+
+# 会话表：最多保留 DSL_MAX_SESSIONS 个会话（默认 10000，超出时回收最久未活跃的），
+# 空闲超过 DSL_SESSION_IDLE 秒（默认 600）的会话由后台线程回收并停止其调度；
+# 会话按用户名分到 DSL_SESSION_STRIPES 个分段（默认 64），各分段单独加锁，不同用户的请求互不阻塞
+userState = SessionManager(
+    maxSessions=int(os.getenv('DSL_MAX_SESSIONS', str(MAX_SESSIONS))),
+    idleTTL=float(os.getenv('DSL_SESSION_IDLE', str(IDLE_TTL))),
+    store=sessionStore,
+    restore=restoreSession,
+    onRemove=releaseSession,
+    sessionLock=inlineLock,
+    stripes=int(os.getenv('DSL_SESSION_STRIPES', '64')),
+)
+userState.start()
+
+
+# WebSocket 对话接口：设置 DSL_WS_PORT 后在该端口启动，一个连接上收发输入和输出
+WS_PORT = os.getenv('DSL_WS_PORT', '')
+webSocketServer = WebSocketServer(userState.touch, submitInput, restartConversation,
+                                  port=int(WS_PORT) if WS_PORT else 0)
+if WS_PORT:
+    webSocketServer.start()
+
+
+def drainSessions():
+    """进程退出前把所有会话写入存储"""
+    count = userState.drain()
+    if count:
+        print(f"[SessionStore] 已保存 {count} 个会话到 {SESSION_DB}")
+
+
+if sessionStore is not None:
+    atexit.register(drainSessions)
+
+
+# 分片模式：由 ShardRouter 启动的工作进程只负责按用户名一致性哈希分到本进程的会话，
+# 路由在增减工作进程时通过以下接口迁移会话，请求须携带启动时分配的令牌
+SHARD_TOKEN = os.getenv('DSL_SHARD_TOKEN', '')
+SHARD_HEADER = 'X-DSL-Shard-Token'
+
+
+def checkShardToken():
+    """校验迁移接口的令牌，未启用分片模式时接口不存在"""
+    if not SHARD_TOKEN:
+        return jsonify({'error': '接口不存在'}), 404
+    if not hmac.compare_digest(request.headers.get(SHARD_HEADER, ''), SHARD_TOKEN):
+        return jsonify({'error': '令牌无效'}), 403
+    return None
+
+
+@app.route('/shard/sessions', methods=['GET'])
+def shardSessions():
+    """
+    本进程拥有的用户名：已注册的用户、内存中的会话和已换出到存储的会话。
+    """
+    denied = checkShardToken()
+    if denied:
+        return denied
+    with userInfoLock:
+        usernames = set(userInfo)
+    usernames.update(username for username, _ in userState.items())
+    if sessionStore is not None:
+        usernames.update(sessionStore.usernames())
+    return jsonify({'usernames': sorted(usernames)}), 200
+
+
+@app.route('/shard/export', methods=['POST'])
+def shardExport():
+    """
+    复制会话：返回用户的注册信息和会话快照，本进程的会话保持不变；
+    迁入新进程成功后路由再调用 /shard/release 删除。
+    """
+    denied = checkShardToken()
+    if denied:
+        return denied
+    sessions = []
+    for username in (request.get_json(silent=True) or {}).get('usernames', []):
+        with userInfoLock:
+            password = userInfo.get(username)
+        snapshot = None
+        with userState.lockFor(username):
+            interpreter = userState.touch(username)  # 已换出的会话先从存储取回
+            if interpreter is not None:
+                with inlineLock(username), interpreter.parked():
+                    snapshot = interpreter.snapshot()
+        sessions.append({'username': username, 'password': password, 'snapshot': snapshot})
+    return jsonify({'sessions': sessions}), 200
+
+
+@app.route('/shard/release', methods=['POST'])
+def shardRelease():
+    """
+    删除已迁到其他进程的用户：注册信息和会话（停止调度并取消超时定时器）。
+    """
+    denied = checkShardToken()
+    if denied:
+        return denied
+    released = 0
+    for username in (request.get_json(silent=True) or {}).get('usernames', []):
+        with userInfoLock:
+            userInfo.pop(username, None)
+        with userState.lockFor(username):
+            if userState.touch(username) is not None:
+                del userState[username]
+        released += 1
+    return jsonify({'released': released}), 200
+
+
+@app.route('/shard/import', methods=['POST'])
+def shardImport():
+    """
+    迁入会话：登记注册信息，由快照重建解释器，停在Listen的对话继续等待剩余时间。
+    """
+    denied = checkShardToken()
+    if denied:
+        return denied
+    imported = 0
+    for item in (request.get_json(silent=True) or {}).get('sessions', []):
+        username = item['username']
+        if item.get('password') is not None:
+            with userInfoLock:
+                userInfo[username] = item['password']
+        if item.get('snapshot') is not None:
+            interpreter = restoreSession(username, item['snapshot'])
+            if interpreter is not None:
+                userState[username] = interpreter
+        imported += 1
+    return jsonify({'imported': imported}), 200
+
+
+# 批量导入用户变量：设置 DSL_VARIABLE_DB 后写入该 SQLite 文件（分片模式下各工作进程应指向同一个文件），
+# 否则只保存在本进程内存中；每次登录时载入该用户的变量。导入接口须携带 DSL_IMPORT_TOKEN 令牌
+VARIABLE_DB = os.getenv('DSL_VARIABLE_DB', '')
+variableStore = VariableStore(VARIABLE_DB or ':memory:')
+IMPORT_TOKEN = os.getenv('DSL_IMPORT_TOKEN', '')
+IMPORT_HEADER = 'X-DSL-Import-Token'
+
+
+@app.route('/variables/import', methods=['POST'])
+def importVariables():
+    """流式导入用户变量，见 importVariableStream"""
+    return respond(importVariableStream(request.headers.get(IMPORT_HEADER, ''), request.args.get('format'),
+                                        request.mimetype, request.args.get('script'), request.stream))
+
+
+def importVariableStream(token, fmt, mimetype, scriptID, stream):
+    """
+    流式导入 (用户名, 变量, 值) 记录：请求体为 CSV（表头 username,variable,value）或 JSONL，
+    格式由查询参数 format 或 Content-Type 决定；变量按查询参数 script（默认 default）所指脚本校验。
+    token 为请求携带的令牌，stream 为请求体的二进制流；Flask 路由与 ASGI 应用共用，返回 (响应内容, 状态码)。
+    """
+    if not IMPORT_TOKEN:
+        return {'error': '接口不存在'}, 404
+    if not hmac.compare_digest(token, IMPORT_TOKEN):
+        return {'error': '令牌无效'}, 403
+    fmt = fmt or formatFor(mimetype)
+    if fmt not in FORMATS:
+        return {'error': '格式无效'}, 400
+    try:
+        scriptHandle = scriptRegistry.getHandle(scriptID or DEFAULT_SCRIPT)
+    except KeyError:
+        return {'error': '脚本不存在'}, 404
+    except LinkError as exc:
+        return {'error': f'脚本无法加载：{exc}'}, 500
+    lines = io.TextIOWrapper(stream, encoding='utf-8', newline='')  # 边读边写，不缓存整个请求体
+    result = importRecords(variableStore, readRecords(lines, fmt), scriptHandle.getTree().getVarName())
+    return result, 400 if 'error' in result else 200
+
+
+# 请求处理：Flask 路由与 ASGI 应用（asgi.py）共用，参数为表单（支持 get 与 in 的映射），返回 (响应内容, 状态码)
+
+
+def registerUser(form):
     """
     用户注册，接收用户名和密码。
     """
-    username = request.form.get('username')
-    password = request.form.get('password')
+    username = form.get('username')
+    password = form.get('password')
 
     if not username or not password:
-        return jsonify({'error': '用户名和密码是必需的'}), 400  # 必填字段检查
+        return {'error': '用户名和密码是必需的'}, 400  # 必填字段检查
 
     with userInfoLock:
         if username in userInfo:
-            return jsonify({'error': '用户名已存在'}), 400  # 用户已存在检查
+            return {'error': '用户名已存在'}, 400  # 用户已存在检查
         userInfo[username] = password  # 存储用户信息
 
-    return jsonify({'message': '注册成功'}), 200
+    return {'message': '注册成功'}, 200
 
-@app.route('/login', methods=['POST'])
-def login():
+
+def loadVariables(username, interpreter):
+    """把批量导入的用户变量写入会话；每次登录（包括沿用内存中或由存储恢复的会话）都载入，以导入的值为准"""
+    for infoName, userInfoValue in variableStore.load(username).items():
+        interpreter.setInfo(infoName, userInfoValue)
+
+
+def loginUser(form):
     """
     用户登录，验证用户名和密码。
     """
-    username = request.form.get('username')
-    password = request.form.get('password')
+    username = form.get('username')
+    password = form.get('password')
 
     if not username or not password:
-        return jsonify({'error': '用户名和密码是必需的'}), 400  # 必填字段检查
+        return {'error': '用户名和密码是必需的'}, 400  # 必填字段检查
 
     with userInfoLock:
         if username not in userInfo:
-            return jsonify({'error': '用户名不存在'}), 404  # 用户不存在检查
+            return {'error': '用户名不存在'}, 404  # 用户不存在检查
         if userInfo[username] != password:
-            return jsonify({'error': '凭证无效'}), 401  # 密码不匹配检查
+            return {'error': '凭证无效'}, 401  # 密码不匹配检查
 
-    interpreter = Interpreter(grmTree.getGrmTree())  # 初始化解释器
-    interpreter.setName(username)  # 设置用户名
+    scriptID = form.get('script') or DEFAULT_SCRIPT  # 按租户、用户或A/B分组选择脚本
+    try:
+        scriptHandle = scriptRegistry.getHandle(scriptID)
+    except KeyError:
+        return {'error': '脚本不存在'}, 404
+    except LinkError as exc:
+        return {'error': f'脚本无法加载：{exc}'}, 500
+    priority = form.get('priority') or DEFAULT_PRIORITY  # 优先级类别：vip、normal、bulk
+    if priority not in PRIORITIES:
+        return {'error': '优先级无效'}, 400
 
-    with userStateLock:
-        userState[username] = interpreter  # 存储用户状态
+    with userState.lockFor(username):  # 只锁定该用户所在的分段
+        existing = userState.reuse(username, scriptHandle)
+        if existing is not None:
+            existing.priority = priority
+            loadVariables(username, existing)  # 会话创建之后导入的变量同样生效
+            return {'message': '登录成功'}, 200  # 重新登录且脚本未变时沿用原会话
 
-    return jsonify({'message': '登录成功'}), 200
+        interpreter = Interpreter(scriptHandle.getTree(), scriptHandle)  # 初始化解释器
+        interpreter.setName(username)  # 设置用户名
+        loadVariables(username, interpreter)
+        interpreter.priority = priority
+        userState[username] = interpreter  # 存储用户状态，替换的旧会话会停止调度
 
-@app.route('/getinfo', methods=['POST'])
-def getInfo():
+    return {'message': '登录成功'}, 200
+
+
+def getUserInfo(form):
     """
     获取用户信息。
     """
-    username = request.form.get('username')
-    with userStateLock:
-        if username not in userState:
-            return jsonify({'error': '用户未登录'}), 403  # 检查用户是否登录
-        interpreter = userState[username]
-        fields = interpreter.getInfo()
-        values = interpreter.getUserData()
+    username = form.get('username')
+    interpreter = userState.touch(username)
+    if interpreter is None:
+        return {'error': '用户未登录'}, 403  # 检查用户是否登录
+    fields = interpreter.getInfo()
+    values = interpreter.getUserData()
     payload = {
         'fields': fields,
         'values': {key: values.get(key) for key in fields}
     }
-    return jsonify(payload), 200
+    return payload, 200
 
-@app.route('/setinfo', methods=['POST'])
-def setInfo():
+
+def setUserInfo(form):
     """
     设置用户信息。
     """
-    username = request.form.get('username')
-    with userStateLock: # 锁定用户状态字典
-        if username not in userState:
-            return jsonify({'error': '用户未登录'}), 403  # 检查用户是否登录
-        interpreter = userState[username]
-        payload = request.form
-        # 更新用户信息
-        for infoName in interpreter.getInfo():
-            if infoName in payload:
-                userInfoValue = payload.get(infoName)
-                interpreter.setInfo(infoName, userInfoValue)  # 设置用户信息
-                print(infoName, userInfoValue)
-    return jsonify({'message': '信息设置成功'}), 200
+    username = form.get('username')
+    interpreter = userState.touch(username)
+    if interpreter is None:
+        return {'error': '用户未登录'}, 403  # 检查用户是否登录
+    payload = form
+    # 更新用户信息：只写本会话的变量槽位，不持有会话表的锁
+    for infoName in interpreter.getInfo():
+        if infoName in payload:
+            interpreter.setInfo(infoName, payload.get(infoName))  # 设置用户信息
+    return {'message': '信息设置成功'}, 200
 
-@app.route('/clearchat', methods=['POST'])
-def clearChat():
+
+def clearConversation(form):
     """
     清除当前对话并启动新线程执行调度。
     """
-    username = request.form.get('username')
+    username = form.get('username')
     print(username)
-    with userStateLock:
-        if username not in userState:
-            return jsonify({'error': '用户未登录'}), 403  # 检查用户是否登录
-        interpreter = userState[username]
+    interpreter = userState.touch(username)
+    if interpreter is None:
+        return {'error': '用户未登录'}, 403  # 检查用户是否登录
 
-    interpreter.startDispatch()
+    scriptID = form.get('script')
+    if scriptID:
+        try:
+            scriptHandle = scriptRegistry.getHandle(scriptID)
+        except KeyError:
+            return {'error': '脚本不存在'}, 404
+        except LinkError as exc:
+            return {'error': f'脚本无法加载：{exc}'}, 500
+        if scriptHandle is not interpreter.source:
+            # 切换脚本：停止旧对话，用新脚本创建解释器并保留用户信息
+            interpreter.requestStop()
+            userData = interpreter.userTable.getTable()
+            priority = interpreter.priority
+            interpreter = Interpreter(scriptHandle.getTree(), scriptHandle)
+            interpreter.priority = priority
+            for infoName, userInfoValue in userData.items():
+                interpreter.setInfo(infoName, userInfoValue)
+            userState[username] = interpreter
 
-    return jsonify({'message': '对话已清除'}), 200
+    if not restartConversation(username, interpreter):
+        return {'error': '系统繁忙，请稍后重试'}, 503
 
+    return {'message': '对话已清除'}, 200
 
-@app.route('/telechat', methods=['POST'])
-def chat():
-    # 尝试同时从 form 和 JSON 取值
-    data = request.get_json(silent=True) or {}
-    username = request.form.get('username') or data.get('username')
-    userInput = request.form.get('message') or data.get('message') or data.get('text')
+
+def receiveInput(form, data):
+    """
+    接收用户输入，同时从表单和JSON取值。
+    带 wait 字段时为同步模式：阻塞到对话执行到下一个 Listen 或 Exit（或等待 wait 秒），返回本次输入产生的全部输出。
+    """
+    result, turn = acceptInput(form, data)
+    if turn is None:
+        return result
+    interpreter, mark, timeout = turn
+    interpreter.resultLog().waitAnswer(mark[1], timeout)
+    return turnReply(interpreter, mark)
+
+
+def acceptInput(form, data):
+    """
+    校验并提交输入，返回 (响应, 同步等待的上下文)。非同步模式或出错时上下文为None；
+    同步模式下响应为None，上下文为 (解释器, 提交前领取的 (序号, 票据), 等待秒数)，由调用方等待票据应答后用 turnReply 生成响应。
+    """
+    username = form.get('username') or data.get('username')
+    userInput = form.get('message') or data.get('message') or data.get('text')
 
     print(f"[DEBUG] 用户输入：{userInput}")
 
     if not username or not userInput:
-        return jsonify({'error': '缺少用户名或输入内容'}), 400
+        return ({'error': '缺少用户名或输入内容'}, 400), None
 
-    with userStateLock:
-        if username not in userState:
-            return jsonify({'error': '用户未登录'}), 403
-        interpreter = userState[username]
+    wait = form.get('wait', data.get('wait'))
+    timeout = None
+    if wait is not None and wait != '':
+        try:
+            timeout = float(wait)
+        except (TypeError, ValueError):
+            timeout = -1.0
+        if not timeout >= 0:  # 负数或NaN
+            return ({'error': '等待时间无效'}, 400), None
+        timeout = min(timeout, SYNC_WAIT_MAX)
 
-    interpreter.setUserInput(userInput)
-    return jsonify({'message': '输入已接收'}), 200
+    interpreter = userState.touch(username)
+    if interpreter is None:
+        return ({'error': '用户未登录'}, 403), None
 
+    mark = interpreter.resultLog().ticket() if timeout is not None else None
+    if not submitInput(username, interpreter, userInput, None if mark is None else mark[1]):
+        if mark is not None:
+            interpreter.resultLog().forget(mark[1])
+        return ({'error': '系统繁忙，请稍后重试'}, 503), None
+    if timeout is None:
+        return ({'message': '输入已接收'}, 200), None
+    if RUNTIME not in FEED_RUNTIMES and not interpreter.isDispatching():
+        timeout = 0.0  # 对话不在运行，没有可等待的一轮
+    return None, (interpreter, mark, timeout)
 
 
-@app.route('/repeatchat', methods=['POST'])
-def repeatChat():
+def turnReply(interpreter, mark):
+    """
+    同步模式的响应：mark 之后的全部输出及其游标，complete 表示本次输入是否在等待时间内执行到下一个 Listen 或 Exit，
+    finished 表示对话是否已结束。返回的输出视为已送达，连同之前未取走的输出一起确认丢弃。
+    """
+    results = interpreter.resultLog()
+    seq, ticket = mark
+    complete = results.answered(ticket)
+    results.forget(ticket)
+    entries = results.after(seq)
+    cursor = entries[-1][0] if entries else seq
+    results.discard(cursor)
+    return {
+        'message': '输入已接收',
+        'messages': [message for _, message in entries],
+        'cursor': results.eventID(cursor),
+        'complete': complete,
+        'finished': interpreter.state.isFinished(),
+    }, 200
+
+
+def takeResult(form):
     """
     获取并返回最新的解释结果。
+    带 after 游标（上一次返回的 cursor，首次为空字符串或0）时，确认并丢弃游标及之前的输出，
+    一次返回其后的全部输出；重复提交同一游标得到相同结果，重发是幂等的。
     """
-    username = request.form.get('username')
-    with userStateLock:
-        if username not in userState:
-            return jsonify({'error': '用户未登录'}), 403  # 检查用户是否登录
-        interpreter = userState[username]
+    username = form.get('username')
+    interpreter = userState.touch(username)
+    if interpreter is None:
+        return {'error': '用户未登录'}, 403  # 检查用户是否登录
+
+    if 'after' in form:
+        results = interpreter.resultLog()
+        entries, cursor, missed = results.acknowledge(results.parseEventID(form['after']))
+        return {
+            'messages': [message for _, message in entries],
+            'cursor': results.eventID(cursor),
+            'missed': missed,  # 游标之后已无法补发的输出条数（日志溢出或被逐条取走）
+            'dropped': results.dropped,  # 该日志因溢出丢弃的累计条数
+        }, 200
 
     result = interpreter.getLatestResult()  # 获取最新的解释结果
     if result:
-        return jsonify({'message': result}), 200
+        return {'message': result}, 200
     else:
-        return jsonify({'message': '没有新消息'}), 200
+        return {'message': '没有新消息'}, 200
+
+
+def collectMetrics():
+    """
+    会话计数：在线、调度中、换出、丢弃、泄漏等；pool 模式下另有运行队列深度和排队时间，
+    启用 WebSocket 时另有连接和消息计数。
+    """
+    payload = {'sessions': userState.metrics()}
+    if RUNTIME == 'pool':
+        payload['scheduler'] = scheduler.metrics()
+    if webSocketServer.thread is not None:
+        payload['websocket'] = webSocketServer.metrics()
+    return payload, 200
+
+
+def respond(result):
+    """把请求处理函数返回的 (响应内容, 状态码) 转为 Flask 响应"""
+    payload, status = result
+    return jsonify(payload), status
+
+
+@app.route('/register', methods=['POST'])
+def register():
+    return respond(registerUser(request.form))
+
+@app.route('/login', methods=['POST'])
+def login():
+    return respond(loginUser(request.form))
+
+@app.route('/getinfo', methods=['POST'])
+def getInfo():
+    return respond(getUserInfo(request.form))
+
+@app.route('/setinfo', methods=['POST'])
+def setInfo():
+    return respond(setUserInfo(request.form))
+
+@app.route('/clearchat', methods=['POST'])
+def clearChat():
+    return respond(clearConversation(request.form))
+
+@app.route('/telechat', methods=['POST'])
+def chat():
+    return respond(receiveInput(request.form, request.get_json(silent=True) or {}))
+
+@app.route('/repeatchat', methods=['POST'])
+def repeatChat():
+    return respond(takeResult(request.form))
+
+def formatEvent(results, seq, message):
+    """一条输出的SSE事件文本，多行输出拆成多个 data 行"""
+    data = ''.join(f'data: {line}\n' for line in str(message).split('\n'))
+    return f'id: {results.eventID(seq)}\n{data}\n'
+
+
+@app.route('/stream', methods=['GET'])
+def stream():
+    """
+    SSE推送：每条输出产生后立即推送，事件ID为“纪元:序号”。
+    断线重连时浏览器自动带上 Last-Event-ID，从其后补发；空闲时定期发送注释行保活。
+    会话被替换（切换脚本、重新登录）时改为推送新会话的输出，会话被删除时结束推送。
+    """
+    username = request.args.get('username')
+    interpreter = userState.touch(username)
+    if interpreter is None:
+        return jsonify({'error': '用户未登录'}), 403
+    lastEventID = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+
+    def events():
+        current = interpreter
+        results = current.resultLog()
+        seq = results.parseEventID(lastEventID)
+        results.discard(seq)  # 客户端已收到的输出不再保留
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        while True:
+            entries = results.wait(seq, STREAM_HEARTBEAT)
+            if not entries:
+                latest = userState.touch(username)  # 推送连接保持期间会话视为活跃
+                if latest is None:
+                    return
+                if latest is not current:
+                    current, results, seq = latest, latest.resultLog(), 0
+                    continue
+                yield ': ping\n\n'
+                continue
+            for seq, message in entries:
+                yield formatEvent(results, seq, message)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(events(), mimetype='text/event-stream', headers=headers)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return respond(collectMetrics())
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)  # 启动Flask应用，调试模式，端口5000
+    # 收到 SIGTERM（例如 ShardCluster 停止工作进程）时正常退出，atexit 中的会话写入同样执行
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # 启动Flask应用，默认调试模式、端口5000；作为分片工作进程时端口由 DSL_PORT 指定，不启用调试重载
+    app.run(debug=not SHARD_TOKEN, port=int(os.getenv('DSL_PORT', '5000')), threaded=True)
@@ -0,0 +1,283 @@
+import asyncio
+import io
+import json
+import os
+from io import BytesIO
+from urllib.parse import parse_qs
+from werkzeug.formparser import FormDataParser
+from werkzeug.http import parse_options_header
+import src.Interpreter.app as backend
+
+MAX_BODY = 1024 * 1024  # 请求体上限（字节）
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]  # 与 Flask 版本的 CORS(app) 一致
+
+# 路径 -> 请求处理函数。处理函数都放到线程中执行：取得会话（userState.touch）时可能要从 SessionStore 恢复
+# 已换出的会话、持有分段锁读写 SQLite，登录、清除对话还可能加载脚本，不能阻塞事件循环上的其他连接
+POST_ROUTES = {
+    '/register': backend.registerUser,
+    '/login': backend.loginUser,
+    '/getinfo': backend.getUserInfo,
+    '/setinfo': backend.setUserInfo,
+    '/clearchat': backend.clearConversation,
+    '/repeatchat': backend.takeResult,
+}
+
+
+class ReceiveStream(io.RawIOBase):
+    """
+    请求体的二进制流：在工作线程中读取时按需从事件循环上的 ASGI receive 取下一块，
+    导入接口边读边写，不缓存整个请求体（不受 MAX_BODY 限制）。
+    """
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.chunk = b''
+        self.done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.chunk and not self.done:
+            message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+            if message['type'] == 'http.disconnect':
+                self.done = True
+                break
+            self.chunk = message.get('body', b'')
+            self.done = not message.get('more_body')
+        size = min(len(buffer), len(self.chunk))
+        buffer[:size] = self.chunk[:size]
+        self.chunk = self.chunk[size:]
+        return size
+
+
+def parseForm(contentType, body):
+    """解析 urlencoded 或 multipart 表单，其他类型返回空表单"""
+    mimetype, options = parse_options_header(contentType)
+    _, form, _ = FormDataParser().parse(BytesIO(body), mimetype, len(body), options)
+    return form
+
+
+async def readBody(receive):
+    """读取完整的请求体，超过上限时返回None"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def sendJSON(send, payload, status):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())] + CORS_HEADERS
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def application(scope, receive, send):
+    """
+    ASGI 应用：与 Flask 版本（app.py）提供相同的接口，共用请求处理函数和会话表，
+    由 Hypercorn 提供 HTTP/1.1 与 HTTP/2，一个进程可同时保持数千个连接。
+    """
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    method = scope['method']
+    path = scope['path']
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    if method == 'OPTIONS':
+        # CORS 预检
+        await send({'type': 'http.response.start', 'status': 204, 'headers': CORS_HEADERS + [
+            (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+            (b'access-control-allow-headers', headers.get('access-control-request-headers', '*').encode('latin-1')),
+        ]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if method == 'GET' and path == '/stream':
+        await stream(scope, receive, send, query, headers)
+        return
+    if method == 'GET' and path == '/metrics':
+        await sendJSON(send, *backend.collectMetrics())
+        return
+    if path not in POST_ROUTES and path not in ('/telechat', '/variables/import'):
+        await sendJSON(send, {'error': '接口不存在'}, 404)
+        return
+    if method != 'POST':
+        await sendJSON(send, {'error': '请求方法不允许'}, 405)
+        return
+    if path == '/variables/import':
+        # 导入在线程中边读请求体边写入存储
+        bodyStream = io.BufferedReader(ReceiveStream(receive, asyncio.get_running_loop()))
+        await sendJSON(send, *await asyncio.to_thread(
+            backend.importVariableStream, headers.get(backend.IMPORT_HEADER.lower(), ''),
+            (query.get('format') or [''])[0], parse_options_header(headers.get('content-type', ''))[0],
+            (query.get('script') or [''])[0], bodyStream))
+        return
+    body = await readBody(receive)
+    if body is None:
+        await sendJSON(send, {'error': '请求体过大'}, 413)
+        return
+    contentType = headers.get('content-type', '')
+    form = parseForm(contentType, body)
+    if path == '/telechat':
+        data = {}
+        if contentType.startswith('application/json'):
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                data = {}
+            data = data if isinstance(data, dict) else {}
+        # 取得会话可能从存储恢复，内联、线程池调度下提交输入还会推进对话（可能调用意图识别）
+        result, turn = await asyncio.to_thread(backend.acceptInput, form, data)
+        if turn is not None:
+            # 同步模式：在事件循环中等待本次输入的票据被应答，不占用线程
+            await waitAnswer(*turn)
+            result = backend.turnReply(turn[0], turn[1])
+    else:
+        result = await asyncio.to_thread(POST_ROUTES[path], form)
+    await sendJSON(send, *result)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def wakeListener(wake):
+    """输出日志的回调：在解释器所在线程中调用，转到事件循环里触发 wake"""
+    loop = asyncio.get_running_loop()
+
+    def listener():
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:  # 事件循环已关闭
+            pass
+    return listener
+
+
+async def waitAnswer(interpreter, mark, timeout):
+    """等待同步模式的 /telechat 提交的输入执行到下一个 Listen 或 Exit（票据被应答），最长 timeout 秒"""
+    results = interpreter.resultLog()
+    wake = asyncio.Event()
+    listener = wakeListener(wake)
+    results.addListener(listener)
+    try:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            wake.clear()
+            remaining = deadline - asyncio.get_running_loop().time()
+            if results.answered(mark[1]) or remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(wake.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+    finally:
+        results.removeListener(listener)
+
+
+async def stream(scope, receive, send, query, headers):
+    """
+    SSE推送，与 Flask 版本的 /stream 相同；等待新输出时不占用线程，由输出日志的回调唤醒。
+    """
+    username = (query.get('username') or [''])[0]
+    interpreter = await asyncio.to_thread(backend.userState.touch, username) if username else None
+    if interpreter is None:
+        await sendJSON(send, {'error': '用户未登录'}, 403)
+        return
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream; charset=utf-8'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ] + CORS_HEADERS})
+
+    wake = asyncio.Event()
+    listener = wakeListener(wake)
+
+    async def push():
+        current = interpreter
+        results = current.resultLog()
+        results.addListener(listener)
+        try:
+            lastEventID = headers.get('last-event-id') or (query.get('lastEventId') or [''])[0]
+            seq = results.parseEventID(lastEventID)
+            results.discard(seq)  # 客户端已收到的输出不再保留
+            await sendText(f'retry: {backend.STREAM_RETRY_MS}\n\n')
+            while True:
+                wake.clear()
+                entries = results.after(seq)
+                if entries:
+                    for seq, message in entries:
+                        await sendText(backend.formatEvent(results, seq, message))
+                    continue
+                try:
+                    await asyncio.wait_for(wake.wait(), backend.STREAM_HEARTBEAT)
+                    if results.after(seq):
+                        continue
+                    timedOut = False
+                except asyncio.TimeoutError:
+                    timedOut = True
+                # 被唤醒但没有新输出（会话被替换或移出），或空闲超时：重新取得会话
+                latest = await asyncio.to_thread(backend.userState.touch, username)
+                if latest is None:
+                    return
+                if latest is not current:
+                    results.removeListener(listener)
+                    current, results, seq = latest, latest.resultLog(), 0
+                    results.addListener(listener)
+                elif timedOut:
+                    await sendText(': ping\n\n')
+        finally:
+            results.removeListener(listener)
+
+    async def sendText(text):
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = [asyncio.ensure_future(push()), asyncio.ensure_future(disconnected())]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    for task in done:
+        task.result()  # 推送出错时抛出
+    if tasks[0] in done:
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+
+def main():
+    """
+    用 Hypercorn 启动 ASGI 应用。明文连接支持 HTTP/1.1 与 HTTP/2（h2c）；设置 DSL_TLS_CERT、DSL_TLS_KEY 后
+    启用 TLS，通过 ALPN 协商 HTTP/2。也可直接运行 hypercorn src.Interpreter.asgi:application。
+    """
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    config = Config()
+    config.bind = [f"{os.getenv('DSL_HOST', '127.0.0.1')}:{os.getenv('DSL_PORT', '5000')}"]
+    config.certfile = os.getenv('DSL_TLS_CERT') or None
+    config.keyfile = os.getenv('DSL_TLS_KEY') or None
+    config.alpn_protocols = ['h2', 'http/1.1']
+    config.accesslog = None
+    asyncio.run(serve(application, config))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 from typing import Dict, List
 
 import requests
@@ -178,3 +179,20 @@ class IntentService:
         except ValueError:
             return 8.0
 
+
+_shared_service = None
+_shared_lock = threading.Lock()
+
+
+def shared_intent_service() -> IntentService:
+    """
+    返回进程内共享的 IntentService，环境变量只在首次调用时读取。
+    IntentService 创建后不再修改，可被所有会话同时使用。
+    """
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                _shared_service = IntentService()
+    return _shared_service
+
@@ -1,4 +1,10 @@
+import os
+import shutil
+import tempfile
+import time
 import unittest
+import src.Interpreter.app as appModule
+from src.Interpreter.SessionStore import SessionStore
 from src.Interpreter.app import app, userInfo, userState
 
 class TestApp(unittest.TestCase):
@@ -80,6 +86,21 @@ class TestApp(unittest.TestCase):
         self.assertEqual(values.get('name'), 'Alice')
         self.assertEqual(values.get('amount'), '100')
 
+    def testLoginWithScript(self):
+        """
+        测试登录时选择脚本，以及选择不存在的脚本。
+        """
+        self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+        response = self.client.post('/login', data={'username': 'testuser', 'password': 'password', 'script': 'test1'})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post('/getinfo', data={'username': 'testuser'})
+        self.assertEqual(response.get_json().get('fields'), ['name', 'amount'])
+
+        response = self.client.post('/login', data={'username': 'testuser', 'password': 'password', 'script': 'missing'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json().get('error'), '脚本不存在')
+
     def testChatFlow(self):
         """
         测试完整的聊天流程。
@@ -104,6 +125,324 @@ class TestApp(unittest.TestCase):
         response = self.client.post('/repeatchat', data={'username': 'testuser'})
         self.assertEqual(response.status_code, 200)
 
+    def testInlineChatFlow(self):
+        """
+        测试内联模式：请求处理函数直接推进对话，不创建调度线程。
+        """
+        appModule.RUNTIME = 'inline'
+        try:
+            self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+            response = self.client.post('/clearchat', data={'username': 'testuser'})
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(userState['testuser'].isDispatching())
+
+            # 开场白在 /clearchat 返回前已生成
+            response = self.client.post('/repeatchat', data={'username': 'testuser'})
+            self.assertNotEqual(response.get_json()['message'], '没有新消息')
+            while userState['testuser'].getLatestResult() is not None:
+                pass
+
+            response = self.client.post('/telechat', data={'username': 'testuser', 'message': '账单'})
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post('/repeatchat', data={'username': 'testuser'})
+            self.assertNotEqual(response.get_json()['message'], '没有新消息')
+
+            # Listen 的超时登记在时间轮中，到期后由时间轮成批推进
+            self.assertIn('testuser', appModule.timerWheel.timers)
+            while userState['testuser'].getLatestResult() is not None:
+                pass
+            userState['testuser'].state.deadline = 0.0
+            appModule.scheduler.start()  # 到期的超时交给工作线程执行
+            appModule.expireSessions(['testuser'])
+            self.assertTrue(appModule.scheduler.join(5))
+            self.assertIsNotNone(userState['testuser'].getLatestResult())
+        finally:
+            appModule.scheduler.stop()
+            appModule.RUNTIME = 'thread'
+
+    def testIntentMatchedOutsideLock(self):
+        """
+        测试内联模式下意图识别（可能是耗时的LLM请求）在会话锁外进行，识别结果仍用于分支匹配。
+        """
+        appModule.RUNTIME = 'inline'
+        try:
+            self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/clearchat', data={'username': 'testuser'})
+            interpreter = userState['testuser']
+            held = []
+
+            class SlowIntent:
+                def match_intent(self, text):
+                    held.append(appModule.inlineLock('testuser').locked())
+                    return {'intent': '账单', 'normalized_text': text, 'confidence': 1.0}
+
+            interpreter.intentService = SlowIntent()
+            self.client.post('/telechat', data={'username': 'testuser', 'message': '我想问问'})
+            self.assertEqual(held, [False])
+            self.assertEqual(interpreter.intentMeta['intent'], '账单')
+        finally:
+            appModule.RUNTIME = 'thread'
+
+    def testRepeatChatCursor(self):
+        """
+        测试 /repeatchat 的游标模式：一次返回全部未确认输出，按游标确认，重复请求结果相同。
+        """
+        appModule.RUNTIME = 'inline'
+        try:
+            self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/clearchat', data={'username': 'testuser'})
+            first = self.client.post('/repeatchat', data={'username': 'testuser', 'after': ''}).get_json()
+            self.assertTrue(first['messages'])
+            self.assertEqual(first['missed'], 0)
+            again = self.client.post('/repeatchat', data={'username': 'testuser', 'after': ''}).get_json()
+            self.assertEqual(again, first)
+
+            self.client.post('/telechat', data={'username': 'testuser', 'message': '账单'})
+            second = self.client.post('/repeatchat', data={'username': 'testuser', 'after': first['cursor']}).get_json()
+            self.assertTrue(second['messages'])
+            self.assertNotEqual(second['cursor'], first['cursor'])
+            # 确认后之前的输出不再返回
+            empty = self.client.post('/repeatchat', data={'username': 'testuser', 'after': second['cursor']}).get_json()
+            self.assertEqual(empty['messages'], [])
+            self.assertEqual(empty['cursor'], second['cursor'])
+            self.assertEqual(len(userState['testuser'].resultLog()), 0)
+        finally:
+            appModule.RUNTIME = 'thread'
+
+    def testSyncChat(self):
+        """
+        测试同步模式的 /telechat：等到对话执行到下一个 Listen 后在同一响应中返回本次输入的全部输出。
+        """
+        self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+        self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+        self.client.post('/clearchat', data={'username': 'testuser'})
+        interpreter = userState['testuser']
+        deadline = time.monotonic() + 5
+        while interpreter.state.deadline is None and time.monotonic() < deadline:
+            time.sleep(0.01)  # 等调度线程停在第一个 Listen
+        time.sleep(0.05)
+        response = self.client.post('/telechat', data={'username': 'testuser', 'message': '账单', 'wait': '5'})
+        self.assertEqual(response.status_code, 200)
+        payload = response.get_json()
+        self.assertTrue(payload['complete'])
+        self.assertTrue(payload['messages'])
+        self.assertFalse(payload['finished'])
+        # 返回的输出已确认，不会再由 /repeatchat 取到
+        self.assertEqual(self.client.post('/repeatchat', data={'username': 'testuser', 'after': payload['cursor']})
+                         .get_json()['messages'], [])
+
+        response = self.client.post('/telechat', data={'username': 'testuser', 'message': '账单', 'wait': '-1'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/telechat', data={'username': 'testuser', 'message': '账单', 'wait': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def testImportVariables(self):
+        """
+        测试批量导入用户变量：须携带令牌，按脚本变量校验，每次登录时载入（包括沿用的已有会话）。
+        """
+        body = 'username,variable,value\ntestuser,amount,321\ntestuser,nothing,1\n'.encode('utf-8')
+        response = self.client.post('/variables/import', data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, 404)  # 未配置令牌时接口不存在
+        appModule.IMPORT_TOKEN = 'secret'
+        try:
+            response = self.client.post('/variables/import', data=body, content_type='text/csv',
+                                        headers={'X-DSL-Import-Token': 'wrong'})
+            self.assertEqual(response.status_code, 403)
+            response = self.client.post('/variables/import', data=body, content_type='text/csv',
+                                        headers={'X-DSL-Import-Token': 'secret'})
+            self.assertEqual(response.status_code, 200)
+            payload = response.get_json()
+            self.assertEqual((payload['imported'], payload['rejected']), (1, 1))
+
+            self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+            values = self.client.post('/getinfo', data={'username': 'testuser'}).get_json()['values']
+            self.assertEqual(values['amount'], '321')
+
+            # 会话已存在时再次导入，重新登录后沿用的会话同样载入新值
+            body = 'username,variable,value\ntestuser,amount,654\n'.encode('utf-8')
+            response = self.client.post('/variables/import', data=body, content_type='text/csv',
+                                        headers={'X-DSL-Import-Token': 'secret'})
+            self.assertEqual(response.get_json()['imported'], 1)
+            interpreter = userState['testuser']
+            self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+            self.assertIs(userState['testuser'], interpreter)
+            values = self.client.post('/getinfo', data={'username': 'testuser'}).get_json()['values']
+            self.assertEqual(values['amount'], '654')
+        finally:
+            appModule.IMPORT_TOKEN = ''
+            appModule.variableStore.clear()
+
+    def testStream(self):
+        """
+        测试SSE推送：输出产生后立即推送，重连时带上 Last-Event-ID 只补发之后的输出。
+        """
+        appModule.RUNTIME = 'inline'
+        heartbeat = appModule.STREAM_HEARTBEAT
+        appModule.STREAM_HEARTBEAT = 0.05
+        try:
+            self.assertEqual(self.client.get('/stream?username=testuser').status_code, 403)
+            self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/clearchat', data={'username': 'testuser'})
+
+            def readEvents(response):
+                """读取推送的事件直到保活注释，返回 [(事件ID, 内容)]"""
+                events = []
+                for chunk in response.response:
+                    chunk = chunk.decode('utf-8')
+                    if chunk == ': ping\n\n':
+                        return events
+                    if chunk.startswith('id: '):
+                        lines = chunk.strip('\n').split('\n')
+                        events.append((lines[0][len('id: '):], '\n'.join(line[len('data: '):] for line in lines[1:])))
+                return events
+
+            response = self.client.get('/stream?username=testuser', buffered=False)
+            self.assertEqual(response.mimetype, 'text/event-stream')
+            greeting = readEvents(response)
+            self.assertTrue(greeting)
+            self.assertIn('testuser', greeting[0][1])
+
+            self.client.post('/telechat', data={'username': 'testuser', 'message': '账单'})
+            replies = readEvents(response)
+            self.assertTrue(replies)
+            lastEventID = replies[-1][0]
+            response.close()
+
+            # 重连：已确认收到的输出不再推送，之后的输出照常推送
+            self.client.post('/telechat', data={'username': 'testuser', 'message': '账单'})
+            response = self.client.get('/stream?username=testuser', headers={'Last-Event-ID': lastEventID},
+                                       buffered=False)
+            resumed = readEvents(response)
+            self.assertTrue(resumed)
+            self.assertEqual(int(resumed[0][0].split(':')[1]), int(lastEventID.split(':')[1]) + 1)
+            response.close()
+        finally:
+            appModule.STREAM_HEARTBEAT = heartbeat
+            appModule.RUNTIME = 'thread'
+
+    def testPoolChatFlow(self):
+        """
+        测试线程池模式：推进对话的任务交给工作线程执行，非法优先级被拒绝。
+        """
+        response = self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+        response = self.client.post('/login', data={'username': 'testuser', 'password': 'password',
+                                                    'priority': 'urgent'})
+        self.assertEqual(response.status_code, 400)
+
+        appModule.RUNTIME = 'pool'
+        appModule.scheduler.start()
+        completed = appModule.scheduler.completedCount  # 其他测试中执行过的超时任务
+        try:
+            self.client.post('/login', data={'username': 'testuser', 'password': 'password', 'priority': 'vip'})
+            self.assertEqual(userState['testuser'].priority, 'vip')
+            response = self.client.post('/clearchat', data={'username': 'testuser'})
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post('/telechat', data={'username': 'testuser', 'message': '账单'})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(appModule.scheduler.join(5))
+            self.assertFalse(userState['testuser'].isDispatching())
+            self.assertIsNotNone(userState['testuser'].getLatestResult())
+
+            metrics = self.client.get('/metrics').get_json()['scheduler']
+            self.assertEqual(metrics['completed'] - completed, 2)
+            self.assertEqual(metrics['depth'], 0)
+        finally:
+            appModule.scheduler.stop()
+            appModule.RUNTIME = 'thread'
+
+    def testPoolTimeoutRetriedWhenQueueFull(self):
+        """
+        测试线程池排队已满时，到期的Listen超时改为下一个刻度重试，而不是丢失。
+        """
+        self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+        self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+        appModule.RUNTIME = 'pool'
+        appModule.scheduler.maxPending = 0
+        try:
+            interpreter = userState['testuser']
+            interpreter.feed(appModule.START)
+            while interpreter.getLatestResult() is not None:
+                pass
+            interpreter.state.deadline = time.time() - 1  # Listen 已超时
+            appModule.timerWheel.cancel('testuser')  # 时间轮推进时已删除该定时器
+            appModule.expireSessions(['testuser'])
+            self.assertIn('testuser', appModule.timerWheel.timers)
+
+            appModule.scheduler.maxPending = None
+            appModule.scheduler.start()
+            self.assertEqual(appModule.timerService.pollOnce(time.time() + 1), 1)
+            self.assertTrue(appModule.scheduler.join(5))
+            self.assertIsNotNone(interpreter.getLatestResult())  # 按超时进入了 silenceProc
+        finally:
+            appModule.scheduler.stop()
+            appModule.scheduler.maxPending = None
+            appModule.timerWheel.cancel('testuser')
+            appModule.RUNTIME = 'thread'
+
+    def testEvictAndRestore(self):
+        """
+        测试会话换出到磁盘后，下一次请求时透明恢复，未取走的回复仍在。
+        """
+        tmpDir = tempfile.mkdtemp()
+        appModule.RUNTIME = 'inline'
+        userState.store = SessionStore(os.path.join(tmpDir, 'sessions.db'))
+        try:
+            self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+            self.client.post('/setinfo', data={'username': 'testuser', 'amount': '100'})
+            self.client.post('/clearchat', data={'username': 'testuser'})
+            self.assertIn('testuser', appModule.timerWheel.timers)
+
+            self.assertEqual(userState.reap(0), 1)
+            self.assertNotIn('testuser', userState)
+            self.assertNotIn('testuser', appModule.timerWheel.timers)
+
+            response = self.client.post('/repeatchat', data={'username': 'testuser'})
+            self.assertIn('testuser', response.get_json()['message'])
+            self.assertIn('testuser', userState)
+            self.assertIn('testuser', appModule.timerWheel.timers)  # 停在Listen的会话重新登记超时
+            response = self.client.post('/getinfo', data={'username': 'testuser'})
+            self.assertEqual(response.get_json()['values']['amount'], '100')
+
+            # 未空闲足够久的会话不换出
+            self.assertEqual(userState.reap(3600), 0)
+        finally:
+            userState.store.close()
+            userState.store = None
+            appModule.RUNTIME = 'thread'
+            appModule.timerWheel.cancel('testuser')
+            shutil.rmtree(tmpDir)
+
+    def testReloginReusesSession(self):
+        """
+        测试重新登录时沿用原会话，并停止被替换会话的调度。
+        """
+        self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+        self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+        first = userState['testuser']
+        self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+        self.assertIs(userState['testuser'], first)
+
+        self.client.post('/clearchat', data={'username': 'testuser'})
+        self.assertTrue(first.isDispatching())
+        self.client.post('/login', data={'username': 'testuser', 'password': 'password', 'script': 'test1'})
+        self.assertIsNot(userState['testuser'], first)
+        thread = first.dispatchThread
+        if thread is not None:
+            thread.join(timeout=1)
+        self.assertFalse(first.isDispatching())
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        sessions = response.get_json()['sessions']
+        self.assertEqual(sessions['live'], 1)
+        self.assertEqual(sessions['leaked'], 0)
+
 
 if __name__ == '__main__':
     unittest.main()  # 执行测试
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import time
+import unittest
+from urllib.parse import urlencode
+import src.Interpreter.app as appModule
+from src.Interpreter.app import userInfo, userState
+from src.Interpreter.asgi import application
+
+
+async def request(method, path, form=None, body=None, headers=(), query=''):
+    """以ASGI方式调用应用，返回 (状态码, 响应首部, 响应体)"""
+    if form is not None:
+        body = urlencode(form).encode('utf-8')
+        headers = list(headers) + [(b'content-type', b'application/x-www-form-urlencoded')]
+    messages = [{'type': 'http.request', 'body': body or b'', 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()  # 模拟保持连接
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': list(headers),
+             'query_string': query.encode('latin-1')}
+    await application(scope, receive, send)
+    start = sent[0]
+    return start['status'], dict(start['headers']), b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def call(method, path, **kwargs):
+    return asyncio.run(request(method, path, **kwargs))
+
+
+def post(path, form):
+    status, _, body = call('POST', path, form=form)
+    return status, json.loads(body)
+
+
+class TestAsgi(unittest.TestCase):
+    """
+    测试 ASGI 版本的接口与 Flask 版本行为一致。
+    """
+    def setUp(self):
+        userInfo.clear()
+        userState.clear()
+
+    def testChatFlow(self):
+        self.assertEqual(post('/register', {'username': 'testuser', 'password': 'password'}),
+                         (200, {'message': '注册成功'}))
+        self.assertEqual(post('/register', {'username': 'testuser', 'password': 'password'})[0], 400)
+        self.assertEqual(post('/login', {'username': 'testuser', 'password': 'wrong'})[0], 401)
+        self.assertEqual(post('/login', {'username': 'testuser', 'password': 'password'}),
+                         (200, {'message': '登录成功'}))
+
+        self.assertEqual(post('/setinfo', {'username': 'testuser', 'amount': '100'})[0], 200)
+        status, payload = post('/getinfo', {'username': 'testuser'})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['values']['amount'], '100')
+
+        appModule.RUNTIME = 'inline'
+        try:
+            self.assertEqual(post('/clearchat', {'username': 'testuser'})[0], 200)
+            status, payload = post('/repeatchat', {'username': 'testuser'})
+            self.assertIn('testuser', payload['message'])
+            while post('/repeatchat', {'username': 'testuser'})[1]['message'] != '没有新消息':
+                pass
+            # /telechat 同样接受 JSON
+            body = json.dumps({'username': 'testuser', 'message': '账单'}).encode('utf-8')
+            status, _, _ = call('POST', '/telechat', body=body, headers=[(b'content-type', b'application/json')])
+            self.assertEqual(status, 200)
+            self.assertNotEqual(post('/repeatchat', {'username': 'testuser'})[1]['message'], '没有新消息')
+        finally:
+            appModule.RUNTIME = 'thread'
+
+    def testSlowRestoreDoesNotBlockLoop(self):
+        """从存储恢复会话较慢时，其他连接的请求不受影响"""
+        post('/register', {'username': 'testuser', 'password': 'password'})
+        post('/login', {'username': 'testuser', 'password': 'password'})
+        touch = userState.touch
+
+        def slowTouch(username):
+            if username == 'slowuser':
+                time.sleep(0.5)  # 模拟读取 SQLite、恢复解释器
+            return touch(username)
+
+        async def scenario():
+            begin = time.perf_counter()
+
+            async def timed(username):
+                await request('POST', '/getinfo', form={'username': username})
+                return time.perf_counter() - begin
+            return await asyncio.gather(timed('slowuser'), timed('testuser'))
+
+        userState.touch = slowTouch
+        try:
+            slow, fast = asyncio.run(scenario())
+        finally:
+            del userState.touch
+        self.assertGreaterEqual(slow, 0.5)
+        self.assertLess(fast, 0.4)
+
+    def testSyncChat(self):
+        post('/register', {'username': 'testuser', 'password': 'password'})
+        post('/login', {'username': 'testuser', 'password': 'password'})
+        appModule.RUNTIME = 'inline'
+        try:
+            post('/clearchat', {'username': 'testuser'})
+            status, payload = post('/telechat', {'username': 'testuser', 'message': '账单', 'wait': '5'})
+            self.assertEqual(status, 200)
+            self.assertTrue(payload['complete'])
+            self.assertTrue(payload['messages'])
+        finally:
+            appModule.RUNTIME = 'thread'
+
+    def testImportVariables(self):
+        """批量导入用户变量：与 Flask 版本相同须携带令牌，请求体按块读取"""
+        body = 'username,variable,value\ntestuser,amount,321\ntestuser,nothing,1\n'.encode('utf-8')
+        csv = [(b'content-type', b'text/csv')]
+        self.assertEqual(call('POST', '/variables/import', body=body, headers=csv)[0], 404)
+        appModule.IMPORT_TOKEN = 'secret'
+        try:
+            status, _, _ = call('POST', '/variables/import', body=body, headers=csv + [(b'x-dsl-import-token', b'wrong')])
+            self.assertEqual(status, 403)
+            status, _, payload = call('POST', '/variables/import', body=body,
+                                      headers=csv + [(b'x-dsl-import-token', b'secret')])
+            self.assertEqual(status, 200)
+            payload = json.loads(payload)
+            self.assertEqual((payload['imported'], payload['rejected']), (1, 1))
+            status, _, _ = call('POST', '/variables/import', body=body, query='script=missing',
+                                headers=csv + [(b'x-dsl-import-token', b'secret')])
+            self.assertEqual(status, 404)
+
+            post('/register', {'username': 'testuser', 'password': 'password'})
+            post('/login', {'username': 'testuser', 'password': 'password'})
+            self.assertEqual(post('/getinfo', {'username': 'testuser'})[1]['values']['amount'], '321')
+        finally:
+            appModule.IMPORT_TOKEN = ''
+            appModule.variableStore.clear()
+
+    def testErrors(self):
+        self.assertEqual(post('/getinfo', {'username': 'nobody'})[0], 403)
+        self.assertEqual(post('/telechat', {'username': 'nobody'})[0], 400)
+        self.assertEqual(call('GET', '/nothing')[0], 404)
+        self.assertEqual(call('GET', '/login')[0], 405)
+        status, headers, _ = call('OPTIONS', '/login')
+        self.assertEqual(status, 204)
+        self.assertEqual(headers[b'access-control-allow-origin'], b'*')
+        status, _, body = call('GET', '/metrics')
+        self.assertEqual(status, 200)
+        self.assertIn('sessions', json.loads(body))
+
+    def testStream(self):
+        post('/register', {'username': 'testuser', 'password': 'password'})
+        post('/login', {'username': 'testuser', 'password': 'password'})
+        appModule.RUNTIME = 'inline'
+        try:
+            post('/clearchat', {'username': 'testuser'})
+
+            async def scenario():
+                chunks = []
+                disconnect = asyncio.Event()
+
+                async def receive():
+                    await disconnect.wait()
+                    return {'type': 'http.disconnect'}
+
+                async def send(message):
+                    chunks.append(message)
+                    if b'data: ' in message.get('body', b''):
+                        disconnect.set()  # 收到第一条输出后断开
+
+                scope = {'type': 'http', 'method': 'GET', 'path': '/stream', 'headers': [],
+                         'query_string': b'username=testuser'}
+                await asyncio.wait_for(application(scope, receive, send), 5)
+                return chunks
+
+            chunks = asyncio.run(scenario())
+            self.assertEqual(chunks[0]['status'], 200)
+            text = b''.join(chunk.get('body', b'') for chunk in chunks[1:]).decode('utf-8')
+            self.assertTrue(text.startswith('retry:'))
+            self.assertIn('testuser', text)
+        finally:
+            appModule.RUNTIME = 'thread'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import threading
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from src.Interpreter.AsyncRuntime import AsyncRuntime
+from src.Interpreter.Interpreter import Interpreter
+from src.Interpreter.Grammar import Grammar
+
+
+def waitResult(interpreter, timeout=2.0):
+    """轮询直到取到一条结果或超时"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = interpreter.getLatestResult()
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    return None
+
+
+class TestAsyncRuntime(unittest.TestCase):
+    """
+    测试协程调度：对话逻辑与线程调度一致，且不为每个会话创建线程。
+    """
+    def setUp(self):
+        tokens = [
+            ['Step', 'main'],
+            ['Speak', '"Hello World"'],
+            ['Listen', '1'],
+            ['Branch', '"yes"', 'yes_step'],
+            ['Silence', 'no_response'],
+            ['Step', 'yes_step'],
+            ['Speak', '"You said yes"'],
+            ['Exit'],
+            ['Step', 'no_response'],
+            ['Speak', '"No response received"'],
+            ['Exit']
+        ]
+        self.tree = Grammar(tokens).getGrmTree()
+        self.runtime = AsyncRuntime(loopCount=2)
+        self.output = redirect_stdout(StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+        self.runtime.stop()
+
+    def testBranch(self):
+        """收到输入后按分支跳转"""
+        interpreter = Interpreter(self.tree)
+        interpreter.startDispatch(self.runtime)
+        self.assertEqual(waitResult(interpreter), "Hello World")
+        interpreter.setUserInput("yes")
+        self.assertEqual(waitResult(interpreter), "You said yes")
+        interpreter.dispatchThread.result(timeout=1)
+        self.assertFalse(interpreter.isDispatching())
+
+    def testSilence(self):
+        """超时后执行Silence"""
+        interpreter = Interpreter(self.tree)
+        interpreter.startDispatch(self.runtime)
+        self.assertEqual(waitResult(interpreter), "Hello World")
+        self.assertEqual(waitResult(interpreter, 2.5), "No response received")
+
+    def testTimeoutFallbackMessage(self):
+        """没有Silence时提示超时信息"""
+        tokens = [
+            ['Step', 'main'],
+            ['Speak', '"Welcome"'],
+            ['Listen', '1'],
+            ['Default', 'end'],
+            ['Step', 'end'],
+            ['Speak', '"Goodbye"'],
+            ['Exit']
+        ]
+        interpreter = Interpreter(Grammar(tokens).getGrmTree())
+        interpreter.startDispatch(self.runtime)
+        self.assertEqual(waitResult(interpreter), "Welcome")
+        self.assertIn("长时间未输入", waitResult(interpreter, 2.5))
+        self.assertEqual(waitResult(interpreter), "Goodbye")
+
+    def testRestart(self):
+        """重新开始对话时旧协程退出，不会与新协程同时消费输入"""
+        interpreter = Interpreter(self.tree)
+        oldFuture = interpreter.startDispatch(self.runtime)
+        self.assertEqual(waitResult(interpreter), "Hello World")
+        interpreter.startDispatch(self.runtime)
+        self.assertEqual(waitResult(interpreter), "Hello World")
+        oldFuture.result(timeout=1)
+        interpreter.setUserInput("yes")
+        self.assertEqual(waitResult(interpreter), "You said yes")
+        self.assertIsNone(waitResult(interpreter, 0.2))
+
+    def testQueuedInputs(self):
+        """连续提交的输入按顺序各执行一轮，每个票据由自己的输入应答"""
+        tokens = [['Step', 'main'], ['Speak', '"Ask"'], ['Listen', '5'], ['Branch', '"yes"', 'yes_step'],
+                  ['Default', 'main'], ['Step', 'yes_step'], ['Speak', '"You said yes"'], ['Exit']]
+        interpreter = Interpreter(Grammar(tokens).getGrmTree())
+        interpreter.startDispatch(self.runtime)
+        self.assertEqual(waitResult(interpreter), "Ask")
+        results = interpreter.resultLog()
+        with interpreter.parked():
+            _, first = results.ticket()
+            interpreter.setUserInput("no", first)
+            _, second = results.ticket()
+            interpreter.setUserInput("yes", second)
+        self.assertTrue(results.waitAnswer(first, 5))
+        self.assertTrue(results.waitAnswer(second, 5))
+        self.assertEqual(waitResult(interpreter), "Ask")
+        self.assertEqual(waitResult(interpreter), "You said yes")
+        self.assertIsNone(waitResult(interpreter, 0.2))
+
+    def testManySessionsShareLoops(self):
+        """大量会话只使用事件循环线程"""
+        before = threading.active_count()
+        interpreters = [Interpreter(self.tree) for _ in range(200)]
+        for interpreter in interpreters:
+            interpreter.startDispatch(self.runtime)
+        for interpreter in interpreters:
+            self.assertEqual(waitResult(interpreter), "Hello World")
+        self.assertLessEqual(threading.active_count(), before + self.runtime.loopCount)
+        for interpreter in interpreters:
+            interpreter.setUserInput("yes")
+        for interpreter in interpreters:
+            self.assertEqual(waitResult(interpreter, 10), "You said yes")
+
+
+if __name__ == '__main__':
+    unittest.main()
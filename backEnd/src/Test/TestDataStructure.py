@@ -1,5 +1,6 @@
+import threading
 import unittest
-from src.Interpreter.DataStructure import Root, Step, Expression, UserTable
+from src.Interpreter.DataStructure import Root, Step, Expression, UserTable, Diagnostic, UNSET
 
 class TestRoot(unittest.TestCase):
     """
@@ -87,6 +88,15 @@ class TestExpression(unittest.TestCase):
         self.expr.addExpr('expr1')  # 添加表达式
         self.assertIn('expr1', self.expr.getExpr())  # expr1 应在 expr 列表中
 
+class TestDiagnostic(unittest.TestCase):
+    """
+    测试Diagnostic类的功能
+    """
+    def testFormat(self):
+        """测试诊断信息的文本格式"""
+        self.assertEqual(str(Diagnostic('error', 'Invalid token', 3, 5)), 'Error: Invalid token (第3行第5列)')
+        self.assertEqual(str(Diagnostic('warning', 'Unused step')), 'Warning: Unused step')
+
 class TestUserTable(unittest.TestCase):
     """
     测试UserTable类的功能
@@ -110,11 +120,48 @@ class TestUserTable(unittest.TestCase):
         self.userTable.setUser('age', 30)  # 设置用户年龄
         self.assertEqual(self.userTable.getTable()['age'], 30)  # 获取用户表中的 age 应为 30
     
+    def testSlotValues(self):
+        """测试脚本变量按符号表下标存放，其他信息单独保存"""
+        self.userTable.setUser('var2', 'b')
+        self.userTable.setUser('other', 'c')
+        self.assertEqual(self.userTable.getValues(), [UNSET, 'b'])
+        self.assertEqual(self.userTable.getTable(), {'var2': 'b', 'other': 'c'})
+        self.userTable.rebind(['var2', 'other'], {'var2': 0, 'other': 1})
+        self.assertEqual(self.userTable.getValues(), ['b', 'c'])
+
+    def testConcurrentSetUser(self):
+        """多个线程同时设置不同变量时不会互相覆盖"""
+        names = [f'v{index}' for index in range(64)]
+        table = UserTable(names)
+
+        def setMany(offset):
+            for name in names[offset::4]:
+                table.setUser(name, name.upper())
+                table.setUser('extra' + name, name)
+
+        threads = [threading.Thread(target=setMany, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(table.getTable()), 128)
+        self.assertEqual(table.getTable()['v63'], 'V63')
+
     def testGetTable(self):
         """测试getTable方法"""
         self.userTable.setUser('key', 'value')  # 添加一个键值对
         table = self.userTable.getTable()  # 获取整个表
         self.assertEqual(table['key'], 'value')  # 表中的 key 应对应 value
 
+    def testTableIsReadOnly(self):
+        """测试用户表为只读快照，设置为None的变量仍在表中"""
+        self.userTable.setUser('var1', None)
+        table = self.userTable.getTable()
+        self.assertEqual(table, {'var1': None})  # 未设置的 var2 不在表中
+        with self.assertRaises(TypeError):
+            table['var2'] = 'x'  # 修改须通过 setUser
+        self.userTable.rebind(['var2', 'var1'], {'var2': 0, 'var1': 1})
+        self.assertEqual(self.userTable.getTable(), {'var1': None})
+
 if __name__ == '__main__':
     unittest.main()  # 运行测试
@@ -1,5 +1,7 @@
 import unittest
 from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Lexical import Token
+from src.Interpreter.DataStructure import VarRef
 
 class TestGrammar(unittest.TestCase):
     """
@@ -28,11 +30,11 @@ class TestGrammar(unittest.TestCase):
         
         # 验证主步骤的内容是否正确
         stepContent = steps['main']
-        expectedStepContent = [
-            ['Speak', 'Hello World'],
-            ['Listen', '5'],
-            ['Exit']
-        ]
+        expectedStepContent = (
+            ('Speak', 'Hello World'),
+            ('Listen', '5'),
+            ('Exit',)
+        )
         self.assertEqual(stepContent, expectedStepContent)
 
     def testVariableNames(self):
@@ -49,29 +51,66 @@ class TestGrammar(unittest.TestCase):
         # 验证变量名是否被正确提取
         varNames = grmTree.getVarName()
         self.assertIn('name', varNames)  # 检查变量名是否在列表中
+        self.assertEqual(grmTree.getStep()['main'][1], ('Speak', VarRef('name')))  # 变量以VarRef表示
 
     def testProcessError(self):
-        """测试语法解析中的错误处理，确保无效token会产生错误输出"""
+        """测试语法解析中的错误处理，确保无效token会被收集为诊断信息"""
         tokensWithError = [
             ['Step'],  # 缺少步骤名称
             ['Speak', 'Hello']
         ]
-        
-        # 捕获错误输出
-        from io import StringIO
-        import sys
-        capturedOutput = StringIO()
-        sys.stdout = capturedOutput
-        
-        # 创建Grammar对象并触发错误
         grammar = Grammar(tokensWithError)
-        
-        # 恢复标准输出流
-        sys.stdout = sys.__stdout__
-        
-        # 验证错误消息是否包含"Invalid token"
-        output = capturedOutput.getvalue().strip()
-        self.assertIn("Error: Invalid token", output)
+
+        # 验证诊断信息是否包含"Invalid token"
+        diagnostics = [str(diagnostic) for diagnostic in grammar.getDiagnostics()]
+        self.assertEqual(len(diagnostics), 2)
+        self.assertIn("Error: Invalid token", diagnostics[0])
+        self.assertTrue(grammar.hasErrors())
+
+    def testDiagnosticPositions(self):
+        """测试诊断信息携带词法单元的位置，且解析会继续进行"""
+        tokens = [
+            Token(['Step', 'main'], 1, 1),
+            Token(['Shout', '"Hi"'], 2, 5),  # 未知指令
+            Token(['Listen', 'soon'], 3, 5),  # 时长不合法
+            Token(['Speak', '"Bye"'], 4, 5),
+            Token(['Exit'], 5, 5)
+        ]
+        grammar = Grammar(tokens)
+        diagnostics = grammar.getDiagnostics()
+        self.assertEqual([(d.line, d.column) for d in diagnostics], [(2, 5), (3, 5)])
+        self.assertIn("Unknown token type", diagnostics[0].message)
+        self.assertEqual(grammar.getGrmTree().getStep()['main'], (('Speak', 'Bye'), ('Exit',)))
+
+    def testBranchInstruction(self):
+        """测试同一步骤的多个Branch只生成一条分支指令"""
+        tokens = [
+            ['Step', 'main'],
+            ['Listen', '5'],
+            ['Branch', '"a"', 'main'],
+            ['Branch', '"b"', 'main'],
+            ['Default', 'main']
+        ]
+        grmTree = Grammar(tokens).getGrmTree()
+        self.assertEqual(grmTree.getStep()['main'], (('Listen', '5'), ('Branch',), ('Default', 'main')))
+        self.assertEqual(grmTree.getBranch(), {'main': {'a': 'main', 'b': 'main'}})
+
+    def testBranchTablesPerStep(self):
+        """测试分支表按步骤隔离，同一步骤内重复的关键词以先声明的为准"""
+        tokens = [
+            ['Step', 'first'],
+            ['Listen', '5'],
+            ['Branch', '"是"', 'first'],
+            ['Branch', '"是"', 'second'],
+            ['Step', 'second'],
+            ['Listen', '5'],
+            ['Branch', '"是"', 'second'],
+            ['Exit']
+        ]
+        grammar = Grammar(tokens)
+        self.assertEqual(grammar.getGrmTree().getBranch(), {'first': {'是': 'first'}, 'second': {'是': 'second'}})
+        self.assertEqual([d.severity for d in grammar.getDiagnostics()], ['warning'])
+        self.assertFalse(grammar.hasErrors())
 
 if __name__ == '__main__':
     unittest.main()  # 执行测试
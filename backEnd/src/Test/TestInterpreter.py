@@ -129,5 +129,140 @@ class TestInterpreter(unittest.TestCase):
         follow_up = interpreter.getLatestResult()
         self.assertEqual(follow_up, "Goodbye")
 
+    def testStaleRunCannotWriteNewLog(self):
+        """
+        重新开始对话时先使旧调度过期再丢弃旧输出：之后旧调度的输出不会写入新对话的日志。
+        """
+        import threading as threads
+        from contextlib import redirect_stdout
+        from io import StringIO
+        from src.Interpreter.StateMachine import START
+        generation, _, _, _, _ = self.interpreter.newRun(threads.Event())
+        staleEmit = self.interpreter.emitter(generation)
+        with redirect_stdout(StringIO()):
+            staleEmit('旧对话的输出')
+            self.interpreter.newRun(threads.Event())
+            self.assertEqual(list(self.interpreter.resultLog()), [])  # 旧输出已丢弃
+            staleEmit('过期调度的输出')
+        self.assertEqual(list(self.interpreter.resultLog()), [])
+        self.assertEqual(self.interpreter.resultLog().nextSeq, 2)  # 序号继续递增
+
+        # 内联推进时 START 同样丢弃上一段对话的输出
+        with redirect_stdout(StringIO()):
+            self.interpreter.feed(START)
+            self.interpreter.feed(START)
+        self.assertEqual(list(self.interpreter.resultLog()), ['Hello World'])
+
+    def testTicketAnsweredByOwnInput(self):
+        """
+        同步请求的票据只由它提交的输入应答：提交前先触发的超时推进了一轮，但不应答该票据。
+        """
+        import time
+        from contextlib import redirect_stdout
+        from io import StringIO
+        from src.Interpreter.StateMachine import START, INPUT
+        results = self.interpreter.resultLog()
+        with redirect_stdout(StringIO()):
+            self.interpreter.feed(START)
+            seq, ticket = results.ticket()
+            self.interpreter.state.deadline = time.time() - 1  # 输入晚于超时时间点到达
+            self.interpreter.expire()
+            self.assertFalse(results.answered(ticket))
+            self.interpreter.feed(INPUT, 'yes', ticket=ticket)
+        self.assertTrue(results.answered(ticket))
+        self.assertEqual([message for _, message in results.after(seq)], ['No response received'])
+
+        # 线程调度：输入由调度线程取走时一并取走票据
+        interpreter = Interpreter(self.grmTree)
+        with redirect_stdout(StringIO()):
+            interpreter.startDispatch()
+            deadline = time.monotonic() + 5
+            while interpreter.state.deadline is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            seq, ticket = interpreter.resultLog().ticket()
+            interpreter.setUserInput('yes', ticket)
+            self.assertTrue(interpreter.resultLog().waitAnswer(ticket, 5))
+        self.assertEqual([message for _, message in interpreter.resultLog().after(seq)], ['You said yes'])
+
+    def testQueuedInputsKeepTheirTickets(self):
+        """
+        线程调度下连续提交的输入按顺序各执行一轮：不会互相覆盖，也不会多出空输入的一轮，每个票据由自己的输入应答。
+        """
+        import time
+        from contextlib import redirect_stdout
+        from io import StringIO
+        tokens = [
+            ['Step', 'main'],
+            ['Speak', '"Ask"'],
+            ['Listen', '5'],
+            ['Branch', '"yes"', 'yes_step'],
+            ['Default', 'main'],
+            ['Step', 'yes_step'],
+            ['Speak', '"You said yes"'],
+            ['Exit']
+        ]
+        interpreter = Interpreter(Grammar(tokens).getGrmTree())
+        results = interpreter.resultLog()
+        with redirect_stdout(StringIO()):
+            interpreter.startDispatch()
+            deadline = time.monotonic() + 5
+            while interpreter.state.deadline is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            with interpreter.parked():  # 两条输入都在调度执行步骤之前到达
+                seq, first = results.ticket()
+                interpreter.setUserInput('no', first)
+                _, second = results.ticket()
+                interpreter.setUserInput('yes', second)
+            self.assertTrue(results.waitAnswer(first, 5))
+            self.assertTrue(results.waitAnswer(second, 5))
+        self.assertEqual([message for _, message in results.after(seq)], ['Ask', 'You said yes'])
+        self.assertEqual(interpreter.userInput, 'yes')
+
+    def testRestartDoesNotWait(self):
+        """
+        重新开始对话不等待旧调度退出：旧调度仍在处理输入（意图识别较慢）时立即返回，
+        旧调度的输出被丢弃，新对话从头开始。
+        """
+        import time
+        from contextlib import redirect_stdout
+        from io import StringIO
+
+        class SlowIntent:
+            def match_intent(self, text):
+                time.sleep(0.5)
+                return {}
+
+        with redirect_stdout(StringIO()):
+            self.interpreter.intentService = SlowIntent()
+            self.interpreter.startDispatch()
+            time.sleep(0.1)
+            self.assertEqual(self.interpreter.getLatestResult(), "Hello World")
+            oldThread = self.interpreter.dispatchThread
+            self.interpreter.setUserInput("yes")
+            time.sleep(0.1)  # 旧调度正在做意图识别
+
+            begin = time.monotonic()
+            self.interpreter.startDispatch()
+            self.assertLess(time.monotonic() - begin, 0.1)
+            oldThread.join(2)
+            self.assertFalse(oldThread.is_alive())
+            self.assertEqual(self.interpreter.getLatestResult(), "Hello World")
+            self.assertIsNone(self.interpreter.getLatestResult())  # 旧调度的 "You said yes" 被丢弃
+            self.assertTrue(self.interpreter.isDispatching())
+            self.interpreter.requestStop()
+
+    def testIdleSessionIsCompact(self):
+        """
+        空闲会话不创建线程事件和结果队列，意图服务和符号表在会话间共享。
+        """
+        other = Interpreter(self.grmTree)
+        self.assertIsNone(other.inputEvent)
+        self.assertIsNone(other.getLatestResult())
+        self.assertIs(other.intentService, self.interpreter.intentService)
+        self.assertIs(other.userTable.varIndex, self.interpreter.userTable.varIndex)
+        self.assertFalse(hasattr(other, '__dict__'))
+        other.setUserInput("yes")  # 未开始调度时设置输入不应出错
+        other.requestStop()
+
 if __name__ == '__main__':
     unittest.main()  # 执行测试
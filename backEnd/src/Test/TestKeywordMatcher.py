@@ -0,0 +1,46 @@
+import unittest
+import random
+from src.Interpreter.KeywordMatcher import KeywordMatcher
+
+class TestKeywordMatcher(unittest.TestCase):
+    """
+    测试分支关键词匹配器：先声明优先，自动机与逐个查找结果一致
+    """
+    def setUp(self):
+        """构造同时使用自动机和逐个查找的匹配器"""
+        self.branches = [('账单', 'bill'), ('人工', 'human'), ('账单查询', 'query'), ('单', 'single')]
+        self.automaton = KeywordMatcher(self.branches, threshold=0)
+        self.loop = KeywordMatcher(self.branches, threshold=len(self.branches) + 1)
+
+    def testFirstDeclaredWins(self):
+        """多个关键词同时命中时以先声明的为准"""
+        self.assertTrue(self.automaton.isAutomaton())
+        self.assertFalse(self.loop.isAutomaton())
+        for match in (self.automaton.scan, self.loop.match):
+            self.assertEqual(match('我想转人工查一下账单'), 'bill')
+            self.assertEqual(match('账单查询'), 'bill')
+            self.assertEqual(match('订单'), 'single')
+            self.assertEqual(match('转人工'), 'human')
+            self.assertIsNone(match('你好'))
+            self.assertIsNone(match(''))
+
+    def testEmptyKeyword(self):
+        """空关键词总能命中"""
+        matcher = KeywordMatcher([('投诉', 'complain'), ('', 'any')], threshold=0)
+        self.assertEqual(matcher.scan('你好'), 'any')
+        self.assertEqual(matcher.scan('我要投诉'), 'complain')
+
+    def testAutomatonAgreesWithLoop(self):
+        """随机关键词和输入下，自动机扫描与逐个查找结果一致"""
+        rng = random.Random(7)
+        alphabet = '账单人工投诉套餐'
+        for _ in range(500):
+            keywords = {''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(1, 40))}
+            branches = [(keyword, index) for index, keyword in enumerate(sorted(keywords))]
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+            expected = next((target for keyword, target in branches if keyword in text), None)
+            self.assertEqual(KeywordMatcher(branches, threshold=0).scan(text), expected)
+            self.assertEqual(KeywordMatcher(branches).match(text), expected)
+
+if __name__ == '__main__':
+    unittest.main()  # 运行测试
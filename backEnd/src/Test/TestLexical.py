@@ -1,6 +1,6 @@
 import unittest
 import os
-from src.Interpreter.Lexical import Lexical
+from src.Interpreter.Lexical import Lexical, Token, tokenize
 
 class TestLexical(unittest.TestCase):
     """
@@ -52,5 +52,22 @@ class TestLexical(unittest.TestCase):
         ]
         self.assertEqual(output, expectedOutput)  # 验证输出是否与预期一致
 
+    def testTokenPositions(self):
+        """测试流式词法分析产出的行号和列号"""
+        with open(self.testFileName, 'a', encoding='utf-8') as f:
+            f.write('    Branch "投诉" complainProc # 行尾注释\n')
+        tokens = list(tokenize(self.testFileName))
+        self.assertTrue(all(isinstance(token, Token) for token in tokens))
+        self.assertEqual([(token.line, token.column) for token in tokens], [(1, 1), (2, 1), (3, 1), (6, 5)])
+        self.assertEqual(tokens[-1], ['Branch', '"投诉"', 'complainProc'])  # 注释应被丢弃
+
+    def testChunkBoundaries(self):
+        """测试分块读取时跨块的行能被正确拼接"""
+        expected = list(tokenize(self.testFileName))
+        for chunkSize in (1, 3, 7):
+            tokens = list(tokenize(self.testFileName, chunkSize))
+            self.assertEqual(tokens, expected)
+            self.assertEqual([token.line for token in tokens], [token.line for token in expected])
+
 if __name__ == '__main__':
     unittest.main()  # 运行测试
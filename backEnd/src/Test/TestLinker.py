@@ -0,0 +1,76 @@
+import unittest
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Linker import link, LinkError
+from src.Interpreter.Interpreter import Interpreter
+from src.Interpreter.ScriptCache import parseSource
+
+class TestLinker(unittest.TestCase):
+    """
+    测试链接过程：跳转目标解析为整数下标，悬空引用在加载时报错
+    """
+    def testResolveTargets(self):
+        """测试跳转目标和Listen时长的解析"""
+        tokens = [
+            ['Step', 'main'],
+            ['Speak', '"Hello"'],
+            ['Listen', '5'],
+            ['Branch', '"yes"', 'yesStep'],
+            ['Silence', 'main'],
+            ['Default', 'yesStep'],
+            ['Step', 'yesStep'],
+            ['Exit']
+        ]
+        tree = link(Grammar(tokens).getGrmTree())
+        self.assertTrue(tree.isLinked())
+        self.assertEqual(tree.getStepNames(), ('main', 'yesStep'))
+        self.assertEqual(tree.getMainIndex(), 0)
+        self.assertEqual(tree.getProgram()[0], (
+            ('Speak', tree.getProgram()[0][0][1]),
+            ('Listen', 5),
+            ('Branch', tree.getProgram()[0][2][1]),
+            ('Silence', 0),
+            ('Default', 1)
+        ))
+        self.assertEqual(tree.getProgram()[0][0][1].text, 'Hello')
+        self.assertEqual(tree.getProgram()[0][2][1].getBranches(), (('yes', 1),))
+        self.assertEqual(tree.getProgram()[1], (('Exit',),))
+
+    def testDanglingReferences(self):
+        """测试所有悬空引用都会被报告，且语法树保持未链接"""
+        tokens = [
+            ['Step', 'main'],
+            ['Listen', '5'],
+            ['Branch', '"yes"', 'nowhere'],
+            ['Silence', 'missing'],
+            ['Default', 'main']
+        ]
+        tree = Grammar(tokens).getGrmTree()
+        with self.assertRaises(LinkError) as context:
+            link(tree)
+        self.assertEqual(len(context.exception.errors), 2)
+        self.assertIn("nowhere", str(context.exception))
+        self.assertIn("missing", str(context.exception))
+        self.assertFalse(tree.isLinked())
+
+    def testInterpreterRejectsDanglingScript(self):
+        """测试解释器在创建时而不是运行时发现未定义的步骤"""
+        tree = Grammar([['Step', 'main'], ['Default', 'nowhere']]).getGrmTree()
+        with self.assertRaises(LinkError):
+            Interpreter(tree)
+
+    def testBranchTablesDoNotCollide(self):
+        """测试不同步骤中的同名关键词各自跳转到自己的目标"""
+        tree = parseSource('src/Test/Example/test2.txt')
+        names = tree.getStepNames()
+
+        def branchesOf(stepID):
+            step = tree.getProgram()[tree.getStepIndex()[stepID]]
+            branch = next(state for state in step if state[0] == 'Branch')
+            return {keyword: names[target] for keyword, target in branch[1].getBranches()}
+
+        self.assertEqual(branchesOf('upgradePlan')['是'], 'upgradeConfirm')
+        self.assertEqual(branchesOf('addOnData')['是'], 'sendAddOnInfo')
+        self.assertEqual(list(branchesOf('welcome')), ['账单', '套餐', '人工', '投诉'])
+
+if __name__ == '__main__':
+    unittest.main()  # 运行测试
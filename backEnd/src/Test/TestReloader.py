@@ -0,0 +1,133 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from src.Interpreter.Reloader import ScriptHandle, ScriptWatcher, splitBlocks
+from src.Interpreter.Interpreter import Interpreter
+
+SCRIPT = '''Step main
+    Speak "第一版"
+    Listen 5
+    Default next
+Step next
+    Speak "旧的下一步"
+    Exit
+Step other
+    Speak $name + "其他"
+    Exit
+'''
+
+class TestReloader(unittest.TestCase):
+    """
+    测试脚本热加载：增量解析、原子发布以及会话在步骤边界切换版本
+    """
+    def setUp(self):
+        """创建临时脚本并加载"""
+        self.tmpDir = tempfile.mkdtemp()
+        self.scriptPath = os.path.join(self.tmpDir, 'script.txt')
+        self.writeScript(SCRIPT)
+        self.handle = ScriptHandle(self.scriptPath)
+
+    def tearDown(self):
+        """删除临时目录"""
+        shutil.rmtree(self.tmpDir)
+
+    def writeScript(self, content):
+        with open(self.scriptPath, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def testSplitBlocks(self):
+        """测试按Step切分块，Step之前的内容并入第一块"""
+        tokens = [['Speak', '"x"'], ['Step', 'a'], ['Exit'], ['Step', 'b'], ['Exit']]
+        self.assertEqual(splitBlocks(tokens), [tokens[:3], tokens[3:]])
+
+    def testIncrementalReload(self):
+        """只有变化的步骤块会被重新解析，未变化的步骤复用旧对象"""
+        self.assertEqual(self.handle.lastReparsed, 3)  # 初始加载解析全部块
+        self.writeScript(SCRIPT.replace('旧的下一步', '新的下一步'))
+        self.assertTrue(self.handle.reload())  # 首次重新加载同样只解析变化的块
+        self.assertEqual(self.handle.lastReparsed, 1)
+        oldTree = self.handle.getTree()
+
+        self.writeScript(SCRIPT.replace('旧的下一步', '再次修改'))
+        self.assertTrue(self.handle.reload())
+        newTree = self.handle.getTree()
+        self.assertEqual(self.handle.lastReparsed, 1)
+        self.assertEqual(self.handle.getVersion(), 3)
+        self.assertIs(newTree.getStep()['main'], oldTree.getStep()['main'])
+        self.assertEqual(newTree.getStep()['next'][0], ('Speak', '再次修改'))
+        self.assertEqual(newTree.getMainStep(), 'main')
+        self.assertEqual(newTree.getVarName(), ['name'])
+
+    def testWarmStartUsesArtifact(self):
+        """源文件未变化时直接加载编译产物，首次重新加载仍只解析变化的块"""
+        original = ScriptHandle.parseBlocks
+        ScriptHandle.parseBlocks = lambda *args: self.fail("不应重新解析")
+        try:
+            handle = ScriptHandle(self.scriptPath)
+        finally:
+            ScriptHandle.parseBlocks = original
+        self.assertEqual(handle.lastReparsed, 0)
+        self.assertEqual(handle.getTree().getStep(), self.handle.getTree().getStep())
+        self.assertTrue(handle.getTree().isLinked())
+
+        self.writeScript(SCRIPT.replace('旧的下一步', '新的下一步'))
+        self.assertTrue(handle.reload())
+        self.assertEqual(handle.lastReparsed, 1)
+        self.assertEqual(handle.getTree().getStep()['next'][0], ('Speak', '新的下一步'))
+
+    def testUnchangedAndBrokenScriptKeepVersion(self):
+        """内容未变化或存在语法错误时不发布新版本"""
+        self.assertFalse(self.handle.reload())
+        self.writeScript(SCRIPT.replace('Listen 5', 'Listen soon'))
+        self.assertFalse(self.handle.reload())
+        self.assertEqual(self.handle.getVersion(), 1)
+        self.assertEqual(self.handle.getTree().getStep()['main'][1], ('Listen', '5'))
+        self.writeScript(SCRIPT.replace('Default next', 'Default nowhere'))
+        self.assertFalse(self.handle.reload())
+        self.assertEqual(self.handle.getVersion(), 1)
+
+    def testRejectedBlockStaysRejected(self):
+        """被拒绝的错误块在之后的无关修改中仍应被拒绝，不会随新版本发布"""
+        broken = SCRIPT.replace('Listen 5', 'Listen soon')
+        self.writeScript(broken)
+        self.assertFalse(self.handle.reload())
+        self.writeScript(broken.replace('旧的下一步', '新的下一步'))
+        self.assertFalse(self.handle.reload())
+        self.assertEqual(self.handle.getVersion(), 1)
+        self.assertEqual(self.handle.getTree().getStep()['main'][1], ('Listen', '5'))
+
+        self.writeScript(SCRIPT.replace('旧的下一步', '新的下一步'))
+        self.assertTrue(self.handle.reload())
+        self.assertEqual(self.handle.getTree().getStep()['next'][0], ('Speak', '新的下一步'))
+
+    def testWatcherPicksUpChanges(self):
+        """测试后台轮询发现文件变化"""
+        watcher = ScriptWatcher([self.handle], interval=0.05)
+        self.writeScript(SCRIPT.replace('第一版', '第二版'))
+        os.utime(self.scriptPath, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        watcher.start()
+        try:
+            deadline = time.time() + 2
+            while self.handle.getVersion() == 1 and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            watcher.stop()
+        self.assertEqual(self.handle.getTree().getStep()['main'][0], ('Speak', '第二版'))
+
+    def testSessionSwitchesAtStepBoundary(self):
+        """运行中的会话保持当前步骤，下一个步骤边界才使用新版本"""
+        interpreter = Interpreter(self.handle.getTree(), self.handle)
+        interpreter.startDispatch()
+        time.sleep(0.2)
+        self.assertEqual(interpreter.getLatestResult(), '第一版')
+
+        self.writeScript(SCRIPT.replace('旧的下一步', '新的下一步'))
+        self.assertTrue(self.handle.reload())
+        interpreter.setUserInput('你好')
+        time.sleep(0.2)
+        self.assertEqual(interpreter.getLatestResult(), '新的下一步')
+
+if __name__ == '__main__':
+    unittest.main()  # 运行测试
@@ -0,0 +1,103 @@
+import threading
+import time
+import unittest
+from src.Interpreter.ResultLog import ResultLog
+
+
+class TestResultLog(unittest.TestCase):
+    """
+    测试输出日志：序号递增、按序号读取、阻塞等待、确认丢弃、溢出策略和事件ID。
+    """
+    def testSequence(self):
+        log = ResultLog(['a', 'b'])
+        self.assertEqual(log.append('c'), 3)
+        self.assertEqual(log.after(0), [(1, 'a'), (2, 'b'), (3, 'c')])
+        self.assertEqual(log.after(2), [(3, 'c')])
+        self.assertEqual(log.after(3), [])
+        self.assertEqual(log.popleft(), 'a')
+        self.assertEqual(list(log), ['b', 'c'])
+        self.assertEqual(log.firstSeq(), 2)
+        self.assertEqual(log.after(0), [(2, 'b'), (3, 'c')])
+
+    def testRetention(self):
+        log = ResultLog(retention=3)
+        for index in range(5):
+            log.append(index)
+        self.assertEqual(log.after(0), [(3, 2), (4, 3), (5, 4)])
+
+    def testOverflowPolicy(self):
+        log = ResultLog(retention=2, overflow='dropNewest')
+        self.assertEqual([log.append(index) for index in range(4)], [1, 2, None, None])
+        self.assertEqual(log.after(0), [(1, 0), (2, 1)])
+        self.assertEqual(log.dropped, 2)
+        log = ResultLog(retention=2)
+        log.extend(range(4))
+        self.assertEqual(log.after(0), [(3, 2), (4, 3)])
+        self.assertEqual(log.dropped, 2)
+
+    def testAcknowledge(self):
+        log = ResultLog(['a', 'b', 'c'])
+        self.assertEqual(log.acknowledge(0), ([(1, 'a'), (2, 'b'), (3, 'c')], 3, 0))
+        self.assertEqual(log.acknowledge(1), ([(2, 'b'), (3, 'c')], 3, 0))
+        self.assertEqual(log.acknowledge(1), ([(2, 'b'), (3, 'c')], 3, 0))  # 重复确认结果相同
+        self.assertEqual(log.acknowledge(3), ([], 3, 0))
+        self.assertEqual(len(log), 0)
+        # 游标落后于保留范围时报告缺失条数
+        log = ResultLog(retention=2)
+        log.extend('abcde')
+        self.assertEqual(log.acknowledge(1), ([(4, 'd'), (5, 'e')], 5, 2))
+
+    def testTicket(self):
+        log = ResultLog(['a'])
+        seq, ticket = log.ticket()
+        self.assertEqual((seq, ticket), (1, 1))
+        self.assertFalse(log.waitAnswer(ticket, 0.01))
+        log.answer(None)  # 超时等不属于任何同步请求的轮次
+        self.assertFalse(log.answered(ticket))
+        def step():
+            log.append('b')
+            log.answer(ticket)
+        threading.Timer(0.05, step).start()
+        self.assertTrue(log.waitAnswer(ticket, 5))
+        self.assertTrue(log.answered(ticket))
+        self.assertEqual(log.after(seq), [(2, 'b')])
+        log.forget(ticket)
+        self.assertFalse(log.answered(ticket))
+        log.answer(ticket)  # 放弃后的应答被忽略
+        self.assertEqual(log.tickets, {})
+
+    def testDiscard(self):
+        log = ResultLog(['a', 'b', 'c'])
+        log.discard(2)
+        self.assertEqual(log.after(0), [(3, 'c')])
+        log.discard()
+        self.assertEqual(len(log), 0)
+        self.assertEqual(log.append('d'), 4)  # 丢弃后序号继续递增
+
+    def testWait(self):
+        log = ResultLog()
+        begin = time.monotonic()
+        self.assertEqual(log.wait(0, 0.05), [])
+        self.assertGreaterEqual(time.monotonic() - begin, 0.04)
+        threading.Timer(0.05, log.append, args=('hello',)).start()
+        self.assertEqual(log.wait(0, 5), [(1, 'hello')])
+        self.assertEqual(log.wait(0, 5), [(1, 'hello')])  # 已有新输出时立即返回
+
+    def testEventID(self):
+        log = ResultLog(epoch='abc')
+        self.assertEqual(log.eventID(7), 'abc:7')
+        self.assertEqual(log.parseEventID('abc:7'), 7)
+        self.assertEqual(log.parseEventID('other:7'), 0)
+        self.assertEqual(log.parseEventID(None), 0)
+        self.assertEqual(log.parseEventID('abc:x'), 0)
+
+    def testRestoreKeepsSequence(self):
+        log = ResultLog(['a', 'b', 'c'])
+        log.popleft()
+        copy = ResultLog(list(log), log.firstSeq(), log.epoch)
+        self.assertEqual(copy.after(0), log.after(0))
+        self.assertEqual(copy.parseEventID(log.eventID(2)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from src.Interpreter.Scheduler import Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    """
+    测试工作线程池：优先级、同一会话的顺序、失败隔离、排队上限和统计。
+    """
+    def setUp(self):
+        self.scheduler = Scheduler(workers=1)
+        self.gate = threading.Event()
+        self.order = []
+
+    def tearDown(self):
+        self.gate.set()
+        self.scheduler.stop()
+
+    def block(self):
+        """占住唯一的工作线程，直到 gate 打开"""
+        started = threading.Event()
+
+        def task():
+            started.set()
+            self.gate.wait(5)
+
+        self.scheduler.submit('blocker', task)
+        self.scheduler.start()
+        started.wait(5)
+
+    def record(self, name):
+        return lambda: self.order.append(name)
+
+    def testPriorityOrder(self):
+        """vip 先于 normal，normal 先于 bulk，同一类别内先到先执行"""
+        self.block()
+        self.scheduler.submit('b1', self.record('bulk1'), 'bulk')
+        self.scheduler.submit('n1', self.record('normal1'))
+        self.scheduler.submit('v1', self.record('vip1'), 'vip')
+        self.scheduler.submit('b2', self.record('bulk2'), 'bulk')
+        self.scheduler.submit('v2', self.record('vip2'), 'vip')
+        self.gate.set()
+        self.assertTrue(self.scheduler.join(5))
+        self.assertEqual(self.order, ['vip1', 'vip2', 'normal1', 'bulk1', 'bulk2'])
+
+    def testPerSessionOrdering(self):
+        """同一会话的任务按提交顺序执行，且不会并发执行"""
+        scheduler = Scheduler(workers=4)
+        scheduler.start()
+        active = []
+        overlaps = []
+
+        def task(index):
+            def run():
+                if active:
+                    overlaps.append(index)
+                active.append(index)
+                time.sleep(0.001)
+                active.pop()
+                self.order.append(index)
+            return run
+
+        for index in range(50):
+            scheduler.submit('alice', task(index))
+        self.assertTrue(scheduler.join(5))
+        scheduler.stop()
+        self.assertEqual(self.order, list(range(50)))
+        self.assertEqual(overlaps, [])
+
+    def testFailureIsolated(self):
+        """任务抛出异常不影响后续任务"""
+        def fail():
+            raise RuntimeError('boom')
+
+        self.scheduler.start()
+        with redirect_stdout(StringIO()):
+            self.scheduler.submit('a', fail)
+            self.scheduler.submit('a', self.record('after'))
+            self.assertTrue(self.scheduler.join(5))
+        self.assertEqual(self.order, ['after'])
+        metrics = self.scheduler.metrics()
+        self.assertEqual((metrics['failed'], metrics['completed']), (1, 1))
+
+    def testMaxPending(self):
+        """排队任务达到上限时拒绝提交"""
+        self.scheduler = Scheduler(workers=1, maxPending=2)
+        self.block()
+        self.assertTrue(self.scheduler.submit('a', self.record('a')))
+        self.assertTrue(self.scheduler.submit('b', self.record('b')))
+        self.assertFalse(self.scheduler.submit('c', self.record('c')))
+        self.assertEqual(self.scheduler.metrics()['rejected'], 1)
+
+    def testMetrics(self):
+        """统计队列深度和排队时间"""
+        self.block()
+        self.scheduler.submit('a', self.record('a'), 'vip')
+        self.scheduler.submit('a', self.record('a2'), 'vip')
+        self.scheduler.submit('b', self.record('b'), 'bulk')
+        metrics = self.scheduler.metrics()
+        self.assertEqual(metrics['depth'], 3)
+        self.assertEqual(metrics['depthByPriority'], {'vip': 2, 'normal': 0, 'bulk': 1})
+        self.assertEqual(metrics['runnableSessions'], 2)
+        self.assertEqual(metrics['running'], 1)
+        self.gate.set()
+        self.assertTrue(self.scheduler.join(5))
+        metrics = self.scheduler.metrics()
+        self.assertEqual(metrics['depth'], 0)
+        self.assertEqual(metrics['maxDepth'], 3)
+        self.assertEqual(self.order, ['a', 'a2', 'b'])  # 同一会话的后续 vip 任务仍先于 bulk
+        # 排队时间按优先级分别记录，只比较样本数，不比较受机器负载影响的时长
+        self.assertEqual({name: len(samples) for name, samples in self.scheduler.waits.items()},
+                         {'vip': 2, 'normal': 1, 'bulk': 1})
+        for name in ('vip', 'normal', 'bulk'):
+            self.assertLessEqual(metrics['waitMs'][name]['p50'], metrics['waitMs'][name]['max'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import os
+import shutil
+import tempfile
+from src.Interpreter import ScriptCache
+from src.Interpreter.ScriptCache import loadScript, compileScript, cachePathFor, HEADER, MAGIC
+from src.Interpreter.Linker import LinkError
+
+class TestScriptCache(unittest.TestCase):
+    """
+    测试脚本编译产物的生成、命中与失效回退
+    """
+    def setUp(self):
+        """创建临时目录和脚本文件"""
+        self.tmpDir = tempfile.mkdtemp()
+        self.scriptPath = os.path.join(self.tmpDir, 'script.txt')
+        self.writeScript('Step main\n    Speak $name + "您好"\n    Listen 5\n    Branch "账单" bill\n    Default bill\nStep bill\n    Speak "再见"\n    Exit\n')
+
+    def tearDown(self):
+        """删除临时目录"""
+        shutil.rmtree(self.tmpDir)
+
+    def writeScript(self, content):
+        with open(self.scriptPath, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def testCompileWritesArtifact(self):
+        """编译后应生成带版本头的编译产物"""
+        compileScript(self.scriptPath)
+        cachePath = cachePathFor(self.scriptPath)
+        self.assertTrue(os.path.exists(cachePath))
+        with open(cachePath, 'rb') as f:
+            magic, version, _ = HEADER.unpack(f.read(HEADER.size))
+        self.assertEqual(magic, MAGIC)
+        self.assertEqual(version, ScriptCache.FORMAT_VERSION)
+
+    def testWarmLoadSkipsParsing(self):
+        """哈希匹配时不应再调用词法和语法分析"""
+        tree = compileScript(self.scriptPath)
+        original = ScriptCache.parseSource
+        ScriptCache.parseSource = lambda *args: self.fail("不应重新解析")
+        try:
+            cached = loadScript(self.scriptPath)
+        finally:
+            ScriptCache.parseSource = original
+        self.assertEqual(cached.getMainStep(), tree.getMainStep())
+        self.assertEqual(cached.getStep(), tree.getStep())
+        self.assertEqual(cached.getVarName(), tree.getVarName())
+        self.assertEqual(cached.getBranch(), tree.getBranch())
+
+    def testSourceChangeFallsBack(self):
+        """源文件变化后应回退到解析并刷新编译产物"""
+        compileScript(self.scriptPath)
+        self.writeScript('Step other\n    Speak "新脚本"\n    Exit\n')
+        tree = loadScript(self.scriptPath)
+        self.assertEqual(tree.getMainStep(), 'other')
+        self.assertEqual(loadScript(self.scriptPath).getMainStep(), 'other')
+
+    def testCorruptArtifactFallsBack(self):
+        """编译产物损坏或版本不符时应回退到解析"""
+        compileScript(self.scriptPath)
+        cachePath = cachePathFor(self.scriptPath)
+        with open(cachePath, 'r+b') as f:
+            f.seek(HEADER.size)
+            f.write(b'\x00garbage')
+        self.assertEqual(loadScript(self.scriptPath).getMainStep(), 'main')
+
+        with open(cachePath, 'r+b') as f:
+            f.seek(len(MAGIC))
+            f.write(b'\xff\xff')
+        self.assertEqual(loadScript(self.scriptPath).getMainStep(), 'main')
+
+    def testLoadedTreeIsLinked(self):
+        """加载得到的语法树已链接，悬空引用在加载时报错"""
+        compileScript(self.scriptPath)
+        self.assertTrue(loadScript(self.scriptPath).isLinked())
+        self.writeScript('Step main\n    Default nowhere\n')
+        with self.assertRaises(LinkError):
+            loadScript(self.scriptPath)
+
+    def testParsesHashedContent(self):
+        """计算哈希后文件被修改，编译产物仍应是被哈希的那份内容的语法树"""
+        original = ScriptCache.sourceHash
+
+        def hashThenEdit(source):
+            digest = original(source)
+            self.writeScript('Step other\n    Speak "新脚本"\n    Exit\n')
+            return digest
+
+        ScriptCache.sourceHash = hashThenEdit
+        try:
+            tree = compileScript(self.scriptPath)
+        finally:
+            ScriptCache.sourceHash = original
+        self.assertEqual(tree.getMainStep(), 'main')
+        # 文件已是新内容，哈希不匹配，应重新解析得到新版本
+        self.assertEqual(loadScript(self.scriptPath).getMainStep(), 'other')
+
+
+if __name__ == '__main__':
+    unittest.main()  # 运行测试
@@ -0,0 +1,89 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from src.Interpreter.KeywordMatcher import KeywordMatcher
+from src.Interpreter.ScriptRegistry import ScriptRegistry, estimateTreeSize, estimateHandleSize
+
+class TestScriptRegistry(unittest.TestCase):
+    """
+    测试多脚本注册表的懒加载与LRU淘汰
+    """
+    def setUp(self):
+        """在临时目录中创建三个脚本"""
+        self.tmpDir = tempfile.mkdtemp()
+        for scriptID in ('a', 'b', 'c'):
+            with open(os.path.join(self.tmpDir, scriptID + '.txt'), 'w', encoding='utf-8') as f:
+                f.write(f'Step {scriptID}Main\n    Speak $name + "脚本{scriptID}"\n    Exit\n')
+
+    def tearDown(self):
+        """删除临时目录"""
+        shutil.rmtree(self.tmpDir)
+
+    def testLazyLoading(self):
+        """脚本在首次使用时才加载，重复获取返回同一句柄"""
+        registry = ScriptRegistry(scriptDir=self.tmpDir)
+        self.assertEqual(registry.loadedIDs(), [])
+        handle = registry.getHandle('a')
+        self.assertEqual(handle.getTree().getMainStep(), 'aMain')
+        self.assertIs(registry.getHandle('a'), handle)
+        self.assertEqual(registry.loadedIDs(), ['a'])
+        self.assertEqual(registry.loadCount, 1)
+
+    def testExplicitRegistration(self):
+        """显式登记的脚本ID优先于目录查找"""
+        registry = ScriptRegistry({'vip': os.path.join(self.tmpDir, 'b.txt')}, scriptDir=self.tmpDir)
+        self.assertEqual(registry.getTree('vip').getMainStep(), 'bMain')
+
+    def testUnknownScript(self):
+        """不存在或含路径的脚本ID应抛出KeyError"""
+        registry = ScriptRegistry(scriptDir=self.tmpDir)
+        with self.assertRaises(KeyError):
+            registry.getHandle('missing')
+        with self.assertRaises(KeyError):
+            registry.getHandle('../a')
+
+    def testEstimateCountsSlottedNodes(self):
+        """估算应计入 __slots__ 节点（关键词自动机、Speak模板）和句柄的片段缓存"""
+        branches = ''.join(f'    Branch "关键词{index}号" aMain\n' for index in range(50))
+        with open(os.path.join(self.tmpDir, 'many.txt'), 'w', encoding='utf-8') as f:
+            f.write(f'Step aMain\n    Speak "您好"\n    Listen 5\n{branches}    Default aMain\n')
+        handle = ScriptRegistry(scriptDir=self.tmpDir).getHandle('many')
+        tree = handle.getTree()
+        matcher = next(state[1] for state in tree.getProgram()[0] if isinstance(state[1], KeywordMatcher))
+        self.assertIsNotNone(matcher.goto)
+        automaton = sum(sys.getsizeof(table) for table in matcher.goto)
+        self.assertGreater(estimateTreeSize(matcher), automaton)
+        self.assertGreater(estimateTreeSize(tree), estimateTreeSize(matcher))
+        self.assertGreater(estimateHandleSize(handle), estimateTreeSize(tree))
+
+    def testLRUEviction(self):
+        """超出内存预算时淘汰最近最少使用的脚本"""
+        probe = ScriptRegistry(scriptDir=self.tmpDir)
+        size = estimateHandleSize(probe.getHandle('a'))
+        registry = ScriptRegistry(scriptDir=self.tmpDir, memoryBudget=size * 2 + size // 2)
+        registry.getHandle('a')
+        registry.getHandle('b')
+        registry.getHandle('a')  # a 变为最近使用
+        registry.getHandle('c')
+        self.assertEqual(registry.loadedIDs(), ['a', 'c'])
+        self.assertEqual(registry.evictCount, 1)
+        self.assertLessEqual(registry.memoryUsage(), registry.memoryBudget)
+
+    def testEvictedHandleInUseIsKept(self):
+        """被淘汰但仍被会话引用的句柄继续热加载，再次获取时返回同一句柄"""
+        probe = ScriptRegistry(scriptDir=self.tmpDir)
+        size = estimateHandleSize(probe.getHandle('a'))
+        registry = ScriptRegistry(scriptDir=self.tmpDir, memoryBudget=size + size // 2)
+        inUse = registry.getHandle('a')  # 模拟会话持有的句柄
+        registry.getHandle('b')
+        registry.getHandle('c')
+        self.assertEqual(registry.loadedIDs(), ['c'])
+        self.assertIn(inUse, registry.loadedHandles())
+        self.assertEqual(len(registry.loadedHandles()), 2)  # b 已无人引用，不再轮询
+        self.assertIs(registry.getHandle('a'), inUse)
+        self.assertEqual(registry.loadCount, 3)
+
+if __name__ == '__main__':
+    unittest.main()  # 运行测试
@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Interpreter import Interpreter
+from src.Interpreter.SessionManager import SessionManager
+from src.Interpreter.SessionStore import SessionStore
+
+
+class TestSessionManager(unittest.TestCase):
+    """
+    测试会话表的数量上限、空闲回收、替换时停止调度、换出恢复、分段和计数。
+    """
+    def setUp(self):
+        tokens = [
+            ['Step', 'main'],
+            ['Speak', '"Hello"'],
+            ['Listen', '30'],
+            ['Default', 'main']
+        ]
+        self.tree = Grammar(tokens).getGrmTree()
+        self.removed = []
+        self.manager = SessionManager(maxSessions=3, idleTTL=60,
+                                      onRemove=lambda username, _: self.removed.append(username))
+        self.output = redirect_stdout(StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.manager.clear()
+        self.output.__exit__(None, None, None)
+
+    def testDictInterface(self):
+        """支持常用的字典操作"""
+        interpreter = Interpreter(self.tree)
+        self.manager['alice'] = interpreter
+        self.assertIn('alice', self.manager)
+        self.assertIs(self.manager['alice'], interpreter)
+        self.assertIs(self.manager.get('alice'), interpreter)
+        self.assertIsNone(self.manager.get('bob'))
+        self.assertEqual(len(self.manager), 1)
+        del self.manager['alice']
+        self.assertNotIn('alice', self.manager)
+        self.assertEqual(self.removed, ['alice'])
+
+    def testCapacityEvictsLeastRecentlyActive(self):
+        """超过数量上限时回收最久未活跃的会话"""
+        for username in ('a', 'b', 'c'):
+            self.manager[username] = Interpreter(self.tree)
+        self.manager.touch('a')
+        self.manager['d'] = Interpreter(self.tree)
+        self.assertEqual([username for username, _ in self.manager.items()], ['c', 'a', 'd'])
+        self.assertEqual(self.manager.metrics()['reaped'], 1)
+
+    def testReapIdle(self):
+        """空闲超过期限的会话被回收"""
+        self.manager['a'] = Interpreter(self.tree)
+        self.manager['b'] = Interpreter(self.tree)
+        now = time.time()
+        self.assertEqual(self.manager.reap(now=now + 30), 0)
+        self.assertEqual(self.manager.reap(now=now + 61), 2)
+        self.assertEqual(len(self.manager), 0)
+
+    def testReplaceStopsDispatch(self):
+        """替换或回收会话时停止其调度，调度退出后不计为泄漏"""
+        first = Interpreter(self.tree)
+        self.manager['a'] = first
+        first.startDispatch()
+        self.assertTrue(first.isDispatching())
+        self.manager['a'] = Interpreter(self.tree)
+        deadline = time.monotonic() + 2
+        while first.isDispatching() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(first.isDispatching())
+        metrics = self.manager.metrics()
+        self.assertEqual(metrics['stopping'], 0)
+        self.assertEqual(metrics['leaked'], 0)
+        self.assertEqual(metrics['live'], 1)
+
+    def testReuse(self):
+        """重新登录时只复用同一脚本句柄的会话"""
+        source = object()
+        interpreter = Interpreter(self.tree)
+        interpreter.state.source = source
+        self.manager['a'] = interpreter
+        self.assertIs(self.manager.reuse('a', source), interpreter)
+        self.assertIsNone(self.manager.reuse('a', object()))
+        self.assertIsNone(self.manager.reuse('b', source))
+        self.assertEqual(self.manager.metrics()['reused'], 1)
+
+    def testStripes(self):
+        """分段时每段单独加锁、单独计算上限，items 仍按活跃时间排列"""
+        manager = SessionManager(maxSessions=12, idleTTL=60, stripes=4)
+        try:
+            self.assertEqual(manager.capacity(), 3)
+            names = [f'user{index}' for index in range(12)]
+            for username in names:
+                manager[username] = Interpreter(self.tree)
+                time.sleep(0.001)
+            self.assertEqual([username for username, _ in manager.items()],
+                             [username for username in names if username in manager])
+            self.assertIs(manager.lockFor('user0'), manager.stripeFor('user0').lock)
+            for stripe in manager.stripes:
+                self.assertLessEqual(len(stripe.sessions), 3)
+
+            # 持有一个分段的锁时，其他分段的用户不受影响
+            other = next(username for username in names
+                         if username in manager and manager.stripeFor(username) is not manager.stripeFor('user0'))
+            with manager.lockFor('user0'):
+                thread = threading.Thread(target=manager.touch, args=(other,))
+                thread.start()
+                thread.join(1)
+                self.assertFalse(thread.is_alive())
+            metrics = manager.metrics()
+            self.assertEqual((metrics['stripes'], metrics['live'], metrics['created']), (4, len(manager), 12))
+        finally:
+            manager.clear()
+
+    def testEvictToStoreAndRestore(self):
+        """配置存储时回收即换出，下一次访问时恢复"""
+        tmpDir = tempfile.mkdtemp()
+        store = SessionStore(os.path.join(tmpDir, 'sessions.db'))
+        try:
+            manager = SessionManager(idleTTL=60, store=store,
+                                     restore=lambda username, data: Interpreter.restore(data, self.tree))
+            interpreter = Interpreter(self.tree)
+            interpreter.setInfo('plan', 'A')
+            manager['a'] = interpreter
+            self.assertEqual(manager.drain(), 1)
+            self.assertNotIn('a', manager)
+            self.assertEqual(len(store), 1)
+
+            restored = manager.touch('a')
+            self.assertEqual(restored.userTable.getTable(), {'plan': 'A'})
+            self.assertEqual(len(store), 0)
+            metrics = manager.metrics()
+            self.assertEqual((metrics['evicted'], metrics['restored'], metrics['live']), (1, 1, 1))
+            self.assertIsNone(manager.touch('missing'))
+        finally:
+            store.close()
+            shutil.rmtree(tmpDir)
+
+    def testSnapshotWaitsForStepBoundary(self):
+        """线程调度正在执行步骤时，换出等到步骤结束才做快照，并停止调度"""
+        tmpDir = tempfile.mkdtemp()
+        store = SessionStore(os.path.join(tmpDir, 'sessions.db'))
+        try:
+            manager = SessionManager(idleTTL=60, store=store)
+            interpreter = Interpreter(self.tree)
+            manager['a'] = interpreter
+            interpreter.startDispatch()
+            deadline = time.time() + 5
+            while interpreter.state.deadline is None and time.time() < deadline:
+                time.sleep(0.01)
+            interpreter.stepLock.acquire()  # 模拟调度正在执行步骤
+            drainer = threading.Thread(target=manager.drain)
+            drainer.start()
+            drainer.join(0.2)
+            self.assertTrue(drainer.is_alive())
+            self.assertEqual(len(store), 0)
+            interpreter.stepLock.release()
+            drainer.join(5)
+            self.assertEqual(len(store), 1)
+            self.assertEqual(store.take('a')['deadline'], interpreter.state.deadline)
+            self.assertTrue(interpreter.stopEvent.is_set())
+        finally:
+            store.close()
+            shutil.rmtree(tmpDir)
+
+
+if __name__ == '__main__':
+    unittest.main()
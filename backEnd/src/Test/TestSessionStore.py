@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Interpreter import Interpreter
+from src.Interpreter.SessionStore import SessionStore
+from src.Interpreter.StateMachine import START, INPUT
+
+
+class TestSessionStore(unittest.TestCase):
+    """
+    测试会话快照的序列化、SQLite存储以及从快照恢复后继续对话。
+    """
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.store = SessionStore(os.path.join(self.tmpDir, 'sessions.db'))
+        self.tokens = [
+            ['Step', 'main'],
+            ['Speak', '$name', '+', '"您好"'],
+            ['Listen', '5'],
+            ['Branch', '"yes"', 'yes_step'],
+            ['Silence', 'no_response'],
+            ['Step', 'yes_step'],
+            ['Speak', '"You said yes"'],
+            ['Exit'],
+            ['Step', 'no_response'],
+            ['Speak', '"No response received"'],
+            ['Exit']
+        ]
+        self.tree = Grammar(self.tokens).getGrmTree()
+        self.output = redirect_stdout(StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+        self.store.close()
+        shutil.rmtree(self.tmpDir)
+
+    def testWalMode(self):
+        """数据库使用WAL模式"""
+        mode = self.store.conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def testSaveLoadTake(self):
+        """快照写入后可读取，take 读取后删除"""
+        self.store.save('alice', {'step': 'main', 'values': {'name': '张三'}})
+        self.assertEqual(self.store.load('alice')['values'], {'name': '张三'})
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.take('alice')['step'], 'main')
+        self.assertIsNone(self.store.load('alice'))
+        self.assertIsNone(self.store.load('bob'))
+
+    def testOldFormatIgnored(self):
+        """格式版本不符的快照被忽略"""
+        self.store.save('alice', {'step': 'main'})
+        with self.store.conn:
+            self.store.conn.execute('UPDATE sessions SET format = 0')
+        self.assertIsNone(self.store.load('alice'))
+
+    def testRestoreAtListen(self):
+        """停在Listen的会话经存储往返后继续对话，未取走的结果和变量保留"""
+        interpreter = Interpreter(self.tree)
+        interpreter.setName('张三')
+        interpreter.feed(START, now=100.0)
+        self.store.save('alice', interpreter.snapshot())
+
+        restored = Interpreter.restore(self.store.load('alice'), self.tree)
+        self.assertEqual(restored.getLatestResult(), '张三您好')
+        self.assertEqual(restored.state.deadline, 105.0)
+        restored.feed(INPUT, 'yes', now=101.0)
+        self.assertEqual(restored.getLatestResult(), 'You said yes')
+        self.assertTrue(restored.state.isFinished())
+
+    def testRestoreThreadedResume(self):
+        """线程调度从快照所停的Listen继续等待，超时后执行Silence"""
+        interpreter = Interpreter(self.tree)
+        interpreter.feed(START)
+        data = interpreter.snapshot()
+        data['deadline'] -= 4.9  # 只剩约0.1秒
+        restored = Interpreter.restore(data, self.tree)
+        restored.getLatestResult()
+        restored.dispatch(resume=True)
+        self.assertEqual(restored.getLatestResult(), 'No response received')
+
+    def testRestoreMissingStep(self):
+        """快照中的步骤在新脚本中不存在时，恢复为已结束的对话但保留变量"""
+        interpreter = Interpreter(self.tree)
+        interpreter.setName('张三')
+        interpreter.feed(START)
+        data = interpreter.snapshot()
+        otherTree = Grammar([['Step', 'other'], ['Speak', '$name'], ['Exit']]).getGrmTree()
+        restored = Interpreter.restore(data, otherTree)
+        self.assertTrue(restored.state.isFinished())
+        self.assertEqual(restored.getUserData(), {'name': '张三'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import http.client
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from werkzeug.test import Client
+from src.Interpreter.SessionStore import SessionStore
+from src.Interpreter.ShardRouter import HashRing, ShardCluster, ShardRouter
+
+
+class TestHashRing(unittest.TestCase):
+    """
+    测试一致性哈希环：分布均匀，增删节点时只有少量键改变归属。
+    """
+    def setUp(self):
+        self.keys = [f'user{index}' for index in range(10000)]
+        self.ring = HashRing([f'127.0.0.1:{5001 + index}' for index in range(4)])
+
+    def testBalance(self):
+        counts = {}
+        for key in self.keys:
+            node = self.ring.nodeFor(key)
+            counts[node] = counts.get(node, 0) + 1
+        self.assertEqual(len(counts), 4)
+        for count in counts.values():
+            self.assertGreater(count, len(self.keys) * 0.18)
+            self.assertLess(count, len(self.keys) * 0.32)
+
+    def testAddMovesOnlyToNewNode(self):
+        before = {key: self.ring.nodeFor(key) for key in self.keys}
+        ring = self.ring.copy()
+        ring.add('127.0.0.1:5005')
+        moved = [key for key in self.keys if ring.nodeFor(key) != before[key]]
+        self.assertTrue(all(ring.nodeFor(key) == '127.0.0.1:5005' for key in moved))
+        self.assertLess(len(moved), len(self.keys) * 0.3)
+        self.assertEqual({key: self.ring.nodeFor(key) for key in self.keys}, before)  # 副本不影响原环
+
+    def testRemoveMovesOnlyFromRemovedNode(self):
+        before = {key: self.ring.nodeFor(key) for key in self.keys}
+        self.ring.remove('127.0.0.1:5002')
+        for key in self.keys:
+            if before[key] != '127.0.0.1:5002':
+                self.assertEqual(self.ring.nodeFor(key), before[key])
+            else:
+                self.assertNotEqual(self.ring.nodeFor(key), '127.0.0.1:5002')
+
+    def testEmptyRing(self):
+        self.assertIsNone(HashRing().nodeFor('alice'))
+
+
+class TestShardRouter(unittest.TestCase):
+    """
+    测试路由：从请求中取出用户名；启动真实的工作进程，转发请求并在增减进程时迁移会话。
+    """
+    def testUsernameOf(self):
+        captured = []
+
+        class Recorder(ShardRouter):
+            def route(self, request):
+                captured.append(self.usernameOf(request))
+                return self.jsonResponse({}, 200)
+
+        client = Client(Recorder())
+        client.post('/telechat', data={'username': 'alice', 'message': 'hi'})
+        client.post('/telechat', json={'username': 'bob', 'message': 'hi'})
+        client.get('/stream?username=carol')
+        client.post('/register')
+        self.assertEqual(captured, ['alice', 'bob', 'carol', ''])
+
+    def testFailedMigrationKeepsSessions(self):
+        """迁入失败或无法读取会话时，原进程的会话保留、哈希环不变，已复制的副本被删除"""
+        nodes = ['127.0.0.1:5401', '127.0.0.1:5402']
+
+        class FakeRouter(ShardRouter):
+            """以内存中的字典模拟各工作进程的迁移接口"""
+            def __init__(self):
+                super().__init__(nodes)
+                usernames = [f'user{index}' for index in range(40)]
+                self.owned = {node: {name for name in usernames if self.ring.nodeFor(name) == node}
+                              for node in nodes + ['127.0.0.1:5403']}
+                self.failing = set()  # 调用失败的 (进程, 路径)
+
+            def call(self, node, method, path, payload=None):
+                if (node, path) in self.failing:
+                    raise OSError(f'{node}{path} 返回 500')
+                if path == '/shard/sessions':
+                    return {'usernames': sorted(self.owned[node])}
+                if path == '/shard/export':
+                    return {'sessions': [{'username': name} for name in payload['usernames']]}
+                if path == '/shard/import':
+                    self.owned[node].update(item['username'] for item in payload['sessions'])
+                    return {'imported': len(payload['sessions'])}
+                self.owned[node].difference_update(payload['usernames'])  # /shard/release
+                return {'released': len(payload['usernames'])}
+
+        router = FakeRouter()
+        before = {node: set(names) for node, names in router.owned.items()}
+        router.failing.add(('127.0.0.1:5403', '/shard/import'))
+        with self.assertRaises(OSError):
+            router.addNode('127.0.0.1:5403')
+        self.assertEqual(router.owned, before)
+        self.assertEqual(router.ring.nodes, nodes)
+        self.assertFalse(router.rebalancing)
+
+        router.failing = {('127.0.0.1:5402', '/shard/sessions')}
+        with self.assertRaises(OSError):
+            router.removeNode('127.0.0.1:5402')
+        self.assertEqual(router.owned, before)
+        self.assertEqual(router.ring.nodes, nodes)
+
+        router.failing = set()
+        moved = router.removeNode('127.0.0.1:5402')
+        self.assertEqual(moved, len(before['127.0.0.1:5402']))
+        self.assertEqual(router.owned['127.0.0.1:5402'], set())
+        self.assertEqual(len(router.owned['127.0.0.1:5401']), 40)
+
+    def testWorkerSessionStore(self):
+        """每个工作进程使用自己的会话存储，SIGTERM 停止时会话写入其中"""
+        tmpDir = tempfile.mkdtemp()
+        env = dict(os.environ, LLM_PROVIDER='', DSL_RELOAD_INTERVAL='0',
+                   DSL_SESSION_DB=os.path.join(tmpDir, 'sessions.db'))
+        cluster = ShardCluster(1, basePort=5321, env=env, verbose=False)
+        self.assertEqual(cluster.workerEnv(5322)['DSL_SESSION_DB'], os.path.join(tmpDir, 'sessions.5322.db'))
+        try:
+            cluster.start()
+            client = Client(cluster.router)
+            client.post('/register', data={'username': 'alice', 'password': 'p'})
+            self.assertEqual(client.post('/login', data={'username': 'alice', 'password': 'p'}).status_code, 200)
+        finally:
+            cluster.stop()
+        store = SessionStore(os.path.join(tmpDir, 'sessions.5321.db'))
+        try:
+            self.assertEqual(store.usernames(), ['alice'])
+        finally:
+            store.close()
+            shutil.rmtree(tmpDir)
+
+    def testClusterMigration(self):
+        env = dict(os.environ, LLM_PROVIDER='', DSL_RELOAD_INTERVAL='0')
+        cluster = ShardCluster(2, basePort=5301, env=env, verbose=False).start()
+        client = Client(cluster.router)
+        try:
+            usernames = [f'user{index}' for index in range(20)]
+            for index, username in enumerate(usernames):
+                self.assertEqual(client.post('/register', data={'username': username, 'password': 'p'}).status_code, 200)
+                self.assertEqual(client.post('/login', data={'username': username, 'password': 'p'}).status_code, 200)
+                client.post('/setinfo', data={'username': username, 'amount': str(index)})
+            client.post('/clearchat', data={'username': 'user0'})
+            while client.post('/repeatchat', data={'username': 'user0'}).get_json()['message'] != '没有新消息':
+                pass
+            self.assertEqual(client.get('/metrics').get_json()['sessions']['live'], 20)
+
+            # SSE 响应逐块转发，不等待推送结束
+            response = client.get('/stream?username=user0', buffered=False)
+            self.assertEqual(response.mimetype, 'text/event-stream')
+            self.assertTrue(next(iter(response.response)).startswith(b'retry:'))
+            response.close()
+
+            # 迁移接口不经路由对外开放，直接访问工作进程时须携带令牌
+            self.assertEqual(client.post('/shard/export', json={'usernames': usernames}).status_code, 404)
+            host, port = cluster.router.ring.nodes[0].split(':')
+            connection = http.client.HTTPConnection(host, int(port), timeout=5)
+            connection.request('GET', '/shard/sessions')
+            self.assertEqual(connection.getresponse().status, 403)
+            connection.close()
+
+            for workers in (3, 1):
+                cluster.scaleTo(workers)
+                self.assertEqual(len(cluster.router.ring), workers)
+                self.assertEqual(client.get('/metrics').get_json()['sessions']['live'], 20)  # 原进程已删除迁出的会话
+                for index, username in enumerate(usernames):
+                    values = client.post('/getinfo', data={'username': username}).get_json()['values']
+                    self.assertEqual(values['amount'], str(index))
+            self.assertGreater(client.get('/metrics').get_json()['router']['migrated'], 0)
+
+            # 迁移后对话继续：停在Listen的会话收到输入后给出回复，已注册的用户仍可登录
+            client.post('/telechat', data={'username': 'user0', 'message': '账单'})
+            reply = '没有新消息'
+            for _ in range(100):
+                reply = client.post('/repeatchat', data={'username': 'user0'}).get_json()['message']
+                if reply != '没有新消息':
+                    break
+                time.sleep(0.05)
+            self.assertNotEqual(reply, '没有新消息')
+            self.assertEqual(client.post('/login', data={'username': 'user5', 'password': 'p'}).status_code, 200)
+        finally:
+            cluster.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from src.Interpreter.DataStructure import VarRef
+from src.Interpreter.SpeakTemplate import SpeakTemplate
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Interpreter import Interpreter
+
+class TestSpeakTemplate(unittest.TestCase):
+    """
+    测试Speak模板的编译与渲染
+    """
+    def testConstantFolding(self):
+        """不含变量的模板折叠为常量字符串"""
+        template = SpeakTemplate(['您好，', '欢迎来电'], {})
+        self.assertEqual(template.text, '您好，欢迎来电')
+        self.assertEqual(template.parts, ('您好，欢迎来电',))
+        self.assertEqual(template.render([]), '您好，欢迎来电')
+
+    def testSlotSubstitution(self):
+        """变量按符号表下标取值，缺失时输出占位文本"""
+        template = SpeakTemplate(['账单', VarRef('amount'), '元，', '套餐', VarRef('plan')], {'plan': 0, 'amount': 1})
+        self.assertEqual(template.parts, ('账单', '', '元，套餐', ''))
+        self.assertEqual(template.render(['畅享', 100]), '账单100元，套餐畅享')
+        self.assertEqual(template.render([None, 100]), '账单100元，套餐[plan]')
+
+    def testLiteralDoesNotCollideWithVariable(self):
+        """与变量同名的字符串字面量不会被当作变量替换"""
+        tokens = [
+            ['Step', 'main'],
+            ['Speak', '"name"', '+', '$name'],
+            ['Exit']
+        ]
+        interpreter = Interpreter(Grammar(tokens).getGrmTree())
+        interpreter.setName('Alice')
+        step = interpreter.tree.getProgram()[0]
+        self.assertEqual(step[0][1].render(interpreter.userTable.getValues()), 'nameAlice')
+
+if __name__ == '__main__':
+    unittest.main()  # 运行测试
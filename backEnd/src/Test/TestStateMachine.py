@@ -0,0 +1,104 @@
+import unittest
+from src.Interpreter.Grammar import Grammar
+from src.Interpreter.Linker import link
+from src.Interpreter.StateMachine import SessionState, feed, START, INPUT, TIMEOUT, TIMEOUT_MESSAGE, LOOP_MESSAGE
+
+
+def buildState(tokens):
+    """由tokens构建已链接的语法树和会话状态"""
+    return SessionState(link(Grammar(tokens).getGrmTree()))
+
+
+class TestStateMachine(unittest.TestCase):
+    """
+    测试 feed：以事件推进会话，返回输出和下一次超时的时间点。
+    """
+    def setUp(self):
+        self.tokens = [
+            ['Step', 'main'],
+            ['Speak', '"Hello World"'],
+            ['Listen', '5'],
+            ['Branch', '"yes"', 'yes_step'],
+            ['Silence', 'no_response'],
+            ['Step', 'yes_step'],
+            ['Speak', '"You said yes"'],
+            ['Exit'],
+            ['Step', 'no_response'],
+            ['Speak', '"No response received"'],
+            ['Exit']
+        ]
+        self.state = buildState(self.tokens)
+
+    def testStartStopsAtListen(self):
+        """START 执行到第一个Listen，时间点为当前时间加上Listen时长"""
+        self.assertEqual(feed(self.state, START, now=100.0), (["Hello World"], 105.0))
+        self.assertFalse(self.state.isFinished())
+
+    def testInputBranch(self):
+        """输入命中分支后执行到Exit，时间点为None"""
+        feed(self.state, START, now=100.0)
+        self.assertEqual(feed(self.state, INPUT, "yes", now=101.0), (["You said yes"], None))
+        self.assertTrue(self.state.isFinished())
+
+    def testTimeout(self):
+        """未到期的超时被忽略，到期后执行Silence"""
+        feed(self.state, START, now=100.0)
+        self.assertEqual(feed(self.state, TIMEOUT, now=104.0), ([], 105.0))
+        self.assertEqual(feed(self.state, TIMEOUT, now=105.0), (["No response received"], None))
+
+    def testUnmatchedInputSkipsSilence(self):
+        """分支未命中时跳过Silence，步骤执行完后重新执行该步骤"""
+        feed(self.state, START, now=100.0)
+        self.assertEqual(feed(self.state, INPUT, "no", now=102.0), (["Hello World"], 107.0))
+
+    def testTimeoutFallbackMessage(self):
+        """没有Silence时超时提示后继续执行"""
+        state = buildState([
+            ['Step', 'main'],
+            ['Speak', '"Welcome"'],
+            ['Listen', '1'],
+            ['Default', 'end'],
+            ['Step', 'end'],
+            ['Speak', '"Goodbye"'],
+            ['Exit']
+        ])
+        feed(state, START, now=0.0)
+        self.assertEqual(feed(state, TIMEOUT, now=1.0), ([TIMEOUT_MESSAGE, "Goodbye"], None))
+
+    def testStaleEventsIgnored(self):
+        """对话未开始或已结束时的输入和超时被忽略"""
+        self.assertEqual(feed(self.state, INPUT, "yes"), ([], None))
+        feed(self.state, START, now=100.0)
+        feed(self.state, INPUT, "yes", now=101.0)
+        self.assertEqual(feed(self.state, INPUT, "yes", now=102.0), ([], None))
+        self.assertEqual(feed(self.state, TIMEOUT, now=200.0), ([], None))
+
+    def testStateMovesBetweenCallers(self):
+        """状态只是普通对象，两份状态互不影响，可交给任意调用方继续推进"""
+        other = buildState(self.tokens)
+        feed(self.state, START, now=0.0)
+        feed(other, START, now=0.0)
+        self.assertEqual(feed(other, TIMEOUT, now=5.0), (["No response received"], None))
+        self.assertEqual(feed(self.state, INPUT, "yes", now=5.0), (["You said yes"], None))
+        self.assertFalse(hasattr(self.state, '__dict__'))
+
+    def testJumpLoopEnds(self):
+        """两次Listen之间无限跳转时结束对话"""
+        state = buildState([
+            ['Step', 'a'],
+            ['Default', 'b'],
+            ['Step', 'b'],
+            ['Default', 'a']
+        ])
+        self.assertEqual(feed(state, START), ([LOOP_MESSAGE], None))
+        self.assertTrue(state.isFinished())
+
+    def testUnknownEvent(self):
+        """未知事件抛出ValueError"""
+        feed(self.state, START)
+        with self.assertRaises(ValueError):
+            feed(self.state, 'pause')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import math
+import random
+import unittest
+from src.Interpreter.TimerWheel import TimerWheel, TimerService
+
+
+class TestTimerWheel(unittest.TestCase):
+    """
+    测试分层时间轮的登记、取消、层间下放和成批到期。
+    """
+    def setUp(self):
+        self.wheel = TimerWheel(tick=1.0, slots=4, levels=3, now=0.0)  # 较小的时间轮便于覆盖层间下放
+
+    def testFireNotEarly(self):
+        """到截止时间所在的刻度才触发"""
+        self.wheel.schedule('a', 2.5)
+        self.assertEqual(self.wheel.advance(2.0), [])
+        self.assertEqual(self.wheel.advance(3.0), ['a'])
+        self.assertEqual(len(self.wheel), 0)
+
+    def testCancel(self):
+        """取消后不再触发"""
+        self.wheel.schedule('a', 2.0)
+        self.assertTrue(self.wheel.cancel('a'))
+        self.assertFalse(self.wheel.cancel('a'))
+        self.assertEqual(self.wheel.advance(10.0), [])
+
+    def testReschedule(self):
+        """同一个键重新登记时替换原定时器"""
+        self.wheel.schedule('a', 2.0)
+        self.wheel.schedule('a', 6.0)
+        self.assertEqual(self.wheel.advance(5.0), [])
+        self.assertEqual(self.wheel.advance(6.0), ['a'])
+
+    def testPastDeadline(self):
+        """截止时间已过的定时器在下一个刻度触发"""
+        self.wheel.advance(5.0)
+        self.wheel.schedule('a', 1.0)
+        self.assertEqual(self.wheel.advance(6.0), ['a'])
+
+    def testBatchOrder(self):
+        """一次推进中到期的定时器按截止时间排列"""
+        for key, deadline in (('c', 30.0), ('a', 5.0), ('b', 17.0)):
+            self.wheel.schedule(key, deadline)
+        self.assertEqual(self.wheel.advance(40.0), ['a', 'b', 'c'])
+
+    def testBeyondTopLevel(self):
+        """超出最高层范围的定时器经多次下放后按时触发"""
+        self.wheel.schedule('far', 200.0)  # 4^3 = 64 个刻度之外
+        self.assertEqual(self.wheel.advance(199.0), [])
+        self.assertEqual(self.wheel.advance(200.0), ['far'])
+
+    def testMatchesBruteForce(self):
+        """随机登记、取消和推进，与逐个检查的结果一致"""
+        rng = random.Random(7)
+        pending = {}
+        now = 0.0
+        for step in range(2000):
+            action = rng.random()
+            if action < 0.5:
+                key = rng.randrange(200)
+                deadline = now + rng.uniform(0, 150)
+                self.wheel.schedule(key, deadline)
+                pending[key] = max(math.ceil(deadline), int(now) + 1)
+            elif action < 0.6 and pending:
+                key = rng.choice(list(pending))
+                self.wheel.cancel(key)
+                del pending[key]
+            else:
+                now += rng.uniform(0, 5)
+                expected = sorted(key for key, tick in pending.items() if tick <= int(now))
+                self.assertEqual(sorted(self.wheel.advance(now)), expected)
+                for key in expected:
+                    del pending[key]
+        self.assertEqual(len(self.wheel), len(pending))
+
+    def testServiceBatches(self):
+        """TimerService 把到期的键成批交给处理函数"""
+        batches = []
+        service = TimerService(self.wheel, batches.append)
+        for key in range(3):
+            self.wheel.schedule(key, 2.0)
+        self.assertEqual(service.pollOnce(1.0), 0)
+        self.assertEqual(service.pollOnce(2.0), 3)
+        self.assertEqual(batches, [[0, 1, 2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from src.Interpreter.VariableStore import VariableStore, formatFor, readRecords, importRecords, main
+
+
+class TestVariableStore(unittest.TestCase):
+    """
+    测试用户变量存储、CSV/JSONL 解析、按脚本变量校验的分批导入和命令行。
+    """
+    def setUp(self):
+        self.store = VariableStore()
+
+    def tearDown(self):
+        self.store.close()
+
+    def testPutAndLoad(self):
+        self.store.putMany([('alice', 'amount', '100'), ('alice', 'plan', 'A'), ('bob', 'amount', '5')])
+        self.store.putMany([('alice', 'amount', '200')])  # 覆盖已有的值
+        self.assertEqual(self.store.load('alice'), {'amount': '200', 'plan': 'A'})
+        self.assertEqual(self.store.load('nobody'), {})
+        self.assertEqual(len(self.store), 3)
+
+    def testReadCSV(self):
+        lines = io.StringIO('variable,username,value\namount,alice,100\nplan,,A\n"planFee",bob,"1,000"\n')
+        self.assertEqual(list(readRecords(lines)), [
+            (2, ('alice', 'amount', '100'), None),
+            (3, None, '缺少用户名'),
+            (4, ('bob', 'planFee', '1,000'), None),
+        ])
+        records = list(readRecords(io.StringIO('username,value\nalice,1\n')))
+        self.assertEqual(records, [(1, None, '表头缺少列: variable')])
+        self.assertEqual(list(readRecords(io.StringIO(''))), [])
+
+    def testReadJSONL(self):
+        lines = io.StringIO('{"username": "alice", "variable": "amount", "value": 100}\n\n'
+                            'not json\n[1]\n{"username": "bob", "variable": "plan", "value": null}\n')
+        self.assertEqual(list(readRecords(lines, 'jsonl')), [
+            (1, ('alice', 'amount', '100'), None),
+            (3, None, 'JSON格式错误'),
+            (4, None, '记录须为JSON对象'),
+            (5, None, '变量值须为字符串或数字'),
+        ])
+
+    def testFormatFor(self):
+        self.assertEqual(formatFor('bills.jsonl'), 'jsonl')
+        self.assertEqual(formatFor('application/x-ndjson'), 'jsonl')
+        self.assertEqual(formatFor('bills.csv'), 'csv')
+        self.assertEqual(formatFor(None), 'csv')
+
+    def testImportValidatesAndBatches(self):
+        text = 'username,variable,value\n' + ''.join(f'user{index},amount,{index}\n' for index in range(25))
+        text += 'user0,unknown,1\n'
+        result = importRecords(self.store, readRecords(io.StringIO(text)), ['amount', 'plan'], batchSize=10)
+        self.assertEqual(result, {'imported': 25, 'rejected': 1,
+                                  'errors': [{'line': 27, 'error': '脚本中没有变量: unknown'}]})
+        self.assertEqual(len(self.store), 25)
+        self.assertEqual(self.store.load('user24'), {'amount': '24'})
+
+    def testCommandLine(self):
+        tmpDir = tempfile.mkdtemp()
+        try:
+            dataPath = os.path.join(tmpDir, 'bills.jsonl')
+            with open(dataPath, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'username': 'alice', 'variable': 'amount', 'value': '88'}) + '\n')
+            dbPath = os.path.join(tmpDir, 'variables.db')
+            output = io.StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(main(['--db', dbPath, dataPath]), 0)
+            self.assertIn('"imported": 1', output.getvalue())
+            store = VariableStore(dbPath)
+            self.assertEqual(store.load('alice'), {'amount': '88'})
+            store.close()
+        finally:
+            shutil.rmtree(tmpDir)
+
+
+if __name__ == '__main__':
+    unittest.main()
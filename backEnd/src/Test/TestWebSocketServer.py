@@ -0,0 +1,109 @@
+import json
+import time
+import unittest
+import trio
+from trio_websocket import ConnectionRejected, open_websocket_url
+import src.Interpreter.app as appModule
+from src.Interpreter.app import app, userInfo, userState
+from src.Interpreter.WebSocketServer import WebSocketServer
+
+
+class TestWebSocketServer(unittest.TestCase):
+    """
+    测试 WebSocket 对话接口：一个连接上发送输入、接收输出，断线后带事件ID重连补发。
+    """
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        userInfo.clear()
+        userState.clear()
+        appModule.RUNTIME = 'inline'
+        self.server = WebSocketServer(userState.touch, appModule.submitInput, appModule.restartConversation,
+                                      port=0, heartbeat=0.05, pongTimeout=1).start()
+        self.client.post('/register', data={'username': 'testuser', 'password': 'password'})
+        self.client.post('/login', data={'username': 'testuser', 'password': 'password'})
+
+    def tearDown(self):
+        self.server.stop()
+        appModule.RUNTIME = 'thread'
+
+    def url(self, query):
+        return f'ws://127.0.0.1:{self.server.port}/chat?{query}'
+
+    async def receiveOutputs(self, ws, idle=0.3):
+        """接收输出直到 idle 秒内没有新消息"""
+        outputs = []
+        while True:
+            with trio.move_on_after(idle):
+                outputs.append(json.loads(await ws.get_message()))
+                continue
+            return outputs
+
+    def testConversation(self):
+        async def scenario():
+            async with open_websocket_url(self.url('username=testuser')) as ws:
+                await ws.send_message(json.dumps({'type': 'clear'}))
+                greeting = await self.receiveOutputs(ws)
+                self.assertTrue(greeting)
+                self.assertEqual(greeting[0]['type'], 'output')
+                self.assertIn('testuser', greeting[0]['text'])
+
+                await ws.send_message(json.dumps({'type': 'input', 'text': '账单'}))
+                replies = await self.receiveOutputs(ws)
+                self.assertTrue(replies)
+                ids = [int(item['id'].split(':')[1]) for item in greeting + replies]
+                self.assertEqual(ids, list(range(ids[0], ids[0] + len(ids))))  # 序号连续
+
+                await ws.send_message('not json')
+                error = json.loads(await ws.get_message())
+                self.assertEqual(error['type'], 'error')
+                await trio.sleep(0.2)  # 期间心跳照常往返，连接保持
+                self.assertFalse(ws.closed)
+                return replies[-1]['id']
+
+        lastEventID = trio.run(scenario)
+        self.assertEqual(self.server.metrics()['heartbeatTimeouts'], 0)
+
+        # 断线期间产生的输出在重连时补发，已收到的不再重复
+        self.client.post('/telechat', data={'username': 'testuser', 'message': '账单'})
+
+        async def reconnect():
+            async with open_websocket_url(self.url(f'username=testuser&lastEventId={lastEventID}')) as ws:
+                return await self.receiveOutputs(ws)
+
+        resumed = trio.run(reconnect)
+        self.assertTrue(resumed)
+        self.assertEqual(int(resumed[0]['id'].split(':')[1]), int(lastEventID.split(':')[1]) + 1)
+        deadline = time.time() + 5
+        while self.server.metrics()['connections'] and time.time() < deadline:
+            time.sleep(0.01)  # 服务端在客户端关闭后异步清理连接
+        self.assertEqual(self.server.metrics()['connections'], 0)
+
+    def testRejectUnknownUser(self):
+        rejected = []
+
+        async def scenario():
+            try:
+                async with open_websocket_url(self.url('username=nobody')):
+                    pass
+            except* ConnectionRejected as group:
+                rejected.extend(group.exceptions)
+
+        trio.run(scenario)
+        self.assertEqual(rejected[0].status_code, 403)
+        self.assertEqual(self.server.metrics()['rejected'], 1)
+
+    def testSessionRemovedClosesConnection(self):
+        async def scenario():
+            async with open_websocket_url(self.url('username=testuser')) as ws:
+                await trio.to_thread.run_sync(userState.__delitem__, 'testuser')
+                with trio.fail_after(5):
+                    while not ws.closed:
+                        await trio.sleep(0.01)
+                return ws.closed.code
+
+        self.assertEqual(trio.run(scenario), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
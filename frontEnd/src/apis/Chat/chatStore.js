@@ -1,5 +1,5 @@
 import { defineStore } from "pinia";
-import { useTeleChatServer, useClearChatServer, useRepeatChatServer } from "./server";
+import { useTeleChatServer, useClearChatServer, useRepeatChatServer, useStreamServer } from "./server";
 
 export const useTeleChatStore = defineStore("teleChat",()=>{
     const server = useTeleChatServer();
@@ -17,9 +17,14 @@ export const useTeleChatStore = defineStore("teleChat",()=>{
         const res = await serverRepeat.repeatChat(data);
         return res
     }
+    const serverStream = useStreamServer();
+    function openStream(username) {
+        return serverStream.openStream(username);
+    }
     return {
         teleChat,
         clearChat,
-        repeatChat
+        repeatChat,
+        openStream
     }
 })
\ No newline at end of file
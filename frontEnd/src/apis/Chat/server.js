@@ -51,4 +51,15 @@ export const useRepeatChatServer = defineStore("RepeatChatServer", () => {
     return {
         repeatChat
     }
+})
+
+export const useStreamServer = defineStore("StreamServer", () => {
+    // SSE 推送：每条回复产生后立即送达，断线后浏览器自动带上 Last-Event-ID 重连补发
+    const openStream = (username) => {
+        const url = SERVER_CONFIG.SERVER + ":" + SERVER_CONFIG.PORT + "/stream?username=" + encodeURIComponent(username)
+        return new EventSource(url)
+    }
+    return {
+        openStream
+    }
 })
\ No newline at end of file